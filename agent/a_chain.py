@@ -1,9 +1,6 @@
-from typing import Any, Dict
-
-from langchain_core.runnables import RunnableSequence
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+from typing import Any, AsyncIterator, Dict
 
+from agent.chain_registry import register_chain, invoke_chain, ainvoke_chain, astream_chain
 from configs.llm import get_llm
 from prompts.a_chain_prompts import (
     A_CHAIN_PLANNING_PROMPT,
@@ -21,6 +18,9 @@ def build_a_chain1():
       → LLM
       → planning (natural language reasoning)
     """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
 
     prompt = ChatPromptTemplate.from_messages(
@@ -44,6 +44,9 @@ def build_a_chain2():
       → LLM
       → task combination & order (loose DSL)
     """
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
 
     prompt = ChatPromptTemplate.from_messages(
@@ -68,6 +71,8 @@ def build_a_chain():
       → task DSL
     """
 
+    from langchain_core.runnables import RunnableSequence
+
     a_chain1 = build_a_chain1()
     a_chain2 = build_a_chain2()
 
@@ -84,6 +89,11 @@ def build_a_chain():
     return a_chain
 
 
+register_chain("a_chain1", build_a_chain1)
+register_chain("a_chain2", build_a_chain2)
+register_chain("a_chain", build_a_chain)
+
+
 # -----------------------------------------------------------
 # Public API
 # -----------------------------------------------------------
@@ -93,11 +103,23 @@ def run_a_chain(user_goal: str) -> Dict[str, Any]:
     (중요: 중간 결과를 버리지 않는다)
     """
 
-    a_chain1 = build_a_chain1()
-    a_chain2 = build_a_chain2()
+    planning = invoke_chain("a_chain1", {"user_goal": user_goal})
+    task_dsl = invoke_chain("a_chain2", {"planning": planning})
+
+    return {
+        "user_goal": user_goal,
+        "planning": planning,
+        "task_dsl": task_dsl,
+    }
+
 
-    planning = a_chain1.invoke({"user_goal": user_goal})
-    task_dsl = a_chain2.invoke({"planning": planning})
+async def arun_a_chain(user_goal: str) -> Dict[str, Any]:
+    """
+    Async counterpart of run_a_chain (uses ainvoke).
+    """
+
+    planning = await ainvoke_chain("a_chain1", {"user_goal": user_goal})
+    task_dsl = await ainvoke_chain("a_chain2", {"planning": planning})
 
     return {
         "user_goal": user_goal,
@@ -106,6 +128,30 @@ def run_a_chain(user_goal: str) -> Dict[str, Any]:
     }
 
 
+async def astream_a_chain(
+        user_goal: str,
+        result: Dict[str, Any],
+) -> AsyncIterator[str]:
+    """
+    Streaming a_chain: yields task DSL text chunks as a_chain2 generates them.
+
+    `result` is filled in place with user_goal / planning / task_dsl
+    (task_dsl is complete once the stream is exhausted).
+
+    NOTE:
+    - a_chain1 (planning) is not streamed; a_chain2 starts after it
+    - streamed a_chain2 calls bypass the LLM response cache
+    """
+
+    result["user_goal"] = user_goal
+    result["planning"] = await ainvoke_chain("a_chain1", {"user_goal": user_goal})
+    result["task_dsl"] = ""
+
+    async for chunk in astream_chain("a_chain2", {"planning": result["planning"]}):
+        result["task_dsl"] += chunk
+        yield chunk
+
+
 # ------------------------------------------------------------
 # Execution
 # ------------------------------------------------------------
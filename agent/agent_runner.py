@@ -1,20 +1,55 @@
+import asyncio
+import functools
 import json
-from typing import Dict, List
+import os
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
 
-from agent.a_chain import run_a_chain
+from agent.a_chain import run_a_chain, arun_a_chain, astream_a_chain
 from agent.b_chain import (
-    run_b_chain_v1,
+    run_b_chain,
+    arun_b_chain,
     run_b_chain_v2,
+    arun_b_chain_v2,
+    run_b_chain_v1_batch,
+    arun_b_chain_v1_batch,
+    is_ffmpeg_capable,
 )
-from agent.c_chain import run_c_chain
+from agent.c_chain import run_c_chain, arun_c_chain, run_c_chain_compact, arun_c_chain_compact
+from agent.fused_chain import run_fused_task, arun_fused_task
+from configs.llm import get_llm_cache
 
-from utils.task_parser import parse_task_dsl
-from utils.context_packing import build_execution_context
+from utils.task_parser import parse_task_dsl, aiter_task_dsl
+from utils.context_packing import build_execution_context, pack_execution_context, packing_report
+from utils.task_rules import match_task_rule, summarize_fast_path
+from utils.task_templates import get_task_template_cache
+from utils.run_journal import RunJournal
+from utils.tracing import current_task_index, start_tracing, stop_tracing, trace_span, Tracer
 
 from tools.ffmpeg_executor import (
+    print_progress,
     run_ffmpeg_command,
+    run_ffmpeg_command_streaming,
     resolve_paths,
 )
+from tools.command_compiler import (
+    can_compile,
+    compile_ffmpeg_command_string,
+    copy_compile_state,
+    invalidate_compile_state,
+    new_compile_state,
+)
+from tools.graph_fusion import can_fuse, compile_fused_command_string
+from tools.ffmpeg_scheduler import run_ffmpeg_jobs
+from tools.trim_optimizer import run_optimized_ffmpeg_command
+from tools.artifact_cache import get_artifact_cache, run_cached_ffmpeg_command
+from tools.media_index import MEDIA_FILE_RE, get_media_index, media_facts
+from tools.chunked_encoder import run_chunked_ffmpeg_command
+from tools.command_validator import run_validated_ffmpeg_command
+
+TASK_MODES = ("chains", "fused")
+
 
 # -----------------------------------------------------------
 # Agent Runner
@@ -24,24 +59,573 @@ class FFmpegToyAgent:
     Research-oriented Agent Runner.
     """
 
-    def __init__(self):
+    def __init__(
+            self,
+            max_concurrency: int = 4,
+            batch_classify: bool = False,
+            fast_path: bool = True,
+            compile_commands: bool = True,
+            parallel_ffmpeg: bool = False,
+            ffmpeg_workers: Optional[int] = None,
+            ffmpeg_thread_budget: Optional[int] = None,
+            optimize_trims: bool = True,
+            fuse_graph: bool = False,
+            artifact_cache: bool = True,
+            journal_runs: bool = True,
+            stream_ffmpeg: bool = True,
+            trace: bool = False,
+            ffmpeg_slots: Optional[threading.Semaphore] = None,
+            compact_context: bool = True,
+            context_token_budget: Optional[int] = None,
+            task_mode: str = "chains",
+            template_cache: bool = True,
+            media_index: bool = True,
+            validate_commands: bool = True,
+            chunked_encode: bool = False,
+            chunk_workers: Optional[int] = None,
+    ):
         self.env = {
             "input_video_dir": r"C:\Users\ei994\PycharmProjects\FFmpeg_ToyAgent\aa_original_assets\video",
             "output_dir": r"C:\Users\ei994\PycharmProjects\FFmpeg_ToyAgent\bb_outputs",
         }
 
-    def run(self, user_goal: str):
+        # upper bound on tasks analyzed / synthesized at the same time (arun)
+        self.max_concurrency = max_concurrency
+
+        # classify all tasks with one b_chain v1 request instead of one per task
+        self.batch_classify = batch_classify
+
+        # recognize regular tasks with rules (utils/task_rules) and skip b_chain
+        self.fast_path = fast_path
+
+        # build FFmpeg commands from templates (tools/command_compiler) for
+        # known operations; c_chain is only called for the rest
+        self.compile_commands = compile_commands
+
+        # run FFmpeg commands as a dependency DAG on a worker pool after all
+        # commands are known (tools/ffmpeg_scheduler), instead of one by one
+        self.parallel_ffmpeg = parallel_ffmpeg
+        self.ffmpeg_workers = ffmpeg_workers
+        self.ffmpeg_thread_budget = ffmpeg_thread_budget
+
+        # rewrite trims for input seeking / keyframe-aligned stream copy
+        # before execution (tools/trim_optimizer)
+        self.optimize_trims = optimize_trims
+
+        # merge consecutive compiled tasks into one -filter_complex FFmpeg
+        # process with a single final encode (tools/graph_fusion)
+        self.fuse_graph = fuse_graph
+
+        # reuse FFmpeg outputs of identical commands on unchanged inputs
+        # (tools/artifact_cache; ARTIFACT_CACHE=0 disables it globally)
+        self.artifact_cache = artifact_cache
+
+        # append every completed stage to a JSONL run journal
+        # (utils/run_journal), so resume(run_id) can continue a broken run
+        self.journal_runs = journal_runs
+
+        # run FFmpeg without a shell, with live -progress events, a bounded
+        # stderr tail and a timeout derived from the output duration
+        self.stream_ffmpeg = stream_ffmpeg
+
+        # record per-stage / per-LLM-call spans (utils/tracing) and export them
+        # as JSONL + Chrome trace to TRACE_DIR after the run
+        self.trace = trace
+
+        # FFmpeg processes allowed at once across agents sharing the semaphore
+        # (batch runner); None = no limit beyond this agent's own scheduling
+        self.ffmpeg_slots = ffmpeg_slots
+
+        # send c_chain the execution context as one canonical compact JSON
+        # (utils/context_packing) instead of the raw dict repr in two messages;
+        # budget default: C_CHAIN_CONTEXT_BUDGET
+        self.compact_context = compact_context
+        self.context_token_budget = context_token_budget
+
+        # "chains": b_chain v1 + v2, then c_chain (three requests per task)
+        # "fused" : one JSON request per task (agent/fused_chain) returns the
+        #           verdict, the structured task and the command; unparsable
+        #           answers fall back to the chains. batch_classify is unused.
+        if task_mode not in TASK_MODES:
+            raise ValueError(f"task_mode must be one of {TASK_MODES}, got {task_mode!r}")
+        self.task_mode = task_mode
+        if task_mode == "fused":
+            self.batch_classify = False
+
+        # reuse b_chain / c_chain output of structurally identical tasks with
+        # other files / timestamps / numbers (utils/task_templates;
+        # TASK_TEMPLATE_CACHE=0 disables it globally)
+        self.template_cache = template_cache
+
+        # probe input_video_dir in the background when a run starts
+        # (tools/media_index, SQLite-cached by path / size / mtime) and give
+        # c_chain the duration / codecs / resolution / fps / GOP of the files
+        # a task refers to; MEDIA_INDEX=0 disables it globally
+        self.media_index = media_index
+
+        # reject commands with missing inputs, out-of-range seeks or unknown
+        # filters / encoders before spawning FFmpeg (tools/command_validator);
+        # the reasons end up in ffmpeg_result["validation"]
+        self.validate_commands = validate_commands
+
+        # split long single-input re-encodes into keyframe-aligned segments
+        # encoded by parallel FFmpeg processes and joined with the concat
+        # demuxer (tools/chunked_encoder); chunk_workers default: the
+        # command's -threads, else the cpu count
+        self.chunked_encode = chunked_encode
+        self.chunk_workers = chunk_workers
+
+    # -------------------------------------------------------
+    # Tracing helpers
+    # -------------------------------------------------------
+    def _start_trace(self) -> Optional[Tracer]:
+        return start_tracing() if self.trace else None
+
+    @staticmethod
+    def _finish_trace(tracer: Optional[Tracer], result: Dict) -> Dict:
+        """
+        Export the spans of a traced run and attach the per-stage summary.
+        """
+
+        if tracer is None:
+            return result
+
+        name = result["run_id"] or time.strftime("%Y%m%d-%H%M%S")
+        result["trace"] = {"summary": tracer.summary(), **tracer.export(name)}
+
+        print("\n[Trace]")
+        for kind, stages in result["trace"]["summary"].items():
+            for stage, stats in stages.items():
+                print(
+                    f"{kind:<5} {stage:<18} n={stats['count']:<4} total={stats['total_sec']:.2f}s "
+                    f"p50={stats['p50_sec'] * 1000:.1f}ms queue={stats['queue_wait_sec']:.2f}s "
+                    f"tokens={stats['prompt_tokens']}/{stats['completion_tokens']} "
+                    f"cache_hits={stats['cache_hits']}"
+                )
+        print(f"chrome trace: {result['trace']['chrome']}")
+        return result
+
+    # -------------------------------------------------------
+    # Run journal helpers
+    # -------------------------------------------------------
+    def _new_journal(self, user_goal: str) -> Optional[RunJournal]:
+        if not self.journal_runs:
+            return None
+
+        journal = RunJournal()
+        journal.record("start", user_goal=user_goal, options={
+            "batch_classify": self.batch_classify,
+            "fast_path": self.fast_path,
+            "compile_commands": self.compile_commands,
+            "parallel_ffmpeg": self.parallel_ffmpeg,
+            "fuse_graph": self.fuse_graph,
+            "task_mode": self.task_mode,
+        })
+        print(f"[Agent] run_id={journal.run_id}")
+        return journal
+
+    @staticmethod
+    def _replayed(journal: Optional[RunJournal], stage: str, task_index: Optional[int] = None) -> Optional[Dict]:
+        return journal.replayed(stage, task_index) if journal is not None else None
+
+    @staticmethod
+    def _record(journal: Optional[RunJournal], stage: str, task_index: Optional[int] = None, **data) -> None:
+        if journal is not None:
+            journal.record(stage, task_index, **data)
+
+    def _replayed_b_output(self, journal: Optional[RunJournal], idx: int, task: str) -> Optional[Dict]:
+        entry = self._replayed(journal, "b_chain", idx)
+        if entry is None or entry["task"] != task:
+            return None
+        return entry["b_output"]
+
+    def _replayed_ffmpeg(self, journal: Optional[RunJournal], logs: List[Dict], command: str) -> Optional[Dict]:
+        """
+        Successful FFmpeg result of the same command in an earlier attempt.
+        (failed commands are executed again)
+        """
+
+        entry = self._replayed(journal, "ffmpeg", logs[-1]["task_index"])
+        if entry is None or entry["command"] != command or not entry["result"].get("success"):
+            return None
+        return {**entry["result"], "replayed": True}
+
+    def _record_ffmpeg(self, journal: Optional[RunJournal], logs: List[Dict], command: str, result: Dict) -> None:
+        self._record(
+            journal, "ffmpeg", logs[-1]["task_index"],
+            task_indices=[log["task_index"] for log in logs],
+            command=command,
+            result=result,
+        )
+
+    # -------------------------------------------------------
+    # b_chain helpers
+    # -------------------------------------------------------
+    def _match_rule(self, task: str) -> Optional[Dict]:
+        return match_task_rule(task) if self.fast_path else None
+
+    @staticmethod
+    def _rule_output(rule: Dict) -> Dict:
+        return {
+            "b_chain_v1": rule["b_chain_v1"],
+            "b_chain_v2": rule["b_chain_v2"],
+            "fast_path": rule["rule"],
+            "structured": rule["structured"],
+        }
+
+    def _template_cache(self):
+        return get_task_template_cache() if self.template_cache else None
+
+    def _match_template(self, task: str) -> Optional[Dict]:
+        cache = self._template_cache()
+        return cache.lookup(task) if cache is not None else None
+
+    def _remember_template(self, log: Dict) -> None:
+        """
+        Store the LLM-made analysis / command of a finished task log.
+        (rule, template and compiler results are cheap to redo)
+        """
+
+        cache = self._template_cache()
+        if cache is None or log.get("fast_path") or log.get("template") or log.get("compiled"):
+            return
+        if log["ffmpeg_capable"] and not log.get("ffmpeg_command"):
+            return
+
+        cache.store(
+            log["task"],
+            {"b_chain_v1": log["b_chain_v1"], "b_chain_v2": log.get("b_chain_v2")},
+            log.get("ffmpeg_command") if log["ffmpeg_capable"] else None,
+        )
+
+    def _analyze_task(self, task: str, v1_output: Optional[str] = None) -> Dict:
+        """
+        b_chain for one task.
+        - fast path rule match → no LLM call at all
+        - template cache hit → command included ("ffmpeg_command"), no LLM call
+        - fused task mode → one request, command included ("ffmpeg_command")
+        - v1 may already be known from batch classification
+        """
+
+        rule = self._match_rule(task)
+        if rule is not None:
+            return self._rule_output(rule)
+
+        cached = self._match_template(task)
+        if cached is not None:
+            return cached
+
+        if self.task_mode == "fused":
+            fused = run_fused_task(task)
+            if fused is not None:
+                return fused
+            print("\n[Fused] unparsable answer → b_chain")
+
+        if v1_output is None:
+            return run_b_chain(task)
+
+        return {
+            "b_chain_v1": v1_output,
+            "b_chain_v2": run_b_chain_v2(task) if is_ffmpeg_capable(v1_output) else None,
+        }
+
+    async def _aanalyze_task(self, task: str, v1_output: Optional[str] = None) -> Dict:
+        rule = self._match_rule(task)
+        if rule is not None:
+            return self._rule_output(rule)
+
+        cached = self._match_template(task)
+        if cached is not None:
+            return cached
+
+        if self.task_mode == "fused":
+            fused = await arun_fused_task(task)
+            if fused is not None:
+                return fused
+            print("\n[Fused] unparsable answer → b_chain")
+
+        if v1_output is None:
+            return await arun_b_chain(task)
+
+        return {
+            "b_chain_v1": v1_output,
+            "b_chain_v2": await arun_b_chain_v2(task) if is_ffmpeg_capable(v1_output) else None,
+        }
+
+    # -------------------------------------------------------
+    # c_chain helpers
+    # -------------------------------------------------------
+    def _media_index(self):
+        return get_media_index() if self.media_index else None
+
+    def _warm_media_index(self) -> None:
+        index = self._media_index()
+        if index is not None:
+            warm = index.warm(self.env["input_video_dir"])
+            print(f"[Media Index] {warm['files']} files ({warm['probing']} probing)")
+
+    def _media_facts(self, task: str, v2_output: Optional[str]) -> Optional[Dict]:
+        """
+        Probed facts of the media files named in the task / b_chain_v2 output
+        (input_video_dir first, then output_dir for earlier task outputs).
+        """
+
+        index = self._media_index()
+        if index is None:
+            return None
+
+        facts = {}
+        for name in dict.fromkeys(MEDIA_FILE_RE.findall(f"{task}\n{v2_output or ''}")):
+            for directory in (self.env["input_video_dir"], self.env["output_dir"]):
+                info = index.get(os.path.join(directory, name))
+                if info is not None:
+                    facts[name] = media_facts(info)
+                    break
+        return facts or None
+
+    def _compile(self, b_output: Dict, compile_state: Dict, idx: int) -> Optional[str]:
+        """
+        Template-compiled command (paths already resolved), or None → c_chain.
+        """
+
+        if not self.compile_commands:
+            return None
+
+        with trace_span("compile", idx) as span:
+            command = compile_ffmpeg_command_string(
+                b_output.get("structured"), self.env, compile_state, idx
+            )
+            span["compiled"] = command is not None
+        return command
+
+    def _pack_context(self, execution_context: Dict) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        (packed context, token report), or (None, None) without compact_context.
+        """
+
+        if not self.compact_context:
+            return None, None
+
+        packed = pack_execution_context(execution_context, self.context_token_budget)
+        return packed, packing_report(execution_context, packed)
+
+    # -------------------------------------------------------
+    # Graph fusion helpers
+    # -------------------------------------------------------
+    # Fusable tasks are compiled one by one as usual (to keep the compile
+    # state), but their execution is held back in a fusion group until a
+    # task that cannot be fused (or the end of the run) flushes it.
+    @staticmethod
+    def _new_fusion() -> Dict:
+        return {"logs": [], "state": None}
+
+    def _hold_for_fusion(self, fusion: Dict, log: Dict, state_before: Optional[Dict]) -> bool:
+        """
+        Add a compiled task to the fusion group (True) or leave it alone (False).
+        """
+
+        if not (self.fuse_graph and log["compiled"] and can_fuse(log["structured"])):
+            return False
+
+        if not fusion["logs"]:
+            fusion["state"] = state_before
+        fusion["logs"].append(log)
+        return True
+
+    def _flush_fusion(self, fusion: Dict, compile_state: Dict) -> List[Tuple[List[Dict], str]]:
+        """
+        Commands for the held tasks: one fused command for the whole group,
+        or the per-task commands if the group cannot be fused.
+
+        Returns:
+            [(logs the command executes, resolved command), ...]
+        """
+
+        logs, state = fusion["logs"], fusion["state"]
+        fusion.update(self._new_fusion())
+
+        if len(logs) > 1:
+            fused_state = copy_compile_state(state)
+            command = compile_fused_command_string(
+                [(log["task_index"], log["structured"]) for log in logs], self.env, fused_state
+            )
+
+            # fused outputs must be the files the per-task commands would write
+            # (a later uncompiled task may have invalidated the state meanwhile)
+            fused_state["unknown"] = compile_state["unknown"]
+            if command is not None and fused_state == compile_state:
+                group = [log["task_index"] for log in logs]
+                for log in logs:
+                    log["fused_group"] = group
+                    log["fused_command"] = command
+
+                print(f"\n[Graph Fusion] tasks {group} → 1 FFmpeg process")
+                print(command)
+                return [(logs, command)]
+
+        return [([log], log["ffmpeg_command"]) for log in logs]
+
+    # -------------------------------------------------------
+    # FFmpeg helpers
+    # -------------------------------------------------------
+    def _base_runner(self):
+        if not self.stream_ffmpeg:
+            runner = run_ffmpeg_command
+        else:
+            # concurrent jobs would interleave their progress lines
+            on_progress = None if self.parallel_ffmpeg else print_progress
+            runner = functools.partial(run_ffmpeg_command_streaming, on_progress=on_progress)
+
+        if self.ffmpeg_slots is None:
+            return runner
+
+        # artifact cache hits never take a slot: only real FFmpeg processes do
+        def limited(command: str) -> Dict:
+            with self.ffmpeg_slots:
+                return runner(command)
+
+        return limited
+
+    def _run_ffmpeg(self, command: str) -> Dict:
+        runner = self._base_runner()
+        if self.chunked_encode:
+            runner = functools.partial(run_chunked_ffmpeg_command, workers=self.chunk_workers, runner=runner)
+        if self.optimize_trims:
+            runner = functools.partial(run_optimized_ffmpeg_command, runner=runner)
+        if self.artifact_cache:
+            runner = functools.partial(run_cached_ffmpeg_command, runner=runner)
+        if self.validate_commands:
+            runner = functools.partial(run_validated_ffmpeg_command, runner=runner)
+        return runner(command)
+
+    def _run_ffmpeg_traced(self, logs: List[Dict], command: str) -> Dict:
+        with trace_span("ffmpeg", logs[-1]["task_index"], tasks=[log["task_index"] for log in logs]) as span:
+            result = self._run_ffmpeg(command)
+            span.update(
+                success=result.get("success"),
+                cache=result.get("artifact_cache"),
+                rejected="validation" in result,
+                chunks=result.get("chunked", {}).get("segments"),
+            )
+        return result
+
+    def _artifact_cache_stats(self) -> Optional[Dict]:
+        cache = get_artifact_cache() if self.artifact_cache else None
+        return cache.stats() if cache is not None else None
+
+    def _run_scheduled(
+            self,
+            scheduled: List[Tuple[List[Dict], str]],
+            journal: Optional[RunJournal] = None,
+    ) -> Optional[Dict]:
+        """
+        Execute deferred (logs, resolved_command) pairs with the DAG scheduler
+        and attach each result to its logs (several logs for a fused command).
+
+        Returns:
+            schedule report (jobs, critical path, wall time) or None
+        """
+
+        if not scheduled:
+            return None
+
+        # report in task indices instead of job positions
+        task_of = [logs[-1]["task_index"] for logs, _ in scheduled]
+
+        schedule = run_ffmpeg_jobs(
+            [command for _, command in scheduled],
+            max_workers=self.ffmpeg_workers,
+            thread_budget=self.ffmpeg_thread_budget,
+            runner=self._run_ffmpeg,
+            task_indices=task_of,
+        )
+
+        for (logs, command), result, job in zip(scheduled, schedule.pop("results"), schedule["jobs"]):
+            for log in logs:
+                log["ffmpeg_result"] = result
+            self._record_ffmpeg(journal, logs, command, result)
+            job["task_index"] = logs[-1]["task_index"]
+            job["deps"] = [task_of[i] for i in job.pop("deps")]
+            del job["index"]
+        schedule["critical_path"] = [task_of[i] for i in schedule["critical_path"]]
+
+        print("\n[FFmpeg Schedule]")
+        for job in schedule["jobs"]:
+            print(
+                f"task {job['task_index']}: after={job['deps']} threads={job['threads']} "
+                f"wall={job['wall_sec']:.2f}s"
+            )
+        print(f"critical path (tasks): {schedule['critical_path']} {schedule['critical_path_sec']:.2f}s")
+        print(f"wall: {schedule['wall_sec']:.2f}s")
+
+        return schedule
+
+    def _llm_task_positions(self, tasks: List[str], journal: Optional[RunJournal] = None) -> List[int]:
+        """
+        Positions of tasks that need the LLM (no fast path rule, not replayed).
+        """
+        return [
+            i for i, task in enumerate(tasks)
+            if self._match_rule(task) is None and self._replayed_b_output(journal, i + 1, task) is None
+        ]
+
+    def _batch_v1_outputs(self, tasks: List[str], journal: Optional[RunJournal] = None) -> List[Optional[str]]:
+        """
+        Batch-classify only the tasks the fast path cannot handle.
+        """
+
+        positions = self._llm_task_positions(tasks, journal)
+        outputs = run_b_chain_v1_batch([tasks[i] for i in positions])
+
+        v1_outputs: List[Optional[str]] = [None] * len(tasks)
+        for i, output in zip(positions, outputs):
+            v1_outputs[i] = output
+        return v1_outputs
+
+    async def _abatch_v1_outputs(self, tasks: List[str], journal: Optional[RunJournal] = None) -> List[Optional[str]]:
+        positions = self._llm_task_positions(tasks, journal)
+        outputs = await arun_b_chain_v1_batch([tasks[i] for i in positions])
+
+        v1_outputs: List[Optional[str]] = [None] * len(tasks)
+        for i, output in zip(positions, outputs):
+            v1_outputs[i] = output
+        return v1_outputs
+
+    def run(self, user_goal: str, journal: Optional[RunJournal] = None):
         """
         Run the full agent pipeline, including FFmpeg execution.
 
+        Every completed stage is appended to the run journal; stages already
+        in `journal` (see resume()) are replayed instead of executed.
+
         Returns:
             {
+              "run_id": str | None,
               "tasks": [...],
-              "execution_logs": [...]
+              "execution_logs": [...],
+              "llm_cache": {...} | None,
+              "task_templates": {...} | None,
+              "media_index": {...} | None,
+              "artifact_cache": {...} | None,
+              "fast_path": {"hits", "total", "hit_rate", "by_rule"},
+              "context_packing": {"tasks", "before", "after", "ratio", "counter"} | None,
+              "ffmpeg_schedule": {...} | None   (parallel_ffmpeg only)
+              "trace": {"summary", "jsonl", "chrome"}  (trace only)
             }
         """
 
+        tracer = self._start_trace()
+        try:
+            result = self._run(user_goal, journal)
+        finally:
+            if tracer is not None:
+                stop_tracing()
+        return self._finish_trace(tracer, result)
+
+    def _run(self, user_goal: str, journal: Optional[RunJournal] = None) -> Dict:
         execution_logs: List[Dict] = []
+        journal = journal or self._new_journal(user_goal)
+        self._warm_media_index()
 
         # ----------------------------------------------------
         # Step 1. a_chain: Goal → Planning → Task DSL
@@ -50,7 +634,15 @@ class FFmpegToyAgent:
         print("[Agent] Running a_chain")
         print("==============================")
 
-        a_result = run_a_chain(user_goal)
+        replayed = self._replayed(journal, "a_chain")
+        if replayed is not None:
+            print("\n[Journal] a_chain replayed")
+            a_result = replayed["a_result"]
+        else:
+            with trace_span("a_chain"):
+                a_result = run_a_chain(user_goal)
+            self._record(journal, "a_chain", a_result=a_result)
+
         task_dsl_text = a_result["task_dsl"]
 
         print("\n[Task DSL]")
@@ -65,64 +657,211 @@ class FFmpegToyAgent:
         for i, t in enumerate(tasks, 1):
             print(f"{i}. {t}")
 
+        # ---- optional: b_chain v1 for all tasks in one request ----
+        if self.batch_classify:
+            v1_outputs = self._batch_v1_outputs(tasks, journal)
+        else:
+            v1_outputs = [None] * len(tasks)
+
         # ----------------------------------------------------
         # Step 3. Per-task execution
         # ----------------------------------------------------
+        compile_state = new_compile_state()
+        fusion = self._new_fusion()
+        scheduled: List[Tuple[List[Dict], str]] = []
+
         for idx, task in enumerate(tasks, 1):
+            current_task_index.set(idx)
 
             print("\n---------------------------------------------")
             print(f"[Agent] Processing task {idx}/{len(tasks)}")
             print(f"[Task] {task}")
             print("---------------------------------------------")
 
-            # ---- b_chain v1 ----
-            v1_output = run_b_chain_v1(task)
+            # ---- b_chain = v1 ⊕ v2 (v2 speculative) ----
+            b_output = self._replayed_b_output(journal, idx, task)
+            if b_output is not None:
+                print("\n[Journal] b_chain replayed")
+            else:
+                with trace_span("b_chain", idx) as span:
+                    b_output = self._analyze_task(task, v1_outputs[idx - 1])
+                    span["fast_path"] = b_output.get("fast_path")
+                self._record(journal, "b_chain", idx, task=task, b_output=b_output)
+            v1_output = b_output["b_chain_v1"]
+            v2_output = b_output["b_chain_v2"]
+
+            if b_output.get("fast_path"):
+                print(f"\n[Fast Path] rule={b_output['fast_path']} (b_chain skipped)")
+            if b_output.get("template"):
+                print(f"\n[Template Cache] {b_output['template']} (b_chain / c_chain skipped)")
 
             print("\n[b_chain_v1 Output]")
             print(v1_output)
 
             # Skip non-executable tasks
-            if "FFmpeg-capable: YES" not in v1_output:
-                execution_logs.append({
+            if not is_ffmpeg_capable(v1_output):
+                log = {
                     "task_index": idx,
                     "task": task,
                     "ffmpeg_capable": False,
+                    "fast_path": b_output.get("fast_path"),
+                    "fused": bool(b_output.get("fused")),
+                    "template": b_output.get("template"),
                     "b_chain_v1": v1_output,
-                })
+                }
+                self._remember_template(log)
+                execution_logs.append(log)
                 continue
 
-            # ---- b_chain v2 ----
-            v2_output = run_b_chain_v2(task)
-
             print("\n[b_chain_v2 Output]")
             print(v2_output)
 
-            # ---- context packing ----
-            execution_context = build_execution_context(
-                task_index=idx,
-                task_text=task,
-                b_chain_v1_output=v1_output,
-                b_chain_v2_output=v2_output,
-            )
+            # ---- template compiler (known operations) ----
+            state_before = copy_compile_state(compile_state) if self.fuse_graph else None
+            # fused / template cache: the command came with the analysis
+            ready_command = b_output.get("ffmpeg_command")
+            ffmpeg_command = ready_command or self._compile(b_output, compile_state, idx)
+            compiled = ffmpeg_command is not None and not ready_command
+            if not compiled:
+                # files of this task are unknown to later compiled concat / per-file steps
+                invalidate_compile_state(compile_state)
+            execution_context = None
+            context_tokens = None
+
+            if ready_command:
+                print("\n[Template FFmpeg Command]" if b_output.get("template") else "\n[Fused FFmpeg Command]")
+                print(ffmpeg_command)
+
+                resolved_command = resolve_paths(ffmpeg_command, self.env)
+
+            elif compiled:
+                print("\n[Compiled FFmpeg Command] (c_chain skipped)")
+                print(ffmpeg_command)
+
+                # paths are resolved by the compiler
+                resolved_command = ffmpeg_command
+
+            else:
+                # ---- context packing ----
+                execution_context = build_execution_context(
+                    task_index=idx,
+                    task_text=task,
+                    b_chain_v1_output=v1_output,
+                    b_chain_v2_output=v2_output,
+                    media=self._media_facts(task, v2_output),
+                )
 
-            print("\n[Execution Context]")
-            print(execution_context)
+                print("\n[Execution Context]")
+                print(execution_context)
 
-            # ---- c_chain ----
-            ffmpeg_command = run_c_chain(execution_context)
+                packed_context, context_tokens = self._pack_context(execution_context)
+                if packed_context is not None:
+                    print(
+                        f"\n[Packed Context] {context_tokens['before']} → {context_tokens['after']} tokens "
+                        f"({context_tokens['counter']})"
+                    )
+                    print(packed_context)
 
-            print("\n[c_chain Output - FFmpeg Command]")
-            print(ffmpeg_command)
+                # ---- c_chain ----
+                replayed = self._replayed(journal, "c_chain", idx)
+                if replayed is not None and replayed["execution_context"] == execution_context:
+                    print("\n[Journal] c_chain replayed")
+                    ffmpeg_command = replayed["ffmpeg_command"]
+                else:
+                    with trace_span("c_chain", idx):
+                        if packed_context is not None:
+                            ffmpeg_command = run_c_chain_compact(packed_context)
+                        else:
+                            ffmpeg_command = run_c_chain(execution_context)
+                    self._record(
+                        journal, "c_chain", idx,
+                        execution_context=execution_context,
+                        ffmpeg_command=ffmpeg_command,
+                    )
 
-            # ---- resolve paths ----
-            resolved_command = resolve_paths(ffmpeg_command, self.env)
+                print("\n[c_chain Output - FFmpeg Command]")
+                print(ffmpeg_command)
+
+                # ---- resolve paths ----
+                resolved_command = resolve_paths(ffmpeg_command, self.env)
 
             print("\n[Resolved FFmpeg Command]")
             print(resolved_command)
 
+            # ---- logging ----
+            log = {
+                "task_index": idx,
+                "task": task,
+                "ffmpeg_capable": True,
+                "fast_path": b_output.get("fast_path"),
+                "fused": bool(b_output.get("fused")),
+                "template": b_output.get("template"),
+                "structured": b_output.get("structured"),
+                "b_chain_v1": v1_output,
+                "b_chain_v2": v2_output,
+                "execution_context": execution_context,
+                "context_tokens": context_tokens,
+                "ffmpeg_command": ffmpeg_command,
+                "compiled": compiled,
+            }
+            self._remember_template(log)
+            execution_logs.append(log)
+
+            # ---- graph fusion: hold compiled tasks until the group ends ----
+            if self._hold_for_fusion(fusion, log, state_before):
+                print("\n[Graph Fusion] held for fusion")
+                continue
+
+            steps = self._flush_fusion(fusion, compile_state) + [([log], resolved_command)]
+            self._execute_steps(steps, scheduled, journal)
+
+        current_task_index.set(None)
+        self._execute_steps(self._flush_fusion(fusion, compile_state), scheduled, journal)
+        schedule = self._run_scheduled(scheduled, journal)
+        self._record(journal, "end", tasks=len(tasks))
+
+        return {
+            "run_id": journal.run_id if journal is not None else None,
+            "tasks": tasks,
+            "execution_logs": execution_logs,
+            "llm_cache": self._llm_cache_stats(),
+            "task_templates": self._task_template_stats(),
+            "media_index": self._media_index_stats(),
+            "artifact_cache": self._artifact_cache_stats(),
+            "fast_path": self._fast_path_stats(execution_logs),
+            "context_packing": self._context_packing_stats(execution_logs),
+            "ffmpeg_schedule": schedule,
+        }
+
+    def _execute_steps(
+            self,
+            steps: List[Tuple[List[Dict], str]],
+            scheduled: List[Tuple[List[Dict], str]],
+            journal: Optional[RunJournal] = None,
+    ) -> None:
+        """
+        Execute (logs, resolved_command) steps in order, or defer them to
+        the scheduler with parallel_ffmpeg.
+        """
+
+        for logs, resolved_command in steps:
+
+            # ---- already executed in an earlier attempt ----
+            replayed = self._replayed_ffmpeg(journal, logs, resolved_command)
+            if replayed is not None:
+                print("\n[Journal] FFmpeg result replayed")
+                for log in logs:
+                    log["ffmpeg_result"] = replayed
+                continue
+
+            # ---- FFmpeg execution (deferred to the scheduler) ----
+            if self.parallel_ffmpeg:
+                scheduled.append((logs, resolved_command))
+                continue
+
             # ---- FFmpeg execution ----
             print("\n[FFmpeg Execution]")
-            exec_result = run_ffmpeg_command(resolved_command)
+            exec_result = self._run_ffmpeg_traced(logs, resolved_command)
 
             print("\n[FFmpeg Result]")
             for k, v in exec_result.items():
@@ -130,23 +869,365 @@ class FFmpegToyAgent:
                 print(v)
                 print("-" * 40)
 
-            # ---- logging ----
-            execution_logs.append({
+            for log in logs:
+                log["ffmpeg_result"] = exec_result
+            self._record_ffmpeg(journal, logs, resolved_command, exec_result)
+
+    def resume(self, run_id: str):
+        """
+        Continue a journaled run: completed stages are replayed from the
+        journal, the first unfinished stage and everything after it run.
+        """
+
+        journal = RunJournal.open(run_id)
+        return self.run(journal.replayed("start")["user_goal"], journal=journal)
+
+    @staticmethod
+    def _fast_path_stats(execution_logs: List[Dict]) -> Dict:
+        return summarize_fast_path([log.get("fast_path") for log in execution_logs])
+
+    @staticmethod
+    def _context_packing_stats(execution_logs: List[Dict]) -> Optional[Dict]:
+        reports = [log["context_tokens"] for log in execution_logs if log.get("context_tokens")]
+        if not reports:
+            return None
+
+        before = sum(r["before"] for r in reports)
+        after = sum(r["after"] for r in reports)
+        return {
+            "tasks": len(reports),
+            "before": before,
+            "after": after,
+            "ratio": after / before if before else None,
+            "counter": reports[0]["counter"],
+        }
+
+    @staticmethod
+    def _llm_cache_stats():
+        cache = get_llm_cache()
+        return cache.stats() if cache is not None else None
+
+    def _media_index_stats(self) -> Optional[Dict]:
+        index = self._media_index()
+        return index.stats() if index is not None else None
+
+    def _task_template_stats(self) -> Optional[Dict]:
+        cache = self._template_cache()
+        return cache.stats() if cache is not None else None
+
+    # -------------------------------------------------------
+    # Async run mode
+    # -------------------------------------------------------
+    async def _aprepare_task(
+            self,
+            idx: int,
+            task: str,
+            semaphore: asyncio.Semaphore,
+            v1_output: Optional[str] = None,
+            journal: Optional[RunJournal] = None,
+    ) -> Dict:
+        """
+        b_chain + context packing + c_chain for a single task (no execution).
+
+        Tasks the template compiler knows are left without a command here:
+        they are compiled in task order by the consumer (file names depend
+        on the tasks before them).
+        """
+
+        # each prepared task runs in its own asyncio task (own context copy)
+        current_task_index.set(idx)
+        queued_at = time.perf_counter()
+
+        async with semaphore:
+            b_output = self._replayed_b_output(journal, idx, task)
+            if b_output is None:
+                with trace_span("b_chain", idx, queue_wait=time.perf_counter() - queued_at) as span:
+                    b_output = await self._aanalyze_task(task, v1_output)
+                    span["fast_path"] = b_output.get("fast_path")
+                self._record(journal, "b_chain", idx, task=task, b_output=b_output)
+            v1_output = b_output["b_chain_v1"]
+            v2_output = b_output["b_chain_v2"]
+
+            if not is_ffmpeg_capable(v1_output):
+                return {
+                    "task_index": idx,
+                    "task": task,
+                    "ffmpeg_capable": False,
+                    "fast_path": b_output.get("fast_path"),
+                    "fused": bool(b_output.get("fused")),
+                    "template": b_output.get("template"),
+                    "b_chain_v1": v1_output,
+                }
+
+            log = {
                 "task_index": idx,
                 "task": task,
                 "ffmpeg_capable": True,
+                "fast_path": b_output.get("fast_path"),
+                "fused": bool(b_output.get("fused")),
+                "template": b_output.get("template"),
+                "structured": b_output.get("structured"),
                 "b_chain_v1": v1_output,
                 "b_chain_v2": v2_output,
-                "execution_context": execution_context,
-                "ffmpeg_command": ffmpeg_command,
-                "ffmpeg_result": exec_result,
-            })
+                "execution_context": None,
+                "context_tokens": None,
+                "ffmpeg_command": b_output.get("ffmpeg_command"),
+                "compiled": False,
+            }
+
+            if log["ffmpeg_command"] is None and not (self.compile_commands and can_compile(log["structured"])):
+                await self._asynthesize(log, journal)
+
+        return log
+
+    async def _asynthesize(self, log: Dict, journal: Optional[RunJournal] = None) -> None:
+        """
+        context packing + c_chain for a prepared task log (in place).
+        """
+
+        log["execution_context"] = build_execution_context(
+            task_index=log["task_index"],
+            task_text=log["task"],
+            b_chain_v1_output=log["b_chain_v1"],
+            b_chain_v2_output=log["b_chain_v2"],
+            # may wait for a background probe of the file
+            media=await asyncio.to_thread(self._media_facts, log["task"], log["b_chain_v2"]),
+        )
+
+        replayed = self._replayed(journal, "c_chain", log["task_index"])
+        if replayed is not None and replayed["execution_context"] == log["execution_context"]:
+            log["ffmpeg_command"] = replayed["ffmpeg_command"]
+            return
+
+        packed_context, log["context_tokens"] = self._pack_context(log["execution_context"])
+
+        with trace_span("c_chain", log["task_index"]):
+            if packed_context is not None:
+                log["ffmpeg_command"] = await arun_c_chain_compact(packed_context)
+            else:
+                log["ffmpeg_command"] = await arun_c_chain(log["execution_context"])
+        self._record(
+            journal, "c_chain", log["task_index"],
+            execution_context=log["execution_context"],
+            ffmpeg_command=log["ffmpeg_command"],
+        )
+
+    async def _aiter_tasks(
+            self,
+            user_goal: str,
+            a_result: Dict,
+            stream_tasks: bool,
+            journal: Optional[RunJournal] = None,
+    ) -> AsyncIterator[Tuple[str, Optional[str]]]:
+        """
+        a_chain + task_parser as an async source of (task, b_chain v1 output).
+
+        v1 output is None unless batch classification is enabled
+        (batch mode needs the whole task list, so it is never streamed).
+        A journaled a_chain result is replayed instead of streamed.
+        """
+
+        replayed = self._replayed(journal, "a_chain")
+
+        if replayed is None and stream_tasks and not self.batch_classify:
+            async for task in aiter_task_dsl(astream_a_chain(user_goal, a_result)):
+                yield task, None
+            self._record(journal, "a_chain", a_result=dict(a_result))
+            return
+
+        if replayed is not None:
+            a_result.update(replayed["a_result"])
+        else:
+            with trace_span("a_chain"):
+                a_result.update(await arun_a_chain(user_goal))
+            self._record(journal, "a_chain", a_result=dict(a_result))
+        tasks = parse_task_dsl(a_result["task_dsl"])
+
+        if self.batch_classify:
+            v1_outputs = await self._abatch_v1_outputs(tasks, journal)
+        else:
+            v1_outputs = [None] * len(tasks)
+
+        for task, v1_output in zip(tasks, v1_outputs):
+            yield task, v1_output
+
+    async def arun(
+            self,
+            user_goal: str,
+            max_concurrency: Optional[int] = None,
+            stream_tasks: bool = True,
+            journal: Optional[RunJournal] = None,
+    ):
+        """
+        Async variant of run().
+
+        All tasks are analyzed (b_chain) and synthesized (c_chain) concurrently,
+        at most `max_concurrency` at a time. FFmpeg commands are still executed
+        one by one in task order, because later tasks (e.g. concat) consume
+        files produced by earlier ones (or, with parallel_ffmpeg, as a DAG
+        once every command is known).
+
+        With stream_tasks=True (ignored when batch_classify is on), a_chain2 is streamed and each task is handed
+        to b_chain as soon as the parser closes it, so task 1 can be executed
+        while later tasks are still being generated.
+        (streamed a_chain2 output is not served from the LLM cache)
+
+        Returns:
+            same structure as run(); execution_logs are in task order.
+        """
+
+        tracer = self._start_trace()
+        try:
+            result = await self._arun(user_goal, max_concurrency, stream_tasks, journal)
+        finally:
+            if tracer is not None:
+                stop_tracing()
+        return self._finish_trace(tracer, result)
+
+    async def _arun(
+            self,
+            user_goal: str,
+            max_concurrency: Optional[int] = None,
+            stream_tasks: bool = True,
+            journal: Optional[RunJournal] = None,
+    ) -> Dict:
+        limit = max_concurrency or self.max_concurrency
+        semaphore = asyncio.Semaphore(limit)
+        journal = journal or self._new_journal(user_goal)
+        self._warm_media_index()
+
+        started_at = time.perf_counter()
+        first_ffmpeg_at: Optional[float] = None
+
+        tasks: List[str] = []
+        a_result: Dict = {}
+        execution_logs: List[Dict] = []
+        compile_state = new_compile_state()
+        fusion = self._new_fusion()
+        scheduled: List[Tuple[List[Dict], str]] = []
+
+        async def execute(steps: List[Tuple[List[Dict], str]]) -> None:
+            for logs, resolved_command in steps:
+                result = self._replayed_ffmpeg(journal, logs, resolved_command)
+
+                if result is None:
+                    if self.parallel_ffmpeg:
+                        scheduled.append((logs, resolved_command))
+                        continue
+
+                    result = await asyncio.to_thread(self._run_ffmpeg_traced, logs, resolved_command)
+                    self._record_ffmpeg(journal, logs, resolved_command, result)
+
+                for log in logs:
+                    log["ffmpeg_result"] = result
+
+        # futures of prepared tasks, in task order (None = end of task stream)
+        queue: asyncio.Queue = asyncio.Queue()
+        pending: List[asyncio.Task] = []
+
+        # ---- producer: a_chain → tasks → b_chain / c_chain fan-out ----
+        async def produce():
+            try:
+                async for task, v1_output in self._aiter_tasks(user_goal, a_result, stream_tasks, journal):
+                    tasks.append(task)
+                    future = asyncio.create_task(
+                        self._aprepare_task(len(tasks), task, semaphore, v1_output, journal)
+                    )
+                    pending.append(future)
+                    queue.put_nowait(future)
+            finally:
+                queue.put_nowait(None)
+
+        producer = asyncio.create_task(produce())
+
+        # ---- consumer: execute in task order as soon as each task is ready ----
+        try:
+            while True:
+                future = await queue.get()
+                if future is None:
+                    break
+
+                log = await future
+                current_task_index.set(log["task_index"])
+
+                if log["ffmpeg_capable"]:
+                    state_before = copy_compile_state(compile_state) if self.fuse_graph else None
+
+                    if log["ffmpeg_command"] is None:
+                        compiled_command = self._compile(log, compile_state, log["task_index"])
+                        if compiled_command is not None:
+                            log["ffmpeg_command"] = compiled_command
+                            log["compiled"] = True
+                        else:
+                            # known operation, but not compilable here (e.g. no clips yet)
+                            await self._asynthesize(log, journal)
+
+                    if not log["compiled"]:
+                        invalidate_compile_state(compile_state)
+
+                    if first_ffmpeg_at is None:
+                        first_ffmpeg_at = time.perf_counter() - started_at
+
+                    if log["compiled"]:
+                        resolved_command = log["ffmpeg_command"]
+                    else:
+                        resolved_command = resolve_paths(log["ffmpeg_command"], self.env)
+
+                    if not self._hold_for_fusion(fusion, log, state_before):
+                        await execute(self._flush_fusion(fusion, compile_state) + [([log], resolved_command)])
+
+                print(
+                    f"[Agent] task {log['task_index']} "
+                    f"capable={log['ffmpeg_capable']} "
+                    f"success={log.get('ffmpeg_result', {}).get('success')}"
+                )
+
+                self._remember_template(log)
+                execution_logs.append(log)
+
+            # re-raise a_chain / parsing errors
+            await producer
+
+            await execute(self._flush_fusion(fusion, compile_state))
+        finally:
+            producer.cancel()
+            for future in pending:
+                future.cancel()
+
+        schedule = await asyncio.to_thread(self._run_scheduled, scheduled, journal)
+        self._record(journal, "end", tasks=len(tasks))
+
+        print(f"[Agent] {len(tasks)} tasks (max_concurrency={limit})")
 
         return {
+            "run_id": journal.run_id if journal is not None else None,
             "tasks": tasks,
             "execution_logs": execution_logs,
+            "llm_cache": self._llm_cache_stats(),
+            "task_templates": self._task_template_stats(),
+            "media_index": self._media_index_stats(),
+            "artifact_cache": self._artifact_cache_stats(),
+            "fast_path": self._fast_path_stats(execution_logs),
+            "context_packing": self._context_packing_stats(execution_logs),
+            "ffmpeg_schedule": schedule,
+            "timing": {
+                "total_sec": time.perf_counter() - started_at,
+                "first_ffmpeg_sec": first_ffmpeg_at,
+            },
         }
 
+    async def aresume(self, run_id: str, max_concurrency: Optional[int] = None):
+        """
+        Async variant of resume().
+        """
+
+        journal = RunJournal.open(run_id)
+        return await self.arun(
+            journal.replayed("start")["user_goal"],
+            max_concurrency=max_concurrency,
+            journal=journal,
+        )
+
 
 # -----------------------------------------------------------
 # Execution
@@ -1,10 +1,15 @@
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
+import asyncio
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
+from agent.chain_registry import register_chain, get_chain, invoke_chain, ainvoke_chain
 from configs.llm import get_llm
+from utils.llm_retry import invoke_with_retry, ainvoke_with_retry
 from prompts.b_chain_prompts import (
     B_CHAIN_TASK_INTERPRET_PROMPT,
     B_CHAIN_STRUCTURED_PROMPT,
+    B_CHAIN_BATCH_INTERPRET_PROMPT,
 )
 
 # ------------------------------------------------------------
@@ -18,6 +23,9 @@ def build_b_chain_v1():
       → FFmpeg-oriented task interpretation
     """
 
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
 
     prompt = ChatPromptTemplate.from_messages(
@@ -31,12 +39,140 @@ def build_b_chain_v1():
     return chain
 
 
+register_chain("b_chain_v1", build_b_chain_v1)
+
+
 def run_b_chain_v1(task: str) -> str:
     """
     Interpret a single task and return FFmpeg-oriented meaning.
     """
-    chain = build_b_chain_v1()
-    return chain.invoke({"task": task})
+    return invoke_chain("b_chain_v1", {"task": task})
+
+
+async def arun_b_chain_v1(task: str) -> str:
+    """
+    Async counterpart of run_b_chain_v1 (uses ainvoke).
+    """
+    return await ainvoke_chain("b_chain_v1", {"task": task})
+
+
+# ------------------------------------------------------------
+# b_chain v1 (batch): Task list → per-index interpretation
+# ------------------------------------------------------------
+_BATCH_LINE_RE = re.compile(
+    r"^\s*\[(\d+)\]\s*FFmpeg-capable:\s*(YES|NO)\b\s*\|?\s*(.*)$",
+    re.IGNORECASE,
+)
+
+
+def build_b_chain_v1_batch():
+    """
+    b_chain v1 (batch):
+    numbered task list
+      → LLM (one request, system prompt sent once)
+      → one interpretation line per task
+    """
+
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_llm()
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", B_CHAIN_BATCH_INTERPRET_PROMPT),
+            ("human", "{tasks}"),
+        ]
+    )
+
+    chain = prompt | llm | StrOutputParser()
+    return chain
+
+
+register_chain("b_chain_v1_batch", build_b_chain_v1_batch)
+
+
+def parse_b_chain_v1_batch(batch_output: str, n_tasks: int) -> Dict[int, str]:
+    """
+    Split a batch interpretation into per-task b_chain v1 outputs.
+
+    Each parsed line is rewritten into the single-task v1 format
+    ("FFmpeg-capable: ...\nOperation type: ...\nRequired information: ..."),
+    so downstream code cannot tell batch and per-task results apart.
+
+    Returns:
+        {task_index (1-based): v1_output}; indices that are missing,
+        duplicated or out of range are left out.
+    """
+
+    parsed: Dict[int, str] = {}
+    duplicated = set()
+
+    for line in batch_output.splitlines():
+        match = _BATCH_LINE_RE.match(line)
+        if not match:
+            continue
+
+        idx = int(match.group(1))
+        if not 1 <= idx <= n_tasks:
+            continue
+        if idx in parsed:
+            duplicated.add(idx)
+            continue
+
+        fields = [f"FFmpeg-capable: {match.group(2).upper()}"]
+        fields += [part.strip() for part in match.group(3).split("|") if part.strip()]
+        parsed[idx] = "\n".join(fields)
+
+    for idx in duplicated:
+        del parsed[idx]
+
+    return parsed
+
+
+def _format_task_list(tasks: List[str]) -> str:
+    return "\n".join(f"{i}. {task}" for i, task in enumerate(tasks, 1))
+
+
+def run_b_chain_v1_batch(tasks: List[str]) -> List[str]:
+    """
+    Interpret all tasks with a single LLM request.
+
+    Tasks whose line is missing or unparseable fall back to run_b_chain_v1.
+    """
+
+    if not tasks:
+        return []
+
+    parsed = parse_b_chain_v1_batch(
+        invoke_chain("b_chain_v1_batch", {"tasks": _format_task_list(tasks)}), len(tasks)
+    )
+
+    return [
+        parsed[idx] if idx in parsed else run_b_chain_v1(task)
+        for idx, task in enumerate(tasks, 1)
+    ]
+
+
+async def arun_b_chain_v1_batch(tasks: List[str]) -> List[str]:
+    """
+    Async counterpart of run_b_chain_v1_batch (fallbacks run concurrently).
+    """
+
+    if not tasks:
+        return []
+
+    parsed = parse_b_chain_v1_batch(
+        await ainvoke_chain("b_chain_v1_batch", {"tasks": _format_task_list(tasks)}), len(tasks)
+    )
+
+    missing = [idx for idx in range(1, len(tasks) + 1) if idx not in parsed]
+    fallbacks = await asyncio.gather(
+        *(arun_b_chain_v1(tasks[idx - 1]) for idx in missing)
+    )
+    parsed.update(zip(missing, fallbacks))
+
+    return [parsed[idx] for idx in range(1, len(tasks) + 1)]
 
 
 # ------------------------------------------------------------
@@ -50,6 +186,9 @@ def build_b_chain_v2():
       → LLM-generated structured representation (DSL-free)
     """
 
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
 
     prompt = ChatPromptTemplate.from_messages(
@@ -63,6 +202,9 @@ def build_b_chain_v2():
     return chain
 
 
+register_chain("b_chain_v2", build_b_chain_v2)
+
+
 def run_b_chain_v2(task: str) -> str:
     """
     Generate a structured representation for a single FFmpeg-capable task.
@@ -71,10 +213,101 @@ def run_b_chain_v2(task: str) -> str:
     - No schema is enforced
     - Output is used only for observation
     """
-    chain = build_b_chain_v2()
+    return invoke_chain("b_chain_v2", {"task": task})
+
+
+async def arun_b_chain_v2(task: str) -> str:
+    """
+    Async counterpart of run_b_chain_v2 (uses ainvoke).
+    """
+    return await ainvoke_chain("b_chain_v2", {"task": task})
+
+
+# ------------------------------------------------------------
+# b_chain = b_chain_v1 ⊕ b_chain_v2 (speculative parallel branch)
+# ------------------------------------------------------------
+def is_ffmpeg_capable(v1_output: str) -> bool:
+    """
+    Capability verdict of a b_chain v1 output.
+    """
+    return "FFmpeg-capable: YES" in v1_output
+
+
+def build_b_chain():
+    """
+    b_chain:
+    human-oriented task
+      → (b_chain_v1 ⊕ b_chain_v2)
+      → {"b_chain_v1": str, "b_chain_v2": Optional[str]}
+
+    v1 and v2 are launched at the same time.
+    v2 is speculative: if v1 says the task is NOT FFmpeg-capable,
+    the in-flight v2 call is cancelled and its result is dropped.
+    """
+
+    from langchain_core.runnables import RunnableLambda
+
+    b_chain_v1 = get_chain("b_chain_v1")
+    b_chain_v2 = get_chain("b_chain_v2")
+
+    def _invoke(inputs, config) -> Dict[str, Optional[str]]:
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            v1_future = pool.submit(invoke_with_retry, b_chain_v1, inputs, config)
+            v2_future = pool.submit(invoke_with_retry, b_chain_v2, inputs, config)
+
+            v1_output = v1_future.result()
+
+            if not is_ffmpeg_capable(v1_output):
+                # a running thread cannot be interrupted; the result is just dropped
+                v2_future.cancel()
+                return {"b_chain_v1": v1_output, "b_chain_v2": None}
+
+            return {"b_chain_v1": v1_output, "b_chain_v2": v2_future.result()}
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    async def _ainvoke(inputs, config) -> Dict[str, Optional[str]]:
+        v2_task = asyncio.ensure_future(ainvoke_with_retry(b_chain_v2, inputs, config))
+        try:
+            v1_output = await ainvoke_with_retry(b_chain_v1, inputs, config)
+        except BaseException:
+            v2_task.cancel()
+            raise
+
+        if not is_ffmpeg_capable(v1_output):
+            v2_task.cancel()
+            return {"b_chain_v1": v1_output, "b_chain_v2": None}
+
+        return {"b_chain_v1": v1_output, "b_chain_v2": await v2_task}
+
+    return RunnableLambda(_invoke, afunc=_ainvoke, name="b_chain")
+
+
+register_chain("b_chain", build_b_chain)
+
+
+def run_b_chain(task: str) -> Dict[str, Optional[str]]:
+    """
+    Run v1 and v2 in parallel for a single task.
+
+    Returns:
+        {"b_chain_v1": str, "b_chain_v2": Optional[str]}
+        (b_chain_v2 is None for non-FFmpeg-capable tasks)
+    """
+    # no retry around the composite: v1 / v2 retry on their own
+    chain = get_chain("b_chain")
     return chain.invoke({"task": task})
 
 
+async def arun_b_chain(task: str) -> Dict[str, Optional[str]]:
+    """
+    Async counterpart of run_b_chain (v2 is actually cancelled on NO).
+    """
+    chain = get_chain("b_chain")
+    return await chain.ainvoke({"task": task})
+
+
 # ------------------------------------------------------------
 # Execution
 # ------------------------------------------------------------
@@ -90,10 +323,11 @@ if __name__ == "__main__":
         print("\n===== TASK =====")
         print(t)
 
+        b_out = run_b_chain(t)
+
         print("\n--- b_chain_v1 OUTPUT ---")
-        v1_out = run_b_chain_v1(t)
-        print(v1_out)
+        print(b_out["b_chain_v1"])
 
-        if "FFmpeg-capable: YES" in v1_out:
+        if b_out["b_chain_v2"] is not None:
             print("\n--- b_chain_v2 OUTPUT ---")
-            print(run_b_chain_v2(t))
+            print(b_out["b_chain_v2"])
@@ -0,0 +1,232 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set
+
+from agent.agent_runner import FFmpegToyAgent
+from utils.llm_retry import retry_stats
+from utils.rate_governor import get_rate_governor
+
+
+# ------------------------------------------------------------
+# Batch goal runner
+# ------------------------------------------------------------
+# Runs many goals concurrently in one process. All agents share
+# - the LLM rate governor (utils/rate_governor): RPM / TPM over all chains
+# - one FFmpeg slot semaphore: at most `ffmpeg_workers` FFmpeg processes
+#
+# goals JSONL, one goal per line:
+#   {"id": "shorts-001", "goal": "...", "input_video_dir": "...", "output_dir": "..."}
+#   id defaults to the line number, output_dir to <output_root>/<id>
+#
+# results JSONL, one line per goal as soon as it finishes (completion order):
+#   {"id", "status": "ok" | "failed" | "error", "run_id", "tasks",
+#    "ffmpeg_ok", "ffmpeg_failed", "wall_sec", "error"}
+#   failed = some FFmpeg command failed; error = the run raised
+
+def read_goals(path: str) -> List[Dict[str, Any]]:
+    goals = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+
+            goal = json.loads(line)
+            if isinstance(goal, str):
+                goal = {"goal": goal}
+            goal.setdefault("id", f"{line_no:04d}")
+            goals.append(goal)
+
+    return goals
+
+
+def completed_goal_ids(results_path: str) -> Set[str]:
+    """
+    Goals already finished successfully in an earlier batch run.
+    """
+
+    done: Set[str] = set()
+    if not os.path.exists(results_path):
+        return done
+
+    with open(results_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line of an interrupted batch
+            if record.get("status") == "ok":
+                done.add(str(record["id"]))
+
+    return done
+
+
+def summarize_result(goal: Dict[str, Any], result: Dict[str, Any], wall_sec: float) -> Dict[str, Any]:
+    executed = [
+        log.get("ffmpeg_result", {}) for log in result["execution_logs"]
+        if log.get("ffmpeg_capable")
+    ]
+    ffmpeg_ok = sum(1 for r in executed if r.get("success"))
+
+    return {
+        "id": goal["id"],
+        "status": "ok" if ffmpeg_ok == len(executed) else "failed",
+        "run_id": result.get("run_id"),
+        "tasks": len(result["tasks"]),
+        "ffmpeg_ok": ffmpeg_ok,
+        "ffmpeg_failed": len(executed) - ffmpeg_ok,
+        "wall_sec": wall_sec,
+        "error": None,
+    }
+
+
+async def arun_batch(
+        goals: List[Dict[str, Any]],
+        results_path: str,
+        concurrency: int = 4,
+        ffmpeg_workers: Optional[int] = None,
+        rpm: Optional[int] = None,
+        tpm: Optional[int] = None,
+        env: Optional[Dict[str, str]] = None,
+        agent_options: Optional[Dict[str, Any]] = None,
+        skip_completed: bool = True,
+) -> Dict[str, Any]:
+    """
+    Run `goals` with at most `concurrency` agents at a time and append one
+    result line per goal to `results_path` as it finishes.
+
+    Args:
+        env: default input_video_dir / output_dir (output_dir is the root of
+            the per-goal output directories)
+        agent_options: FFmpegToyAgent keyword arguments
+        skip_completed: skip goals with an "ok" line in results_path already
+
+    Returns:
+        {"goals", "skipped", "ok", "failed", "error", "wall_sec", "rate_governor", "llm_retry"}
+    """
+
+    governor = get_rate_governor()
+    governor.configure(rpm=rpm, tpm=tpm)
+
+    ffmpeg_workers = ffmpeg_workers or max(1, (os.cpu_count() or 2) // 2)
+    ffmpeg_slots = threading.BoundedSemaphore(ffmpeg_workers)
+    env = env or FFmpegToyAgent().env
+
+    done = completed_goal_ids(results_path) if skip_completed else set()
+    pending = [goal for goal in goals if str(goal["id"]) not in done]
+    counts = {"ok": 0, "failed": 0, "error": 0}
+
+    semaphore = asyncio.Semaphore(concurrency)
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    started_at = time.perf_counter()
+
+    with open(results_path, "a", encoding="utf-8") as out:
+
+        async def run_goal(goal: Dict[str, Any]) -> None:
+            async with semaphore:
+                agent = FFmpegToyAgent(**(agent_options or {}), ffmpeg_slots=ffmpeg_slots)
+                agent.env = {
+                    "input_video_dir": goal.get("input_video_dir", env["input_video_dir"]),
+                    "output_dir": goal.get("output_dir", os.path.join(env["output_dir"], str(goal["id"]))),
+                }
+
+                start = time.perf_counter()
+                try:
+                    result = await agent.arun(goal["goal"])
+                    record = summarize_result(goal, result, time.perf_counter() - start)
+                except Exception as e:
+                    record = {
+                        "id": goal["id"],
+                        "status": "error",
+                        "run_id": None,
+                        "wall_sec": time.perf_counter() - start,
+                        "error": f"{type(e).__name__}: {e}",
+                    }
+
+            # written from the event loop thread only: no lock needed
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            counts[record["status"]] += 1
+
+            print(
+                f"[Batch] {goal['id']}: {record['status']} "
+                f"({sum(counts.values())}/{len(pending)}, {record['wall_sec']:.1f}s)",
+                file=sys.stderr,
+            )
+
+        await asyncio.gather(*(run_goal(goal) for goal in pending))
+
+    return {
+        "goals": len(goals),
+        "skipped": len(goals) - len(pending),
+        **counts,
+        "wall_sec": time.perf_counter() - started_at,
+        "rate_governor": governor.stats(),
+        "llm_retry": retry_stats(),
+    }
+
+
+def run_batch(*args, **kwargs) -> Dict[str, Any]:
+    """
+    Sync wrapper of arun_batch().
+    """
+    return asyncio.run(arun_batch(*args, **kwargs))
+
+
+def main(argv: Optional[List[str]] = None) -> Dict[str, Any]:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of editing goals")
+    parser.add_argument("goals", help="goals JSONL")
+    parser.add_argument("-o", "--output", default="batch_results.jsonl", help="results JSONL (appended)")
+    parser.add_argument("--concurrency", type=int, default=4, help="agents running at once")
+    parser.add_argument("--ffmpeg-workers", type=int, default=None, help="FFmpeg processes at once")
+    parser.add_argument("--rpm", type=int, default=None, help="LLM requests per minute (default: LLM_RPM)")
+    parser.add_argument("--tpm", type=int, default=None, help="LLM tokens per minute (default: LLM_TPM)")
+    parser.add_argument("--input-dir", default=None, help="default input_video_dir")
+    parser.add_argument("--output-root", default=None, help="per-goal output directories go here")
+    parser.add_argument("--fuse-graph", action="store_true")
+    parser.add_argument("--parallel-ffmpeg", action="store_true")
+    parser.add_argument("--chunked-encode", action="store_true", help="split long re-encodes across cores")
+    parser.add_argument("--task-mode", choices=["chains", "fused"], default="chains")
+    parser.add_argument("--rerun", action="store_true", help="also run goals already finished ok")
+    parser.add_argument("--verbose", action="store_true", help="keep the agents' console output")
+    args = parser.parse_args(argv)
+
+    env = FFmpegToyAgent().env
+    env["input_video_dir"] = args.input_dir or env["input_video_dir"]
+    env["output_dir"] = args.output_root or env["output_dir"]
+
+    # concurrent agents would interleave their logs: keep only the [Batch] lines (stderr)
+    with open(os.devnull, "w") as devnull, \
+            (contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(devnull)):
+        summary = run_batch(
+            read_goals(args.goals),
+            args.output,
+            concurrency=args.concurrency,
+            ffmpeg_workers=args.ffmpeg_workers,
+            rpm=args.rpm,
+            tpm=args.tpm,
+            env=env,
+            agent_options={
+                "fuse_graph": args.fuse_graph,
+                "parallel_ffmpeg": args.parallel_ffmpeg,
+                "task_mode": args.task_mode,
+                "chunked_encode": args.chunked_encode,
+            },
+            skip_completed=not args.rerun,
+        )
+
+    print(json.dumps(summary, indent=2))
+    return summary
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,8 @@
 from typing import Dict, Any
 
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-
+from agent.chain_registry import register_chain, invoke_chain, ainvoke_chain
 from configs.llm import get_llm
-from prompts.c_chain_prompts import C_CHAIN_EXECUTION_PROMPT
+from prompts.c_chain_prompts import C_CHAIN_EXECUTION_PROMPT, C_CHAIN_COMPACT_PROMPT
 
 # ------------------------------------------------------------
 # c_chain: Execution Context → FFmpeg command
@@ -17,6 +15,9 @@ def build_c_chain():
       → FFmpeg command (string)
     """
 
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
     llm = get_llm()
 
     prompt = ChatPromptTemplate.from_messages(
@@ -30,6 +31,37 @@ def build_c_chain():
     return chain
 
 
+register_chain("c_chain", build_c_chain)
+
+
+# ------------------------------------------------------------
+# c_chain (compact): packed JSON context → FFmpeg command
+# ------------------------------------------------------------
+def build_c_chain_compact():
+    """
+    c_chain with the compact context (utils/context_packing.pack_execution_context)
+    sent once, in the human turn only.
+    """
+
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_llm()
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", C_CHAIN_COMPACT_PROMPT),
+            ("human", "{packed_context}"),
+        ]
+    )
+
+    chain = prompt | llm | StrOutputParser()
+    return chain
+
+
+register_chain("c_chain_compact", build_c_chain_compact)
+
+
 # ------------------------------------------------------------
 # Public API
 # ------------------------------------------------------------
@@ -45,11 +77,43 @@ def run_c_chain(execution_context: Dict[str, Any]) -> str:
         str: FFmpeg command
     """
 
-    chain = build_c_chain()
-
     # context를 문자열로 그대로 전달
-    return chain.invoke(
-        {"execution_context": execution_context}
+    return invoke_chain(
+        "c_chain",
+        {"execution_context": execution_context},
+    )
+
+
+async def arun_c_chain(execution_context: Dict[str, Any]) -> str:
+    """
+    Async counterpart of run_c_chain (uses ainvoke).
+    """
+
+    return await ainvoke_chain(
+        "c_chain",
+        {"execution_context": execution_context},
+    )
+
+
+def run_c_chain_compact(packed_context: str) -> str:
+    """
+    Generate an FFmpeg command from a packed (compact JSON) execution context.
+    """
+
+    return invoke_chain(
+        "c_chain_compact",
+        {"packed_context": packed_context},
+    )
+
+
+async def arun_c_chain_compact(packed_context: str) -> str:
+    """
+    Async counterpart of run_c_chain_compact (uses ainvoke).
+    """
+
+    return await ainvoke_chain(
+        "c_chain_compact",
+        {"packed_context": packed_context},
     )
 
 
@@ -57,6 +121,7 @@ def run_c_chain(execution_context: Dict[str, Any]) -> str:
 # Execution
 # ------------------------------------------------------------
 if __name__ == "__main__":
+    from utils.context_packing import pack_execution_context, packing_report
 
     example_context = {
         "task_index": 6,
@@ -82,3 +147,11 @@ if __name__ == "__main__":
 
     print("\n===== GENERATED FFmpeg COMMAND =====")
     print(cmd)
+
+    packed = pack_execution_context(example_context)
+    print("\n===== PACKED CONTEXT =====")
+    print(packed)
+    print(packing_report(example_context, packed))
+
+    print("\n===== GENERATED FFmpeg COMMAND (compact) =====")
+    print(run_c_chain_compact(packed))
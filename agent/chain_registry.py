@@ -0,0 +1,96 @@
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List
+
+from utils.llm_retry import ainvoke_with_retry, astream_with_retry, invoke_with_retry
+
+
+# ------------------------------------------------------------
+# Process-wide chain registry
+# ------------------------------------------------------------
+# Chains are stateless runnables, so each one is built exactly once
+# (prompt template + ChatOpenAI client) and then shared by every task.
+# Chain modules register their builders at import time; run_* functions
+# fetch the prebuilt instance with get_chain(name).
+#
+# Every built chain runs under its registry name with the tracing callback
+# attached (utils/trace_callbacks), so LLM spans are attributed to the
+# registered stage (a_chain, b_chain_v1, c_chain, ...).
+#
+# Model calls go through invoke_chain / ainvoke_chain / astream_chain, which
+# retry rate limits and timeouts with backoff (utils/llm_retry).
+#
+# LangChain is only imported when the first chain is built, so code that
+# never calls a model (journal replay, validation, listing runs) starts fast.
+
+_builders: Dict[str, Callable[[], Any]] = {}
+_chains: Dict[str, Any] = {}
+_lock = threading.RLock()  # builders may fetch sub-chains (b_chain)
+
+
+def register_chain(name: str, builder: Callable[[], Any]) -> None:
+    """
+    Register a chain builder under `name` (e.g. "b_chain_v1").
+    """
+    _builders[name] = builder
+
+
+def get_chain(name: str):
+    """
+    Return the prebuilt chain registered under `name`, building it on first use.
+    """
+
+    chain = _chains.get(name)
+    if chain is not None:
+        return chain
+
+    with _lock:
+        chain = _chains.get(name)
+        if chain is None:
+            if name not in _builders:
+                raise KeyError(f"Unknown chain: {name}")
+
+            from utils.trace_callbacks import TRACING_HANDLER
+
+            chain = _builders[name]().with_config(
+                run_name=name,
+                callbacks=[TRACING_HANDLER],
+            )
+            TRACING_HANDLER.stages.add(name)
+            _chains[name] = chain
+
+    return chain
+
+
+def invoke_chain(name: str, inputs: Dict[str, Any], config=None):
+    """
+    chain.invoke with retry, for chains that make a single model call.
+    """
+    return invoke_with_retry(get_chain(name), inputs, config)
+
+
+async def ainvoke_chain(name: str, inputs: Dict[str, Any], config=None):
+    return await ainvoke_with_retry(get_chain(name), inputs, config)
+
+
+def astream_chain(name: str, inputs: Dict[str, Any], config=None) -> AsyncIterator[Any]:
+    return astream_with_retry(get_chain(name), inputs, config)
+
+
+def registered_chains() -> List[str]:
+    return sorted(_builders)
+
+
+def prebuild_chains() -> None:
+    """
+    Build every registered chain up front (e.g. before a batch of runs).
+    """
+    for name in registered_chains():
+        get_chain(name)
+
+
+def clear_chains() -> None:
+    """
+    Drop all prebuilt chains (e.g. after changing the LLM configuration).
+    """
+    with _lock:
+        _chains.clear()
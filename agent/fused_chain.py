@@ -0,0 +1,132 @@
+import json
+import os
+import re
+from typing import Any, Dict, Optional
+
+from agent.chain_registry import register_chain, invoke_chain, ainvoke_chain
+from configs.llm import get_llm
+from prompts.fused_prompts import FUSED_TASK_PROMPT
+
+# upper bound on the answer (verdict + structured task + command)
+FUSED_MAX_TOKENS = int(os.getenv("FUSED_MAX_TOKENS", "400"))
+
+
+# ------------------------------------------------------------
+# fused_chain: Task → verdict + structured task + FFmpeg command
+# ------------------------------------------------------------
+def build_fused_chain():
+    """
+    fused_chain (single request per task, replaces b_chain v1 + v2 + c_chain):
+    human-oriented task
+      → LLM (JSON mode, max_tokens capped)
+      → {"ffmpeg_capable", "operation_type", "required_information",
+         "reason", "structured", "ffmpeg_command"}
+    """
+
+    from langchain_core.output_parsers import StrOutputParser
+    from langchain_core.prompts import ChatPromptTemplate
+
+    llm = get_llm().bind(
+        max_tokens=FUSED_MAX_TOKENS,
+        response_format={"type": "json_object"},
+    )
+
+    prompt = ChatPromptTemplate.from_messages(
+        [
+            ("system", FUSED_TASK_PROMPT),
+            ("human", "{task}"),
+        ]
+    )
+
+    chain = prompt | llm | StrOutputParser()
+    return chain
+
+
+register_chain("fused_chain", build_fused_chain)
+
+
+# ------------------------------------------------------------
+# Output → b_chain-compatible result
+# ------------------------------------------------------------
+def parse_fused_output(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Parse the JSON answer; None if it is not a usable object
+    (e.g. cut off by max_tokens).
+    """
+
+    text = re.sub(r"^```(?:json)?|```$", "", text.strip(), flags=re.MULTILINE).strip()
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+    if not isinstance(data, dict) or not isinstance(data.get("ffmpeg_capable"), bool):
+        return None
+    if data["ffmpeg_capable"] and not str(data.get("ffmpeg_command") or "").strip():
+        return None
+
+    return data
+
+
+def to_b_output(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Same shape as run_b_chain() (+ "ffmpeg_command"), so logs, the run
+    journal and is_ffmpeg_capable() work unchanged.
+    """
+
+    if not data["ffmpeg_capable"]:
+        return {
+            "b_chain_v1": f"FFmpeg-capable: NO\nReason: {data.get('reason') or 'not executable by FFmpeg'}",
+            "b_chain_v2": None,
+            "ffmpeg_command": None,
+            "fused": True,
+        }
+
+    return {
+        "b_chain_v1": (
+            "FFmpeg-capable: YES\n"
+            f"Operation type: {data.get('operation_type') or ''}\n"
+            f"Required information: {data.get('required_information') or ''}"
+        ),
+        "b_chain_v2": json.dumps(data.get("structured"), ensure_ascii=False),
+        "ffmpeg_command": str(data["ffmpeg_command"]).strip(),
+        "fused": True,
+    }
+
+
+# ------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------
+def run_fused_task(task: str) -> Optional[Dict[str, Any]]:
+    """
+    Analyze a task and generate its command with one request.
+
+    Returns:
+        b_chain-compatible dict (see to_b_output), or None if the answer
+        could not be parsed (caller falls back to the three-chain path)
+    """
+
+    data = parse_fused_output(invoke_chain("fused_chain", {"task": task}))
+    return to_b_output(data) if data is not None else None
+
+
+async def arun_fused_task(task: str) -> Optional[Dict[str, Any]]:
+    """
+    Async counterpart of run_fused_task (uses ainvoke).
+    """
+
+    data = parse_fused_output(await ainvoke_chain("fused_chain", {"task": task}))
+    return to_b_output(data) if data is not None else None
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    for task in [
+        "Add a short fade-in effect to the beginning of clip 1.",
+        "Upload the final video to YouTube.",
+    ]:
+        print(f"\n===== {task} =====")
+        print(json.dumps(run_fused_task(task), indent=2, ensure_ascii=False))
@@ -0,0 +1,105 @@
+import os
+import statistics
+import sys
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-placeholder")
+os.environ.setdefault("LLM_CACHE", "0")
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent.a_chain import build_a_chain1, build_a_chain2
+from agent.b_chain import build_b_chain_v1, build_b_chain_v2, build_b_chain
+from agent.c_chain import build_c_chain
+from agent.chain_registry import get_chain, clear_chains
+
+# ------------------------------------------------------------
+# Chain construction overhead: rebuild-per-call vs. registry
+# ------------------------------------------------------------
+# No request is sent; this measures only what run_* used to pay before
+# every .invoke() (prompt template + ChatOpenAI + HTTP client setup).
+# Savings from connection / TLS session reuse come on top of this and
+# can only be observed against the real API.
+
+N_TASKS = 20
+REPEATS = 5
+
+
+def _per_run_builds():
+    """
+    Chain builds needed by one sequential run of N_TASKS tasks
+    (a_chain1, a_chain2, then b_chain v1+v2 and c_chain per task).
+    """
+    builds = [("a_chain1", build_a_chain1), ("a_chain2", build_a_chain2)]
+    for _ in range(N_TASKS):
+        builds += [
+            ("b_chain_v1", build_b_chain_v1),
+            ("b_chain_v2", build_b_chain_v2),
+            ("c_chain", build_c_chain),
+        ]
+    return builds
+
+
+def bench_rebuild() -> float:
+    start = time.perf_counter()
+    for _, builder in _per_run_builds():
+        builder()
+    return time.perf_counter() - start
+
+
+def bench_rebuild_fresh_http_client() -> float:
+    """
+    Rebuild per call AND a fresh HTTP client per chain
+    (what happens when clients are not pooled: new TCP/TLS per chain).
+    """
+    start = time.perf_counter()
+    for _, builder in _per_run_builds():
+        builder()
+        httpx.Client().close()
+    return time.perf_counter() - start
+
+
+def bench_registry() -> float:
+    clear_chains()
+    start = time.perf_counter()
+    for name, _ in _per_run_builds():
+        get_chain(name)
+    return time.perf_counter() - start
+
+
+def main():
+    # warm-up (imports, pydantic model compilation)
+    build_b_chain()
+    bench_rebuild()
+
+    results = {
+        "rebuild per call": [bench_rebuild() for _ in range(REPEATS)],
+        "rebuild + fresh http client": [bench_rebuild_fresh_http_client() for _ in range(REPEATS)],
+        "chain registry": [bench_registry() for _ in range(REPEATS)],
+    }
+
+    n_calls = len(_per_run_builds())
+    lines = [f"===== chain construction overhead ({N_TASKS} tasks, {n_calls} chain calls) ====="]
+    for label, samples in results.items():
+        median = statistics.median(samples)
+        lines.append(
+            f"{label:<30} total {median * 1000:8.2f} ms   per call {median / n_calls * 1e6:8.1f} us"
+        )
+
+    saved = statistics.median(results["rebuild per call"]) - statistics.median(results["chain registry"])
+    lines.append(f"saved per {N_TASKS}-task run: {saved * 1000:.2f} ms")
+
+    report = "\n".join(lines)
+    print(report)
+
+    with open("bench_output.txt", "a", encoding="utf-8") as f:
+        f.write(report + "\n\n")
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_ffmpeg import install_stubs
+from tools.chunked_encoder import plan_chunked_encode, run_chunked_ffmpeg_command
+from tools.ffmpeg_executor import run_ffmpeg_command
+from tools.media_index import MediaIndex
+
+# ------------------------------------------------------------
+# Chunked vs single-process encoding benchmark
+# ------------------------------------------------------------
+# Encodes one long source at several core counts:
+#   single   one FFmpeg process with -threads N
+#   chunked  N keyframe-aligned segments in parallel (tools/chunked_encoder)
+#
+# --ffmpeg real generates a testsrc2 + sine source with the installed FFmpeg;
+# --ffmpeg fake uses benchmarks/fake_ffmpeg, whose runtime models x264
+# thread scaling (FAKE_ENCODE_SPEED / FAKE_THREAD_PARALLEL). "auto" picks
+# real when ffmpeg is on PATH.
+
+COMMAND = (
+    "ffmpeg -y -i {source} -vf scale=720:1280 -c:v libx264 -preset {preset} -crf 20 "
+    "-pix_fmt yuv420p -c:a aac -b:a 192k -movflags +faststart -threads {threads} {output}"
+)
+
+
+def make_source(path: str, duration: float) -> None:
+    """
+    Long test source with a keyframe every 2 seconds (real FFmpeg only).
+    """
+
+    subprocess.run(
+        [
+            "ffmpeg", "-y", "-v", "error",
+            "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate=30:duration={duration}",
+            "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+            "-c:v", "libx264", "-preset", "veryfast", "-g", "60", "-pix_fmt", "yuv420p",
+            "-c:a", "aac", "-shortest", path,
+        ],
+        check=True,
+    )
+
+
+def bench_cores(cores: int, source: str, workdir: str, index: MediaIndex, args) -> Dict:
+    def _command(name: str) -> str:
+        return COMMAND.format(source=source, preset=args.preset, threads=cores,
+                              output=os.path.join(workdir, f"{name}_{cores}.mp4"))
+
+    start = time.perf_counter()
+    single = run_ffmpeg_command(_command("single"))
+    single_sec = time.perf_counter() - start
+
+    plan = plan_chunked_encode(_command("chunked"), index, workers=cores)
+    start = time.perf_counter()
+    chunked = run_chunked_ffmpeg_command(_command("chunked"), index, workers=cores)
+    chunked_sec = time.perf_counter() - start
+
+    return {
+        "cores": cores,
+        "single_sec": single_sec,
+        "chunked_sec": chunked_sec,
+        "segments": len(plan["segments"]),
+        "mode": plan["mode"],
+        "success": single["success"] and chunked["success"],
+    }
+
+
+def format_result(r: Dict) -> List[str]:
+    return [
+        f"--- cores={r['cores']:<3} single {r['single_sec']:8.2f}s   "
+        f"chunked {r['chunked_sec']:8.2f}s ({r['mode']}, {r['segments']} segments)   "
+        f"speedup {r['single_sec'] / r['chunked_sec']:5.2f}x   ok {r['success']}"
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chunked parallel encoding benchmark")
+    parser.add_argument("--cores", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=300.0, help="source length in seconds")
+    parser.add_argument("--ffmpeg", choices=["auto", "real", "fake"], default="auto")
+    parser.add_argument("--preset", default="medium", help="x264 preset of the benchmarked encode")
+    parser.add_argument("--encode-speed", type=float, default=20.0,
+                        help="fake: realtime factor of a one-thread encode")
+    parser.add_argument("--thread-parallel", type=float, default=0.8,
+                        help="fake: parallel fraction of one encode (Amdahl)")
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+
+    real = args.ffmpeg == "real" or (args.ffmpeg == "auto" and shutil.which("ffmpeg") is not None)
+
+    workdir = tempfile.mkdtemp(prefix="bench_chunked_")
+    try:
+        source = os.path.join(workdir, "source.mp4")
+        if real:
+            make_source(source, args.duration)
+        else:
+            install_stubs(os.path.join(workdir, "bin"))
+            os.environ["PATH"] = os.path.join(workdir, "bin") + os.pathsep + os.environ["PATH"]
+            os.environ["FAKE_MEDIA_DURATION"] = str(args.duration)
+            os.environ["FAKE_ENCODE_SPEED"] = str(args.encode_speed)
+            os.environ["FAKE_THREAD_PARALLEL"] = str(args.thread_parallel)
+            with open(source, "wb") as f:
+                f.write(b"\0" * 4096)
+
+        index = MediaIndex(os.path.join(workdir, "media_index.sqlite"))
+
+        lines = [
+            f"===== chunked encode ({'real' if real else 'fake'} FFmpeg, "
+            f"{args.duration:.0f}s source, preset {args.preset}) ====="
+        ]
+        for cores in args.cores:
+            block = format_result(bench_cores(cores, source, workdir, index, args))
+            print("\n".join(block), flush=True)
+            lines += block
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n\n")
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    main()
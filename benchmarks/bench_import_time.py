@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ------------------------------------------------------------
+# Cold import time of the CLI entry points
+# ------------------------------------------------------------
+# Every sample is a fresh interpreter, so nothing is cached in sys.modules.
+# "light" modules back the commands that never call a model (main.py startup,
+# validate, runs, journal replay); they must not load a provider SDK.
+# The exit code is 1 when a light module loads one or exceeds --max-ms,
+# so the script can gate CI against import-time regressions.
+
+# (module, light)
+TARGETS = [
+    ("main", True),
+    ("configs.llm", True),
+    ("utils.run_journal", True),
+    ("tools.command_validator", True),
+    ("agent.agent_runner", True),
+    ("agent.batch_runner", False),
+    ("langchain_openai", False),
+]
+
+HEAVY_MODULES = ("langchain_core", "langchain_openai", "langsmith", "openai", "httpx", "pydantic", "dotenv")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+sec = time.perf_counter() - start
+heavy = sorted({{name.split(".")[0] for name in sys.modules}} & set({heavy!r}))
+print(json.dumps({{"sec": sec, "heavy": heavy}}))
+"""
+
+
+def measure(module: str, repeats: int) -> Dict:
+    samples, heavy = [], []
+    for _ in range(repeats):
+        process = subprocess.run(
+            [sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY_MODULES)],
+            cwd=PROJECT_ROOT,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            check=True,
+        )
+        sample = json.loads(process.stdout.strip().splitlines()[-1])
+        samples.append(sample["sec"])
+        heavy = sample["heavy"]
+
+    return {"module": module, "median_sec": statistics.median(samples), "max_sec": max(samples), "heavy": heavy}
+
+
+def format_result(r: Dict, light: bool, failed: bool) -> List[str]:
+    return [
+        f"--- {r['module']:<26} median {r['median_sec'] * 1000:8.1f} ms   max {r['max_sec'] * 1000:8.1f} ms   "
+        f"{'light' if light else 'heavy'}   loads {', '.join(r['heavy']) or '-'}"
+        + ("   FAIL" if failed else "")
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold import time of the CLI entry points")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--max-ms", type=float, default=300.0, help="budget of a light module (median)")
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+
+    lines = [f"===== import time ({args.repeats} fresh interpreters per module) ====="]
+    failures = 0
+    for module, light in TARGETS:
+        result = measure(module, args.repeats)
+        failed = light and (bool(result["heavy"]) or result["median_sec"] * 1000 > args.max_ms)
+        failures += failed
+
+        block = format_result(result, light, failed)
+        print("\n".join(block), flush=True)
+        lines += block
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n\n")
+
+    return 1 if failures else 0
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,245 @@
+import argparse
+import asyncio
+import contextlib
+import functools
+import inspect
+import io
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-bench-placeholder")
+os.environ["LLM_CACHE"] = "0"
+os.environ["ARTIFACT_CACHE"] = "0"
+os.environ["TASK_TEMPLATE_CACHE"] = "0"
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import agent_runner
+from agent.agent_runner import FFmpegToyAgent
+from agent.chain_registry import clear_chains
+from benchmarks.fake_ffmpeg import install_stubs
+from benchmarks.fake_llm import FakeChatModel, fake_call_stats, reset_fake_call_stats
+from configs.llm import set_llm_factory
+
+# ------------------------------------------------------------
+# Offline end-to-end pipeline benchmark (fake LLM + fake FFmpeg)
+# ------------------------------------------------------------
+# Measures the orchestration cost of the agent: every model call goes to
+# benchmarks/fake_llm.FakeChatModel (fixed latency + token throughput) and
+# every FFmpeg / ffprobe process is the benchmarks/fake_ffmpeg stub.
+
+MODES: Dict[str, Callable[[], Callable[[FFmpegToyAgent, str], Dict]]] = {
+    "sequential": lambda: (FFmpegToyAgent(), lambda agent, goal: agent.run(goal)),
+    "async": lambda: (FFmpegToyAgent(), lambda agent, goal: asyncio.run(agent.arun(goal))),
+    "async_parallel": lambda: (
+        FFmpegToyAgent(parallel_ffmpeg=True),
+        lambda agent, goal: asyncio.run(agent.arun(goal)),
+    ),
+    "async_fused": lambda: (
+        FFmpegToyAgent(fuse_graph=True),
+        lambda agent, goal: asyncio.run(agent.arun(goal)),
+    ),
+    # one fused request per LLM-path task instead of b_chain v1 + v2 + c_chain
+    "sequential_single_call": lambda: (
+        FFmpegToyAgent(task_mode="fused"),
+        lambda agent, goal: agent.run(goal),
+    ),
+    "async_single_call": lambda: (
+        FFmpegToyAgent(task_mode="fused"),
+        lambda agent, goal: asyncio.run(agent.arun(goal)),
+    ),
+}
+
+# (module or class, attribute, stage name)
+STAGES = [
+    (agent_runner, "run_a_chain", "a_chain"),
+    (agent_runner, "arun_a_chain", "a_chain"),
+    (agent_runner, "astream_a_chain", "a_chain"),
+    (agent_runner, "parse_task_dsl", "parse_task_dsl"),
+    (FFmpegToyAgent, "_analyze_task", "b_chain"),
+    (FFmpegToyAgent, "_aanalyze_task", "b_chain"),
+    (agent_runner, "build_execution_context", "build_execution_context"),
+    (agent_runner, "run_c_chain", "c_chain"),
+    (agent_runner, "arun_c_chain", "c_chain"),
+    (agent_runner, "run_c_chain_compact", "c_chain"),
+    (agent_runner, "arun_c_chain_compact", "c_chain"),
+    (agent_runner, "run_fused_task", "fused_chain"),
+    (agent_runner, "arun_fused_task", "fused_chain"),
+    (agent_runner, "compile_ffmpeg_command_string", "compile"),
+    (FFmpegToyAgent, "_run_ffmpeg", "ffmpeg"),
+]
+
+
+class StageTimer:
+    """
+    Wraps pipeline functions to collect per-call wall times by stage.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self._originals = []
+
+    def _add(self, stage: str, seconds: float) -> None:
+        self.samples.setdefault(stage, []).append(seconds)
+
+    def _wrap(self, func, stage: str):
+        if inspect.isasyncgenfunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                async for item in func(*args, **kwargs):
+                    yield item
+                self._add(stage, time.perf_counter() - start)
+
+        elif inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self._add(stage, time.perf_counter() - start)
+
+        else:
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self._add(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    def __enter__(self):
+        for owner, name, stage in STAGES:
+            original = getattr(owner, name)
+            self._originals.append((owner, name, original))
+            setattr(owner, name, self._wrap(original, stage))
+        return self
+
+    def __exit__(self, *exc):
+        for owner, name, original in reversed(self._originals):
+            setattr(owner, name, original)
+        self._originals.clear()
+
+
+def _percentile(samples: List[float], q: float) -> float:
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[q - 1]
+
+
+def bench_once(mode: str, n_tasks: int, workdir: str, args) -> Dict:
+    set_llm_factory(lambda: FakeChatModel(
+        n_tasks=n_tasks,
+        latency=args.llm_latency,
+        tokens_per_sec=args.llm_tps,
+    ))
+    clear_chains()
+    reset_fake_call_stats()
+
+    agent, run = MODES[mode]()
+    agent.env = {
+        "input_video_dir": os.path.join(workdir, "input"),
+        "output_dir": os.path.join(workdir, "output"),
+    }
+    goal = f"Make a YouTube Shorts video from {n_tasks} highlight tasks."
+
+    timer = StageTimer()
+    tracemalloc.start()
+    start = time.perf_counter()
+    with timer, contextlib.redirect_stdout(io.StringIO()):
+        result = run(agent, goal)
+    wall = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    logs = result["execution_logs"]
+    calls = fake_call_stats()
+    return {
+        "mode": mode,
+        "tasks": n_tasks,
+        "wall_sec": wall,
+        "throughput": n_tasks / wall,
+        "peak_mb": peak / (1024 * 1024),
+        "llm_calls": calls["count"],
+        "input_tokens": calls["input_tokens"],
+        "output_tokens": calls["output_tokens"],
+        "ffmpeg_ok": sum(1 for log in logs if log.get("ffmpeg_result", {}).get("success")),
+        "stages": timer.samples,
+    }
+
+
+def format_result(r: Dict) -> List[str]:
+    lines = [
+        f"--- {r['mode']:<22} tasks={r['tasks']:<4} wall {r['wall_sec']:8.2f}s  "
+        f"{r['throughput']:7.2f} tasks/s  peak {r['peak_mb']:7.2f} MiB  "
+        f"llm calls {r['llm_calls']:<4} ffmpeg ok {r['ffmpeg_ok']}",
+        f"    {'llm tokens':<24} in {r['input_tokens']:<8} out {r['output_tokens']:<8} "
+        f"total {r['input_tokens'] + r['output_tokens']}",
+    ]
+    for stage, samples in r["stages"].items():
+        lines.append(
+            f"    {stage:<24} n={len(samples):<5} "
+            f"p50 {_percentile(samples, 50) * 1000:9.2f} ms   "
+            f"p95 {_percentile(samples, 95) * 1000:9.2f} ms   "
+            f"total {sum(samples):8.2f} s"
+        )
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline agent pipeline benchmark")
+    parser.add_argument("--tasks", type=int, nargs="+", default=[5, 50, 500])
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES))
+    parser.add_argument("--llm-latency", type=float, default=0.02, help="seconds to first token")
+    parser.add_argument("--llm-tps", type=float, default=800.0, help="output tokens per second")
+    parser.add_argument("--ffmpeg-sec", type=float, default=0.02, help="runtime of one fake FFmpeg process")
+    parser.add_argument("--output", default="bench_output.txt")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_pipeline_")
+    try:
+        install_stubs(os.path.join(workdir, "bin"))
+        os.environ["PATH"] = os.path.join(workdir, "bin") + os.pathsep + os.environ["PATH"]
+        os.environ["FAKE_FFMPEG_SEC"] = str(args.ffmpeg_sec)
+        os.environ["RUN_JOURNAL_DIR"] = os.path.join(workdir, "runs")
+        os.environ["MEDIA_INDEX_PATH"] = os.path.join(workdir, "media_index.sqlite")
+
+        os.makedirs(os.path.join(workdir, "input"))
+        for i in range(1, max(args.tasks) + 1):
+            with open(os.path.join(workdir, "input", f"mv_{i:03d}.mp4"), "wb") as f:
+                f.write(b"\0" * 4096)
+
+        lines = [
+            "===== agent pipeline (fake LLM: "
+            f"{args.llm_latency * 1000:.0f} ms + {args.llm_tps:.0f} tok/s, "
+            f"fake FFmpeg: {args.ffmpeg_sec * 1000:.0f} ms) ====="
+        ]
+        for n_tasks in args.tasks:
+            for mode in args.modes:
+                result = bench_once(mode, n_tasks, workdir, args)
+                block = format_result(result)
+                print("\n".join(block), flush=True)
+                lines += block
+    finally:
+        set_llm_factory(None)
+        clear_chains()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.output, "a", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n\n")
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    main()
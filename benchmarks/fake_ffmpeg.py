@@ -0,0 +1,152 @@
+import json
+import os
+import sys
+import time
+from typing import Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools.ffmpeg_args import parse_time, scan_io
+
+
+# ------------------------------------------------------------
+# FFmpeg / ffprobe stub (offline benchmarks)
+# ------------------------------------------------------------
+# Installed on PATH by install_stubs(). It writes every output file,
+# emits -progress blocks when asked and takes FAKE_FFMPEG_SEC seconds.
+# As ffprobe it reports FAKE_MEDIA_DURATION seconds of 1080x1920 30 fps
+# h264 video with a keyframe every 2 seconds, plus a 48 kHz stereo AAC track.
+#
+# With FAKE_ENCODE_SPEED set, video re-encodes take (output seconds) /
+# (FAKE_ENCODE_SPEED x thread speedup) instead, where the speedup of
+# -threads N follows Amdahl's law with FAKE_THREAD_PARALLEL as the
+# parallel fraction (x264 scaling flattens out with more threads).
+
+STUB = os.path.abspath(__file__)
+
+
+def install_stubs(bin_dir: str) -> None:
+    """
+    Write `ffmpeg` / `ffprobe` launchers for this stub into `bin_dir`
+    (prepend it to PATH to use them).
+    """
+
+    os.makedirs(bin_dir, exist_ok=True)
+
+    for name, extra in (("ffmpeg", ""), ("ffprobe", " --ffprobe")):
+        if os.name == "nt":
+            with open(os.path.join(bin_dir, f"{name}.bat"), "w", encoding="utf-8") as f:
+                f.write(f'@"{sys.executable}" "{STUB}"{extra} %*\n')
+        else:
+            path = os.path.join(bin_dir, name)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(f'#!/bin/sh\nexec "{sys.executable}" "{STUB}"{extra} "$@"\n')
+            os.chmod(path, 0o755)
+
+
+def _ffprobe(args) -> int:
+    duration = float(os.getenv("FAKE_MEDIA_DURATION", "60"))
+    print(json.dumps({
+        "format": {"duration": str(duration), "format_name": "mov,mp4,m4a,3gp,3g2,mj2", "bit_rate": "4000000"},
+        "streams": [
+            {"index": 0, "codec_type": "video", "codec_name": "h264", "pix_fmt": "yuv420p", "profile": "High",
+             "width": 1080, "height": 1920, "avg_frame_rate": "30/1", "r_frame_rate": "30/1"},
+            {"index": 1, "codec_type": "audio", "codec_name": "aac", "sample_rate": "48000", "channels": 2},
+        ],
+        "packets": [
+            {"stream_index": 0, "pts_time": f"{t:.6f}", "flags": "K__" if t % 2 == 0 else "___"}
+            for t in range(int(duration))
+        ],
+    }))
+    return 0
+
+
+# answers of `ffmpeg -filters` / `-encoders` / `-codecs` (tools/command_validator)
+FILTERS = (
+    "afade", "amix", "anull", "aresample", "asetpts", "atrim", "boxblur", "colortemperature",
+    "concat", "crop", "drawtext", "eq", "fade", "format", "fps", "gblur", "hflip", "loudnorm",
+    "null", "overlay", "pad", "scale", "setpts", "setsar", "split", "transpose", "trim", "volume",
+)
+ENCODERS = (("V", "libx264"), ("V", "libx265"), ("V", "mpeg4"), ("V", "png"),
+            ("A", "aac"), ("A", "libmp3lame"), ("A", "libopus"), ("A", "pcm_s16le"))
+# (flags, codec): E = an encoder exists for the codec
+CODECS = (("DEV.LS", "h264"), ("DEV.L.", "hevc"), ("DEV.L.", "mpeg4"), ("DEV.LS", "png"),
+          ("DEA.L.", "aac"), ("DEA.L.", "mp3"), ("DEA.L.", "opus"), ("DEA..S", "pcm_s16le"),
+          ("D.V.L.", "vp6"))
+
+
+def _value(args, name: str) -> Optional[str]:
+    for i, token in enumerate(args[:-1]):
+        if token == name:
+            return args[i + 1]
+    return None
+
+
+def _encode_sec(args) -> float:
+    """
+    Runtime of one FFmpeg process under the encode speed model.
+    """
+
+    default = float(os.getenv("FAKE_FFMPEG_SEC", "0.02"))
+    speed = float(os.getenv("FAKE_ENCODE_SPEED", "0"))
+    if not speed or "-vn" in args or _value(args, "-c") == "copy" or _value(args, "-c:v") == "copy":
+        return default
+
+    seconds = parse_time(_value(args, "-t") or "")
+    if seconds is None:
+        seek = parse_time(_value(args, "-ss") or "") or 0.0
+        seconds = float(os.getenv("FAKE_MEDIA_DURATION", "60")) - seek
+    threads = int(_value(args, "-threads") or os.cpu_count() or 1)
+    parallel = float(os.getenv("FAKE_THREAD_PARALLEL", "0.8"))
+    speedup = 1.0 / ((1.0 - parallel) + parallel / threads)
+    return seconds / (speed * speedup)
+
+
+def _ffmpeg(args) -> int:
+    if "-version" in args:
+        print("ffmpeg version fake-benchmark")
+        return 0
+    if "-filters" in args:
+        print("Filters:\n  T.. = Timeline support\n  .S. = Slice threading\n  ..C = Command support")
+        for name in FILTERS:
+            print(f" T.. {name:<18} V->V       {name} filter")
+        return 0
+    if "-encoders" in args:
+        print("Encoders:\n V..... = Video\n A..... = Audio\n ------")
+        for kind, name in ENCODERS:
+            print(f" {kind}....D {name:<20} {name} encoder")
+        return 0
+    if "-codecs" in args:
+        print("Codecs:\n D..... = Decoding supported\n .E.... = Encoding supported\n -------")
+        for flags, name in CODECS:
+            print(f" {flags} {name:<20} {name} codec")
+        return 0
+
+    runtime = _encode_sec(args)
+    progress = "-progress" in args
+
+    steps = 4
+    for step in range(1, steps + 1):
+        time.sleep(runtime / steps)
+        if progress:
+            print(
+                f"frame={step * 30}\nfps=120.0\nout_time_us={step * 1_000_000}\n"
+                f"speed=4.0x\nprogress={'end' if step == steps else 'continue'}",
+                flush=True,
+            )
+
+    print("fake ffmpeg: encoding done", file=sys.stderr)
+
+    for _, path in scan_io(["ffmpeg", *args])["outputs"]:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"\0" * 4096)
+    return 0
+
+
+if __name__ == "__main__":
+    argv = sys.argv[1:]
+    if argv[:1] == ["--ffprobe"]:
+        sys.exit(_ffprobe(argv[1:]))
+    sys.exit(_ffmpeg(argv))
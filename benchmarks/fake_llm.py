@@ -0,0 +1,200 @@
+import asyncio
+import json
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+
+# ------------------------------------------------------------
+# Deterministic fake chat model (offline benchmarks)
+# ------------------------------------------------------------
+# Replies are chosen from the system prompt of each chain, so every chain
+# of the pipeline gets a well-formed answer. Timing model:
+#   latency (time to first token) + output tokens / tokens_per_sec
+# Output tokens are approximated as len(text) / 4.
+
+_CALLS = {"count": 0, "input_tokens": 0, "output_tokens": 0}
+_CALLS_LOCK = threading.Lock()
+
+
+def scenario_tasks(n_tasks: int) -> List[str]:
+    """
+    A Shorts-style task list of `n_tasks` tasks:
+    clip extractions (rule fast path), a fade every 7th task (LLM path),
+    then scale / concat / loudnorm / upload.
+    """
+
+    if n_tasks >= 8:
+        tail = [
+            "Scale all clips to 1080x1920.",
+            "Concatenate the extracted clips in the given order.",
+            "Normalize the audio loudness of the final video.",
+            "Upload the final video to YouTube.",
+        ]
+    else:
+        tail = [
+            "Concatenate the extracted clips in the given order.",
+            "Upload the final video to YouTube.",
+        ]
+
+    body = []
+    for i in range(1, max(0, n_tasks - len(tail)) + 1):
+        if i % 7 == 0:
+            body.append(f"Add a short fade-in effect to clip {i - 1}.")
+        else:
+            start = 10 + i % 40
+            body.append(
+                f"Extract the highlight segment from mv_{i:03d}.mp4 "
+                f"from 00:{start:02d} to 00:{start + 12:02d}."
+            )
+
+    return (body + tail)[:n_tasks]
+
+
+def fake_call_stats() -> Dict[str, int]:
+    with _CALLS_LOCK:
+        return dict(_CALLS)
+
+
+def reset_fake_call_stats() -> None:
+    with _CALLS_LOCK:
+        _CALLS.update(count=0, input_tokens=0, output_tokens=0)
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Chat model double for the agent chains (a_chain, b_chain, c_chain, fused_chain).
+    """
+
+    n_tasks: int = 6
+    latency: float = 0.02
+    tokens_per_sec: float = 800.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    # --------------------------------------------------------
+    # Replies
+    # --------------------------------------------------------
+    def _reply(self, messages: List[BaseMessage]) -> str:
+        system, human = str(messages[0].content), str(messages[-1].content)
+
+        if "in a single response" in system:
+            return self._fused(human)
+
+        if "video editing planning agent" in system:
+            return (
+                "1. Extract every requested highlight segment.\n"
+                "2. Normalize the clips to the Shorts format.\n"
+                "3. Join the clips, balance the audio and publish."
+            )
+
+        if "converts an editing plan into executable tasks" in system:
+            return "\n".join(f"{i}. {task}" for i, task in enumerate(scenario_tasks(self.n_tasks), 1))
+
+        if "exactly one line per task" in system:
+            lines = []
+            for match in re.finditer(r"^\s*\[?(\d+)[\].]\s*(.+)$", human, re.MULTILINE):
+                index, task = match.groups()
+                lines.append(f"[{index}] " + self._v1(task).replace("\n", " | "))
+            return "\n".join(lines)
+
+        if "interprets video editing tasks" in system:
+            return self._v1(human)
+
+        if "converts a single video editing task" in system:
+            return json.dumps({"operation": "fade", "type": "in", "duration": 0.5})
+
+        if "generates FFmpeg command" in system:
+            return "ffmpeg -i mv_001.mp4 -vf fade=t=in:st=0:d=0.5 -c:a copy output.mp4"
+
+        return "OK"
+
+    @staticmethod
+    def _v1(task: str) -> str:
+        if re.search(r"\bupload\b", task, re.IGNORECASE):
+            return "FFmpeg-capable: NO\nReason: requires a human action"
+        return "FFmpeg-capable: YES\nOperation type: Video filter\nRequired information: input clip"
+
+    @staticmethod
+    def _fused(task: str) -> str:
+        if re.search(r"\bupload\b", task, re.IGNORECASE):
+            return json.dumps({"ffmpeg_capable": False, "reason": "requires a human action"})
+        return json.dumps({
+            "ffmpeg_capable": True,
+            "operation_type": "Video filter",
+            "required_information": "input clip",
+            "structured": {"operation": "fade", "type": "in", "duration": 0.5},
+            "ffmpeg_command": "ffmpeg -i mv_001.mp4 -vf fade=t=in:st=0:d=0.5 -c:a copy output.mp4",
+        })
+
+    @staticmethod
+    def _usage(messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        input_tokens = sum(len(str(m.content)) for m in messages) // 4
+        output_tokens = max(1, len(text) // 4)
+        return {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+
+    def _delay(self, messages: List[BaseMessage], text: str) -> float:
+        usage = self._usage(messages, text)
+        with _CALLS_LOCK:
+            _CALLS["count"] += 1
+            _CALLS["input_tokens"] += usage["input_tokens"]
+            _CALLS["output_tokens"] += usage["output_tokens"]
+        return self.latency + usage["output_tokens"] / self.tokens_per_sec
+
+    # --------------------------------------------------------
+    # BaseChatModel API
+    # --------------------------------------------------------
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        time.sleep(self._delay(messages, text))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        text = self._reply(messages)
+        await asyncio.sleep(self._delay(messages, text))
+        message = AIMessage(content=text, usage_metadata=self._usage(messages, text))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(
+            self,
+            messages,
+            stop=None,
+            run_manager=None,
+            **kwargs: Any,
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        text = self._reply(messages)
+        self._delay(messages, text)
+
+        await asyncio.sleep(self.latency)
+        for line in text.splitlines(keepends=True):
+            await asyncio.sleep(max(1, len(line) // 4) / self.tokens_per_sec)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=line))
+
+        # usage arrives with the last chunk, as with OpenAI stream_usage
+        yield ChatGenerationChunk(message=AIMessageChunk(content="", usage_metadata=self._usage(messages, text)))
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    from prompts.a_chain_prompts import A_CHAIN_TASK_PROMPT
+
+    model = FakeChatModel(n_tasks=10)
+    reply = model.invoke([SystemMessage(content=A_CHAIN_TASK_PROMPT), HumanMessage(content="plan")])
+    print(reply.content)
+    print(fake_call_stats())
@@ -1,18 +1,148 @@
 import os
-from dotenv import load_dotenv
-load_dotenv()
 
-from langchain_openai import ChatOpenAI
+from prompts import PROMPT_VERSION
+
+# python-dotenv, httpx, langchain_openai and the LangChain-based cache / rate
+# governor are imported on first use: importing this module (every chain
+# module does) must not load the provider SDKs. .env is loaded by the getters
+# below, before they read their environment.
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_llm_cache = None
+_http_clients = None
+_llm_factory = None
+_env_loaded = False
+
+
+def load_env() -> None:
+    """
+    Load .env into the environment (once; variables already set win).
+    """
+
+    global _env_loaded
+
+    if not _env_loaded:
+        from dotenv import load_dotenv
+
+        load_dotenv()
+        _env_loaded = True
+
+
+def get_llm_cache():
+    """
+    Process-wide persistent LLM response cache.
+
+    Environment:
+        LLM_CACHE=0                 disable caching
+        LLM_CACHE_PATH              SQLite file (default: .cache/llm_cache.sqlite)
+        LLM_CACHE_MAX_ENTRIES       LRU entry limit
+        LLM_CACHE_MAX_MB            LRU size limit
+        LLM_CACHE_TTL_DAYS          entry lifetime
+    """
+
+    global _llm_cache
+
+    load_env()
+    if os.getenv("LLM_CACHE", "1") == "0":
+        return None
+
+    if _llm_cache is None:
+        from utils.llm_cache import SQLiteLLMCache
+
+        _llm_cache = SQLiteLLMCache(
+            path=os.getenv(
+                "LLM_CACHE_PATH",
+                os.path.join(PROJECT_ROOT, ".cache", "llm_cache.sqlite"),
+            ),
+            namespace=PROMPT_VERSION,
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000")),
+            max_bytes=int(float(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("LLM_CACHE_TTL_DAYS", "30")) * 24 * 3600,
+        )
+
+    return _llm_cache
+
+
+def get_http_clients():
+    """
+    One pooled (keep-alive) HTTP client pair shared by every ChatOpenAI instance,
+    so connections and TLS sessions are reused across chains and tasks.
+
+    Environment:
+        LLM_HTTP_MAX_CONNECTIONS    total pool size
+        LLM_HTTP_MAX_KEEPALIVE      idle keep-alive connections
+        LLM_HTTP_KEEPALIVE_EXPIRY   idle connection lifetime (seconds)
+        LLM_HTTP_TIMEOUT            request timeout (seconds)
+    """
+
+    global _http_clients
+
+    load_env()
+    if _http_clients is None:
+        import httpx
+
+        limits = httpx.Limits(
+            max_connections=int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "32")),
+            max_keepalive_connections=int(os.getenv("LLM_HTTP_MAX_KEEPALIVE", "16")),
+            keepalive_expiry=float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "60")),
+        )
+        timeout = httpx.Timeout(float(os.getenv("LLM_HTTP_TIMEOUT", "60")), connect=10.0)
+
+        _http_clients = (
+            httpx.Client(limits=limits, timeout=timeout),
+            httpx.AsyncClient(limits=limits, timeout=timeout),
+        )
+
+    return _http_clients
+
+
+def set_llm_factory(factory):
+    """
+    Override the model returned by get_llm() (e.g. a fake chat model for
+    offline benchmarks); None restores the default.
+    Chains already built keep their model: call chain_registry.clear_chains().
+    """
+
+    global _llm_factory
+    _llm_factory = factory
 
 
 def get_llm():
     """
     Central LLM factory.
     This is the ONLY place where the model is selected.
+
+    Every model shares the process-wide rate governor (utils/rate_governor):
+    requests wait for the RPM / TPM budget and the in-flight limit before
+    they are sent.
     """
 
+    from utils.rate_governor import get_rate_governor
+
+    load_env()
+    governor = get_rate_governor()
+
+    if _llm_factory is not None:
+        llm = _llm_factory()
+        llm.rate_limiter = governor
+        llm.callbacks = [*(llm.callbacks or []), governor.usage]
+        return llm
+
+    from langchain_openai import ChatOpenAI
+
+    http_client, http_async_client = get_http_clients()
+
     return ChatOpenAI(
         model="gpt-4o-mini",
         temperature=0.3,
         api_key=os.getenv("OPENAI_API_KEY"),
-    )
\ No newline at end of file
+        cache=get_llm_cache(),
+        http_client=http_client,
+        http_async_client=http_async_client,
+        rate_limiter=governor,
+        callbacks=[governor.usage],
+        # retries happen in the chain call wrapper (utils/llm_retry), where
+        # 429s are visible to the governor's AIMD limit instead of being hidden
+        max_retries=0,
+    )
@@ -0,0 +1,195 @@
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional
+
+# ------------------------------------------------------------
+# Command line interface
+# ------------------------------------------------------------
+#   python main.py run "<goal>" [--async] [--input-dir D] [--output-dir D] ...
+#   python main.py batch goals.jsonl [batch_runner options]
+#   python main.py resume <run_id>
+#   python main.py validate "<ffmpeg command>"
+#   python main.py runs
+#   python main.py bench {pipeline,chunked,registry,imports} [benchmark options]
+#
+# Only argparse / json / sys are imported here. Every command imports what it
+# needs when it runs, so `validate` and `runs` never load the agent, and
+# LangChain / the OpenAI SDK are only loaded when a chain is built
+# (agent/chain_registry, configs/llm).
+
+BENCHMARKS = {
+    "pipeline": "benchmarks.bench_pipeline",
+    "chunked": "benchmarks.bench_chunked_encode",
+    "registry": "benchmarks.bench_chain_registry",
+    "imports": "benchmarks.bench_import_time",
+}
+
+
+def _agent_env(args) -> Dict[str, str]:
+    env = {}
+    if getattr(args, "input_dir", None):
+        env["input_video_dir"] = args.input_dir
+    if getattr(args, "output_dir", None):
+        env["output_dir"] = args.output_dir
+    return env
+
+
+def _print_result(result: Dict, as_json: bool) -> int:
+    logs = result["execution_logs"]
+    ran = [log for log in logs if "ffmpeg_result" in log]
+    failed = [log for log in ran if not log["ffmpeg_result"].get("success")]
+
+    if as_json:
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=str))
+    else:
+        print(f"\n[CLI] run_id={result.get('run_id')} tasks={len(result['tasks'])} "
+              f"ffmpeg ok={len(ran) - len(failed)}/{len(ran)}")
+    return 1 if failed else 0
+
+
+# ------------------------------------------------------------
+# Commands
+# ------------------------------------------------------------
+def cmd_run(args) -> int:
+    import asyncio
+
+    from agent.agent_runner import FFmpegToyAgent
+
+    agent = FFmpegToyAgent(
+        task_mode=args.task_mode,
+        fuse_graph=args.fuse_graph,
+        parallel_ffmpeg=args.parallel_ffmpeg,
+        chunked_encode=args.chunked_encode,
+        trace=args.trace,
+    )
+    agent.env.update(_agent_env(args))
+
+    result = asyncio.run(agent.arun(args.goal)) if args.use_async else agent.run(args.goal)
+    return _print_result(result, args.json)
+
+
+def cmd_batch(args, extra: List[str]) -> int:
+    from agent.batch_runner import main as batch_main
+
+    summary = batch_main(extra)
+    return 1 if summary.get("error") or summary.get("failed") else 0
+
+
+def cmd_resume(args) -> int:
+    import asyncio
+
+    from agent.agent_runner import FFmpegToyAgent
+    from utils.run_journal import RunJournal
+
+    # continue with the options the run was started with
+    options = RunJournal.open(args.run_id).replayed("start").get("options") or {}
+    agent = FFmpegToyAgent(**options)
+    agent.env.update(_agent_env(args))
+
+    result = asyncio.run(agent.aresume(args.run_id)) if args.use_async else agent.resume(args.run_id)
+    return _print_result(result, args.json)
+
+
+def cmd_validate(args) -> int:
+    from tools.command_validator import validate_ffmpeg_command
+
+    if args.no_probe:
+        report = validate_ffmpeg_command(args.ffmpeg_command, probe=lambda path: None)
+    else:
+        report = validate_ffmpeg_command(args.ffmpeg_command)
+
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    return 0 if report["valid"] else 1
+
+
+def cmd_runs(args) -> int:
+    import time
+
+    from utils.run_journal import list_runs
+
+    runs = list_runs()[: args.limit]
+    if args.json:
+        print(json.dumps(runs, ensure_ascii=False, indent=2))
+        return 0
+
+    for run in runs:
+        started = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(run["started_at"])) if run["started_at"] else "-"
+        goal = " ".join((run["user_goal"] or "").split())
+        status = "done" if run["finished"] else "open"
+        print(f"{run['run_id']:<26} {started}  {status:<4} stages={run['stages']:<4} {goal[:60]}")
+    return 0
+
+
+def cmd_bench(args, extra: List[str]) -> int:
+    import importlib
+
+    module = importlib.import_module(BENCHMARKS[args.name])
+    sys.argv = [module.__file__, *extra]
+    result = module.main()
+    return result if isinstance(result, int) else 0
+
+
+# ------------------------------------------------------------
+# Parser
+# ------------------------------------------------------------
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="FFmpeg toy agent")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def _agent_options(sub):
+        sub.add_argument("--async", dest="use_async", action="store_true", help="use arun / aresume")
+        sub.add_argument("--input-dir", default=None, help="input_video_dir of the agent")
+        sub.add_argument("--output-dir", default=None, help="output_dir of the agent")
+        sub.add_argument("--json", action="store_true", help="print the full result as JSON")
+
+    run = commands.add_parser("run", help="run the agent on one goal")
+    run.add_argument("goal")
+    _agent_options(run)
+    run.add_argument("--task-mode", choices=["chains", "fused"], default="chains")
+    run.add_argument("--fuse-graph", action="store_true")
+    run.add_argument("--parallel-ffmpeg", action="store_true")
+    run.add_argument("--chunked-encode", action="store_true", help="split long re-encodes across cores")
+    run.add_argument("--trace", action="store_true", help="export spans to TRACE_DIR")
+
+    commands.add_parser("batch", help="run a JSONL file of goals (options of agent/batch_runner)", add_help=False)
+
+    resume = commands.add_parser("resume", help="continue a journaled run")
+    resume.add_argument("run_id")
+    _agent_options(resume)
+
+    validate = commands.add_parser("validate", help="check an FFmpeg command without running it")
+    validate.add_argument("ffmpeg_command", metavar="command")
+    validate.add_argument("--no-probe", action="store_true", help="skip ffprobe-based time range checks")
+
+    runs = commands.add_parser("runs", help="list journaled runs, newest first")
+    runs.add_argument("--limit", type=int, default=20)
+    runs.add_argument("--json", action="store_true")
+
+    bench = commands.add_parser("bench", help="run an offline benchmark (options of the benchmark script)")
+    bench.add_argument("name", choices=list(BENCHMARKS))
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args, extra = build_parser().parse_known_args(argv)
+
+    # batch / bench forward everything else to their own parsers
+    if args.command == "batch":
+        return cmd_batch(args, extra)
+    if args.command == "bench":
+        return cmd_bench(args, extra)
+    if extra:
+        build_parser().error(f"unrecognized arguments: {' '.join(extra)}")
+
+    handlers = {"run": cmd_run, "resume": cmd_resume, "validate": cmd_validate, "runs": cmd_runs}
+    return handlers[args.command](args)
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    sys.exit(main())
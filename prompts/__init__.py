@@ -0,0 +1,3 @@
+# Bump whenever prompt semantics change in a way that should invalidate
+# cached LLM responses (see configs/llm.py).
+PROMPT_VERSION = "v1"
@@ -48,3 +48,30 @@ Output:
 """
 
 
+# ------------------------------------------------------------
+# 3. B_CHAIN_BATCH_INTERPRET_PROMPT
+# ------------------------------------------------------------
+B_CHAIN_BATCH_INTERPRET_PROMPT = """
+You are an agent that interprets video editing tasks for FFmpeg execution.
+
+Input:
+- A numbered list of video editing tasks written in human-oriented language.
+
+Your job, for EVERY task in the list:
+1. Decide whether the task can be executed using FFmpeg via command line.
+2. If it CAN be executed:
+   - Name the kind of FFmpeg operation it corresponds to.
+   - Describe what information would be required to execute it.
+3. If it CANNOT be executed:
+   - Mark it as not executable by FFmpeg.
+
+Important constraints:
+- Do NOT generate FFmpeg commands.
+- Do NOT invent timestamps or file paths.
+- Do NOT assume human actions (e.g., uploading, reviewing, deciding).
+- Keep the task numbering of the input.
+
+Output format (exactly one line per task, nothing else):
+[<task number>] FFmpeg-capable: YES | Operation type: <type> | Required information: <info>
+[<task number>] FFmpeg-capable: NO
+"""
@@ -0,0 +1,53 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ------------------------------------------------------------
+# Import time of the CLI entry points
+# ------------------------------------------------------------
+# A fresh interpreter per module (nothing cached in sys.modules). Importing
+# these must not load a provider SDK and must stay within the budget
+# (IMPORT_BUDGET_MS, generous so slow CI machines do not flake; the
+# detailed numbers come from benchmarks/bench_import_time.py).
+
+PROVIDER_MODULES = ("openai", "langchain_openai")
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1000"))
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+sec = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in sys.modules}} & set({providers!r}))
+print(json.dumps({{"sec": sec, "loaded": loaded}}))
+"""
+
+
+def _import(module: str) -> dict:
+    process = subprocess.run(
+        [sys.executable, "-c", PROBE.format(module=module, providers=PROVIDER_MODULES)],
+        cwd=PROJECT_ROOT,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+@pytest.mark.parametrize("module", ["main", "agent.agent_runner"])
+def test_import_loads_no_provider_sdk(module):
+    result = _import(module)
+    assert result["loaded"] == []
+
+
+@pytest.mark.parametrize("module", ["main", "agent.agent_runner"])
+def test_import_within_budget(module):
+    # best of three: one slow sample (cold disk cache) is not a regression
+    best = min(_import(module)["sec"] for _ in range(3))
+    assert best * 1000 <= IMPORT_BUDGET_MS
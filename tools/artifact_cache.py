@@ -0,0 +1,492 @@
+import hashlib
+import json
+import os
+import shlex
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.ffmpeg_args import input_formats, is_ffmpeg, option_name, scan_io, split_command
+from tools.ffmpeg_executor import run_ffmpeg_command
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# bytes hashed at the head and at the tail of every input file
+PARTIAL_HASH_BYTES = 1024 * 1024
+
+# options that do not change the produced file
+IGNORED_OPTIONS = {"y", "n", "threads", "hide_banner", "nostdin", "stats", "nostats", "loglevel", "v"}
+
+
+# ------------------------------------------------------------
+# Content-hashed FFmpeg artifact cache
+# ------------------------------------------------------------
+def fingerprint(path: str) -> Optional[List[Any]]:
+    """
+    [size, mtime_ns, sha256(first + last PARTIAL_HASH_BYTES)] of a file,
+    or None if it does not exist.
+    """
+
+    try:
+        stat = os.stat(path)
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            digest.update(f.read(PARTIAL_HASH_BYTES))
+            if stat.st_size > 2 * PARTIAL_HASH_BYTES:
+                f.seek(-PARTIAL_HASH_BYTES, os.SEEK_END)
+                digest.update(f.read(PARTIAL_HASH_BYTES))
+    except OSError:
+        return None
+
+    return [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+
+
+def concat_list_files(path: str) -> Optional[List[str]]:
+    """
+    Files referenced by a concat demuxer list (`file '<path>'` lines, relative
+    to the list), or None if the list cannot be read or parsed.
+    """
+
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    files = []
+    for line in lines:
+        try:
+            tokens = shlex.split(line, comments=True)
+        except ValueError:
+            return None
+        if len(tokens) == 2 and tokens[0] == "file":
+            files.append(os.path.join(os.path.dirname(os.path.abspath(path)), tokens[1]))
+    return files
+
+
+def _input_fingerprint(path: str, input_format: Optional[str]) -> Optional[List[Any]]:
+    """
+    Fingerprint of an input; a concat demuxer list also covers the files it
+    references.
+    """
+
+    if input_format != "concat":
+        return fingerprint(path)
+
+    files = concat_list_files(path)
+    if files is None:
+        return None
+    referenced = [fingerprint(item) for item in files]
+    if None in referenced:
+        return None
+    return [fingerprint(path), referenced]
+
+
+def _reflink(src: str, dst: str) -> bool:
+    """
+    Copy-on-write clone (Linux FICLONE: btrfs / xfs); False if unsupported.
+    """
+
+    if not sys.platform.startswith("linux"):
+        return False
+
+    import fcntl
+
+    FICLONE = 0x40049409
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        shutil.copystat(src, dst)
+        return True
+    except OSError:
+        try:
+            os.remove(dst)
+        except OSError:
+            pass
+        return False
+
+
+def materialize(src: str, dst: str) -> str:
+    """
+    Place `src` at `dst` without re-encoding: hardlink → reflink → copy.
+    Returns the method used. (mtime is preserved, so fingerprints of
+    downstream inputs stay stable across runs)
+    """
+
+    os.makedirs(os.path.dirname(os.path.abspath(dst)), exist_ok=True)
+    unlink(dst)
+
+    try:
+        os.link(src, dst)
+        return "hardlink"
+    except OSError:
+        pass
+
+    if _reflink(src, dst):
+        return "reflink"
+
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def unlink(path: str) -> None:
+    """
+    Remove an output before it is (re)written: FFmpeg truncates files in
+    place, which would corrupt the cached object behind a hardlink.
+    """
+
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class ArtifactCache:
+    """
+    Cache of FFmpeg outputs keyed by what produced them.
+
+    Key:
+        sha256(normalized command, input fingerprints)
+        - normalized command : argument list with inputs / outputs replaced by
+                               placeholders (outputs keep their extension,
+                               which selects the muxer) and output-neutral
+                               options (-y, -threads, logging) dropped
+        - input fingerprints : size / mtime / partial hash of every input file
+                               (and of every file in a -f concat list)
+
+    Objects are stored under <root>/objects (hardlinked when possible, so a
+    cached output costs no extra space while the original exists).
+    Eviction: LRU (by last access) once `max_bytes` is exceeded.
+    """
+
+    def __init__(self, root: str, max_bytes: int = 2 * 1024 * 1024 * 1024):
+        self.root = root
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.saved_sec = 0.0
+
+        os.makedirs(os.path.join(root, "objects"), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS artifacts (
+                key         TEXT PRIMARY KEY,
+                outputs     TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                wall_sec    REAL NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_artifacts_accessed ON artifacts(accessed_at)"
+        )
+        self._conn.commit()
+
+    # --------------------------------------------------------
+    # Key
+    # --------------------------------------------------------
+    def key(self, command: str) -> Optional[Dict[str, Any]]:
+        """
+        Returns:
+            {"key": str, "outputs": [path, ...]}
+            or None if the command cannot be cached (not ffmpeg, no output
+            file, missing input or concat list entry).
+        """
+
+        try:
+            args = split_command(command)
+        except ValueError:
+            args = []
+
+        io = scan_io(args) if is_ffmpeg(args) else {"inputs": [], "outputs": []}
+        fingerprints = [
+            _input_fingerprint(path, input_format)
+            for (_, path), input_format in zip(io["inputs"], input_formats(args, io["inputs"]))
+        ]
+
+        if not io["outputs"] or None in fingerprints:
+            with self._lock:
+                self.uncacheable += 1
+            return None
+
+        placeholders = {index: f"<in{i}>" for i, (index, _) in enumerate(io["inputs"])}
+        placeholders.update({
+            index: f"<out{i}{os.path.splitext(path)[1].lower()}>" for i, (index, path) in enumerate(io["outputs"])
+        })
+
+        normalized: List[str] = []
+        i = 1
+        while i < len(args):
+            token = args[i]
+            if i in placeholders:
+                normalized.append(placeholders[i])
+            elif token.startswith("-") and option_name(token) in IGNORED_OPTIONS:
+                if option_name(token) in ("threads", "loglevel", "v"):
+                    i += 1
+            else:
+                normalized.append(token)
+            i += 1
+
+        payload = json.dumps([normalized, fingerprints])
+        return {
+            "key": hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+            "outputs": [path for _, path in io["outputs"]],
+        }
+
+    def _object_dir(self, key: str) -> str:
+        return os.path.join(self.root, "objects", key[:2], key)
+
+    # --------------------------------------------------------
+    # Lookup / store
+    # --------------------------------------------------------
+    def lookup(self, key: str, outputs: List[str]) -> Optional[List[str]]:
+        """
+        Materialize cached outputs at `outputs`. Returns the methods used,
+        or None on a miss.
+        """
+
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT outputs, wall_sec FROM artifacts WHERE key = ?", (key,)
+            ).fetchone()
+
+            objects = json.loads(row[0]) if row else []
+            if row is None or len(objects) != len(outputs) or not all(
+                os.path.exists(path) for path in objects
+            ):
+                if row is not None:
+                    self._remove(key)
+                    self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE artifacts SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            self.saved_sec += row[1]
+
+        return [materialize(src, dst) for src, dst in zip(objects, outputs)]
+
+    def store(self, key: str, outputs: List[str], wall_sec: float) -> bool:
+        """
+        Add freshly produced outputs to the store (then garbage-collect).
+        """
+
+        if not all(os.path.isfile(path) for path in outputs):
+            return False
+
+        directory = self._object_dir(key)
+        os.makedirs(directory, exist_ok=True)
+
+        objects = []
+        for i, path in enumerate(outputs):
+            obj = os.path.join(directory, f"{i}{os.path.splitext(path)[1]}")
+            materialize(path, obj)
+            objects.append(obj)
+
+        size = sum(os.path.getsize(obj) for obj in objects)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO artifacts "
+                "(key, outputs, size, wall_sec, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, json.dumps(objects), size, wall_sec, now, now),
+            )
+            self._gc()
+            self._conn.commit()
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            for (key,) in self._conn.execute("SELECT key FROM artifacts").fetchall():
+                self._remove(key)
+            self._conn.commit()
+
+    # --------------------------------------------------------
+    # Garbage collection / stats
+    # --------------------------------------------------------
+    def _remove(self, key: str) -> None:
+        """
+        (caller holds the lock)
+        """
+        self._conn.execute("DELETE FROM artifacts WHERE key = ?", (key,))
+        shutil.rmtree(self._object_dir(key), ignore_errors=True)
+
+    def _gc(self) -> None:
+        """
+        LRU eviction down to the disk quota. (caller holds the lock)
+        """
+
+        (total,) = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM artifacts").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM artifacts ORDER BY accessed_at ASC"
+        ).fetchall()
+
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._remove(key)
+            total -= size
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters (this process) + current store size.
+        """
+
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM artifacts"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "uncacheable": self.uncacheable,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "saved_sec": self.saved_sec,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+_artifact_cache = None
+
+
+def get_artifact_cache() -> Optional[ArtifactCache]:
+    """
+    Process-wide FFmpeg artifact cache.
+
+    Environment:
+        ARTIFACT_CACHE=0            disable caching
+        ARTIFACT_CACHE_DIR          store directory (default: .cache/artifacts)
+        ARTIFACT_CACHE_MAX_MB       disk quota (LRU)
+    """
+
+    global _artifact_cache
+
+    if os.getenv("ARTIFACT_CACHE", "1") == "0":
+        return None
+
+    if _artifact_cache is None:
+        _artifact_cache = ArtifactCache(
+            root=os.getenv("ARTIFACT_CACHE_DIR", os.path.join(PROJECT_ROOT, ".cache", "artifacts")),
+            max_bytes=int(float(os.getenv("ARTIFACT_CACHE_MAX_MB", "2048")) * 1024 * 1024),
+        )
+
+    return _artifact_cache
+
+
+def unlink_outputs(ffmpeg_command: str) -> None:
+    """
+    unlink() every output file of a command (outputs it also reads are kept).
+    Any output may be a hardlink to a stored object, cacheable or not.
+    """
+
+    try:
+        args = split_command(ffmpeg_command)
+    except ValueError:
+        return
+    if not is_ffmpeg(args):
+        return
+
+    io = scan_io(args)
+    inputs = {os.path.abspath(path) for _, path in io["inputs"]}
+    for _, path in io["outputs"]:
+        if os.path.abspath(path) not in inputs:
+            unlink(path)
+
+
+def run_cached_ffmpeg_command(
+        ffmpeg_command: str,
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+        cache: Optional[ArtifactCache] = None,
+) -> Dict[str, object]:
+    """
+    run_ffmpeg_command fronted by the artifact cache.
+
+    Returns:
+        runner result + "artifact_cache": "hit" | "miss" | "uncacheable"
+        (a hit has success=True and an empty stdout / stderr)
+    """
+
+    cache = cache or get_artifact_cache()
+    if cache is None:
+        unlink_outputs(ffmpeg_command)
+        return runner(ffmpeg_command)
+
+    entry = cache.key(ffmpeg_command)
+    if entry is None:
+        unlink_outputs(ffmpeg_command)
+        return {**runner(ffmpeg_command), "artifact_cache": "uncacheable"}
+
+    methods = cache.lookup(entry["key"], entry["outputs"])
+    if methods is not None:
+        return {
+            "command": ffmpeg_command,
+            "returncode": 0,
+            "stdout": "",
+            "stderr": "",
+            "success": True,
+            "artifact_cache": "hit",
+            "materialized": methods,
+        }
+
+    unlink_outputs(ffmpeg_command)
+
+    start = time.perf_counter()
+    result = runner(ffmpeg_command)
+    if result.get("success"):
+        cache.store(entry["key"], entry["outputs"], time.perf_counter() - start)
+
+    return {**result, "artifact_cache": "miss"}
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, "mv_source.mp4")
+        with open(source, "wb") as f:
+            f.write(os.urandom(4096))
+
+        output = os.path.join(tmp, "clip_01.mp4")
+        command = f"ffmpeg -y -ss 00:00:10.000 -i {source} -t 00:00:05.000 {output}"
+
+        def fake_runner(cmd: str) -> Dict[str, object]:
+            time.sleep(0.2)
+            shutil.copy(source, output)
+            return {"command": cmd, "returncode": 0, "stdout": "", "stderr": "", "success": True}
+
+        cache = ArtifactCache(os.path.join(tmp, "artifacts"), max_bytes=1024 * 1024)
+
+        for attempt in range(2):
+            result = run_cached_ffmpeg_command(command, runner=fake_runner, cache=cache)
+            print(attempt, result["artifact_cache"], result.get("materialized"), os.path.exists(output))
+
+        # the output extension selects the muxer: out.mp3 and out.wav are different artifacts
+        keys = {ext: cache.key(f"ffmpeg -i {source} -vn out.{ext}")["key"] for ext in ("mp3", "wav")}
+        print("mp3 / wav share a key:", keys["mp3"] == keys["wav"])
+
+        print(cache.stats())
@@ -0,0 +1,376 @@
+import bisect
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.ffmpeg_args import format_time, is_ffmpeg, join_command, option_name, parse_time, scan_io, split_command
+from tools.ffmpeg_executor import run_ffmpeg_command
+from tools.media_index import MediaIndex, get_media_index
+from tools.trim_optimizer import KEYFRAME_TOLERANCE, TIME_SENSITIVE_FILTERS, _flatten, _options
+
+# ------------------------------------------------------------
+# Chunked parallel encoding
+# ------------------------------------------------------------
+# One x264 process stops scaling long before a render box runs out of cores.
+# A long single-input re-encode is split at source keyframes into segments
+# that are encoded by parallel FFmpeg processes, then stitched without
+# re-encoding:
+#
+#   [audio]  -ss S -i src -t D -vn <audio options>        audio.<ext>
+#   [seg k]  -ss B_k -i src -t (B_k+1 - B_k) -an <video>  part_k.<ext>   (parallel)
+#   [mux]    -f concat -i parts.txt -i audio.<ext> -c copy output
+#
+# - segments start on keyframes, so input seeking lands on a frame boundary
+#   and no frame is dropped or duplicated at the seams
+# - every segment gets the same encoder options, so the concat demuxer can
+#   join them as one stream (same codec, profile, pix_fmt, size, fps);
+#   only the keyframe placement differs (each segment opens with an IDR)
+# - audio is encoded once over the whole range: per-segment AAC would add
+#   encoder priming silence at every seam
+
+# output duration from which splitting pays off (seconds)
+CHUNKED_ENCODE_MIN_SEC = float(os.getenv("CHUNKED_ENCODE_MIN_SEC", "60"))
+# shortest segment worth its own FFmpeg process (seconds)
+CHUNK_MIN_SEC = float(os.getenv("CHUNK_MIN_SEC", "10"))
+
+# output options by the streams they apply to
+VIDEO_OPTIONS = {
+    "vcodec", "vf", "crf", "qp", "preset", "tune", "level", "pix_fmt", "g", "bf", "r", "s",
+    "aspect", "maxrate", "minrate", "bufsize", "x264opts", "x264-params", "x265-params",
+    "keyint_min", "sc_threshold", "sws_flags", "vsync", "fps_mode", "vtag",
+    "colorspace", "color_primaries", "color_trc", "color_range",
+}
+AUDIO_OPTIONS = {"acodec", "af", "ar", "ac", "sample_fmt", "aq", "atag"}
+# per-stream options: "-c:v" video, "-c:a" audio, "-c" both
+STREAM_OPTIONS = {"c", "codec", "b", "q", "qscale", "filter", "profile", "tag"}
+# container options, only for the final mux
+MUX_OPTIONS = {"movflags", "metadata", "map_metadata", "map_chapters", "f", "brand", "sn", "dn", "shortest"}
+# output options that splitting cannot reproduce
+UNSUPPORTED_OPTIONS = {"map", "filter_complex", "lavfi", "pass", "passlogfile", "vn", "ss", "sseof", "copyts"}
+
+
+def _unchanged(command: str, reason: str) -> Dict[str, Any]:
+    return {"mode": "unchanged", "reason": reason, "stages": [[command]], "segments": [],
+            "concat_list": None, "temp_files": []}
+
+
+def _stream_kind(token: str) -> str:
+    """
+    "video" / "audio" / "both" / "mux" / "" (unknown) for an output option.
+    """
+
+    name = option_name(token)
+    if name in VIDEO_OPTIONS:
+        return "video"
+    if name in AUDIO_OPTIONS:
+        return "audio"
+    if name in MUX_OPTIONS:
+        return "mux"
+    if name in STREAM_OPTIONS:
+        specifier = token.lstrip("-").partition(":")[2]
+        if specifier.startswith("v"):
+            return "video"
+        if specifier.startswith("a"):
+            return "audio"
+        return "both"
+    return ""
+
+
+def split_points(
+        keyframes: List[float],
+        start: float,
+        end: float,
+        workers: int,
+        min_segment: float = CHUNK_MIN_SEC,
+) -> List[float]:
+    """
+    Segment start times for [start, end): `start`, then up to workers - 1
+    keyframes nearest to equal-length cut points, each segment at least
+    `min_segment` / 2 long.
+    """
+
+    count = min(workers, int((end - start) // min_segment))
+    points = [start]
+
+    for i in range(1, count):
+        target = start + (end - start) * i / count
+        pos = bisect.bisect_left(keyframes, target)
+        nearest = min(keyframes[max(0, pos - 1):pos + 1], key=lambda k: abs(k - target), default=None)
+        if (
+            nearest is not None
+            and nearest - points[-1] >= min_segment / 2
+            and end - nearest >= min_segment / 2
+        ):
+            points.append(nearest)
+
+    return points
+
+
+def plan_chunked_encode(
+        command: str,
+        media_index: Optional[MediaIndex] = None,
+        workers: Optional[int] = None,
+        min_duration: float = CHUNKED_ENCODE_MIN_SEC,
+) -> Dict[str, Any]:
+    """
+    Split a long single-input / single-output re-encode into GOP-aligned
+    segments encoded in parallel.
+
+    Args:
+        workers: segments encoded at once (default: the command's -threads,
+            else the cpu count; never more than -threads); the thread budget
+            is split across them
+
+    Returns:
+        {
+          "mode": "unchanged" | "chunked",
+          "reason": str,
+          "stages": [[command, ...], ...],   # stages in order, commands of a stage in parallel
+          "segments": [[start_sec, duration_sec | None], ...],
+          "concat_list": (path, text) | None,
+          "temp_files": [path, ...]
+        }
+    """
+
+    try:
+        args = split_command(command)
+    except ValueError:
+        return _unchanged(command, "unparseable command")
+
+    if not is_ffmpeg(args):
+        return _unchanged(command, "not an ffmpeg command")
+
+    io = scan_io(args)
+    if len(io["inputs"]) != 1 or len(io["outputs"]) != 1:
+        return _unchanged(command, "not a single-input / single-output command")
+
+    input_pos, source = io["inputs"][0]
+    output_pos, output = io["outputs"][0]
+
+    pre = _options(args, 1, input_pos - 1)
+    post = _options(args, input_pos + 1, output_pos)
+
+    # ---- sort output options by stream ----
+    video, audio, mux = [], [], []
+    threads = None
+    duration = end_option = None
+    no_audio = False
+
+    for group in post:
+        name = option_name(group[0])
+        if name in UNSUPPORTED_OPTIONS:
+            return _unchanged(command, f"-{name} cannot be split")
+        if name in ("y", "n"):
+            continue
+        if name == "an":
+            no_audio = True
+            continue
+        if name == "threads" and len(group) == 2:
+            threads = int(group[1]) if group[1].isdigit() else None
+            continue
+        if name in ("t", "to") and len(group) == 2:
+            value = parse_time(group[1])
+            if value is None:
+                return _unchanged(command, f"unparseable -{name}")
+            if name == "t":
+                duration = value
+            else:
+                end_option = value
+            continue
+
+        kind = _stream_kind(group[0])
+        if not kind or (len(group) != 2 and kind != "mux"):
+            return _unchanged(command, f"unsupported output option {group[0]}")
+        if kind in ("video", "both"):
+            video.append(group)
+        if kind in ("audio", "both"):
+            audio.append(group)
+        if kind == "mux":
+            mux.append(group)
+
+    if any(option_name(g[0]) in ("c", "codec", "vcodec") and g[1] == "copy" for g in video):
+        return _unchanged(command, "video stream copy")
+
+    video_filters = " ".join(g[1] for g in video if option_name(g[0]) in ("vf", "filter"))
+    if any(token in video_filters for token in TIME_SENSITIVE_FILTERS):
+        return _unchanged(command, "time-dependent video filters")
+
+    # ---- output range in source time ----
+    names_pre = [option_name(g[0]) for g in pre]
+    start = parse_time(pre[names_pre.index("ss")][1]) if "ss" in names_pre else 0.0
+    if start is None:
+        return _unchanged(command, "unparseable -ss")
+    if duration is None and end_option is not None:
+        # after an input -ss the output timeline starts at 0
+        duration = end_option if "ss" in names_pre else end_option - start
+    if duration is None and "to" in names_pre:
+        duration = (parse_time(pre[names_pre.index("to")][1]) or 0.0) - start
+    if duration is None and "t" in names_pre:
+        duration = parse_time(pre[names_pre.index("t")][1])
+    no_seek_pre = [g for g in pre if option_name(g[0]) not in ("ss", "t", "to")]
+
+    media_index = media_index or get_media_index()
+    info = media_index.get(source) if media_index is not None else None
+    if info is None or not info["keyframes"] or not info.get("video_codec"):
+        return _unchanged(command, "no keyframe index")
+
+    end = min(start + duration, info["duration"]) if duration is not None else info["duration"]
+    if end - start < min_duration:
+        return _unchanged(command, f"output {end - start:.1f}s shorter than {min_duration:.0f}s")
+
+    thread_budget = threads or os.cpu_count() or 1
+    # a -threads budget (DAG scheduler) also caps the number of processes
+    workers = min(workers or thread_budget, threads or workers or thread_budget)
+    points = split_points(info["keyframes"], start, end - KEYFRAME_TOLERANCE, workers)
+    if len(points) < 2:
+        return _unchanged(command, "no keyframes to split at")
+
+    # ---- commands ----
+    base, ext = os.path.splitext(output)
+    segment_threads = [["-threads", str(max(1, thread_budget // len(points)))]]
+    bounded = duration is not None
+
+    def _build(seek: float, pre_groups, post_groups, out) -> str:
+        seek_group = [["-ss", format_time(seek)]] if seek > 0 else []
+        return join_command([args[0], *_flatten(pre_groups + seek_group), "-i", source,
+                             *_flatten(post_groups), out])
+
+    parts, segment_commands, segments = [], [], []
+    for k, point in enumerate(points):
+        if k + 1 < len(points):
+            length = points[k + 1] - point
+        else:
+            length = end - point if bounded else None
+        limit = [["-t", format_time(length)]] if length is not None else []
+
+        part = f"{base}.part{k:03d}{ext}"
+        parts.append(part)
+        segments.append([round(point, 3), round(length, 3) if length is not None else None])
+        segment_commands.append(_build(point, no_seek_pre, limit + video + segment_threads + [["-an"]], part))
+
+    has_audio = not no_audio and bool(info.get("audio_codec"))
+    audio_path = f"{base}.audio{ext}"
+    encode_stage = list(segment_commands)
+    if has_audio:
+        limit = [["-t", format_time(end - start)]] if bounded else []
+        encode_stage.insert(0, _build(start, no_seek_pre, limit + audio + [["-vn"]], audio_path))
+
+    concat_list = f"{base}.parts.txt"
+    mux_inputs = ["-i", audio_path, "-map", "0:v", "-map", "1:a"] if has_audio else ["-map", "0:v"]
+    concat_command = join_command([
+        args[0], "-y", "-f", "concat", "-safe", "0", "-i", concat_list, *mux_inputs,
+        "-c", "copy", *_flatten(mux), output,
+    ])
+
+    def _entry(path: str) -> str:
+        return "file '" + os.path.abspath(path).replace("'", "'\\''") + "'"
+
+    return {
+        "mode": "chunked",
+        "reason": f"{end - start:.1f}s in {len(points)} keyframe-aligned segments"
+                  + ("" if has_audio else ", no audio"),
+        "stages": [encode_stage, [concat_command]],
+        "segments": segments,
+        "concat_list": (concat_list, "".join(_entry(p) + "\n" for p in parts)),
+        "temp_files": parts + ([audio_path] if has_audio else []) + [concat_list],
+    }
+
+
+# ------------------------------------------------------------
+# Execution of a chunked plan
+# ------------------------------------------------------------
+def run_chunked_plan(
+        plan: Dict[str, Any],
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+) -> Dict[str, object]:
+    """
+    Run the stages of a plan in order, the commands of a stage in parallel,
+    and merge their results (run_ffmpeg_command-compatible, plus "chunked").
+    """
+
+    results = []
+    timings = []
+    try:
+        if plan["concat_list"] is not None:
+            path, text = plan["concat_list"]
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        for stage in plan["stages"]:
+            start = time.perf_counter()
+            if len(stage) == 1:
+                stage_results = [runner(stage[0])]
+            else:
+                with ThreadPoolExecutor(max_workers=len(stage), thread_name_prefix="chunk") as pool:
+                    stage_results = list(pool.map(runner, stage))
+            timings.append(time.perf_counter() - start)
+
+            results += stage_results
+            if not all(r["success"] for r in stage_results):
+                break
+    finally:
+        for path in plan["temp_files"]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    failed = next((r for r in results if not r["success"]), None)
+    return {
+        **(failed or results[-1]),
+        "command": " && ".join(r["command"] for r in results),
+        "stdout": "".join(r["stdout"] for r in results),
+        "stderr": "".join(r["stderr"] for r in results),
+        "chunked": {
+            "segments": len(plan["segments"]),
+            "encode_sec": round(timings[0], 3),
+            "mux_sec": round(timings[1], 3) if len(timings) > 1 else None,
+        },
+    }
+
+
+def run_chunked_ffmpeg_command(
+        ffmpeg_command: str,
+        media_index: Optional[MediaIndex] = None,
+        workers: Optional[int] = None,
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+) -> Dict[str, object]:
+    """
+    plan_chunked_encode + run_chunked_plan (drop-in for run_ffmpeg_command).
+    """
+
+    plan = plan_chunked_encode(ffmpeg_command, media_index, workers)
+    if plan["mode"] == "unchanged":
+        return runner(ffmpeg_command)
+
+    print(f"[Chunked Encode] {plan['reason']}")
+    return run_chunked_plan(plan, runner)
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    class StaticIndex:
+        def get(self, path):
+            return {"duration": 600.0, "video_codec": "h264", "audio_codec": "aac",
+                    "keyframes": [float(k) for k in range(0, 600, 2)]}
+
+    examples = [
+        "ffmpeg -i long_mix.mp4 -vf scale=1080:1920 -c:v libx264 -preset medium -crf 20 "
+        "-c:a aac -b:a 192k -movflags +faststart -threads 8 short.mp4",
+        "ffmpeg -ss 00:01:00 -i long_mix.mp4 -t 95 -c:v libx264 -an -threads 4 short.mp4",
+        "ffmpeg -i long_mix.mp4 -ss 70 -t 27 -c:v libx264 clip_01.mp4",
+        "ffmpeg -i long_mix.mp4 -vf fade=in:st=0:d=1 -c:v libx264 short.mp4",
+    ]
+
+    for example in examples:
+        plan = plan_chunked_encode(example, StaticIndex())
+        print(f"\n===== {plan['mode']} ({plan['reason']}) =====")
+        print(example)
+        for number, stage in enumerate(plan["stages"], 1):
+            for cmd in stage:
+                print(f"  [{number}] {cmd}")
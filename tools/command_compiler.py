@@ -0,0 +1,282 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from tools.ffmpeg_args import parse_time, format_time, join_command
+
+
+# ------------------------------------------------------------
+# Template command compiler: structured task → FFmpeg argument list
+# ------------------------------------------------------------
+# Design principles:
+# - Deterministic: the same structured task always yields the same command
+# - Only known operations; anything else returns None (→ c_chain)
+# - Paths are resolved here (env), so compiled commands skip resolve_paths
+#
+# Compile state tracks the files produced so far in one run:
+#   clips   : per-clip outputs (trim results, later per-clip filters)
+#   current : single working file once clips were concatenated
+#   unknown : a task ran a command the compiler did not write (c_chain,
+#             fused, template cache), so clips / current may be incomplete;
+#             concat and per-file steps are no longer compiled
+
+SUPPORTED_OPERATIONS = ("trim", "concat", "scale_pad", "loudnorm", "fps")
+
+VIDEO_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "20", "-pix_fmt", "yuv420p"]
+AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "192k"]
+
+# YouTube playback loudness target
+LOUDNORM_FILTER = "loudnorm=I=-14:TP=-1.5:LRA=11"
+
+# Shorts canvas (used by concat when no scale_pad task set one)
+DEFAULT_RESOLUTION = (1080, 1920)
+
+
+def new_compile_state() -> Dict[str, Any]:
+    return {"clips": [], "current": None, "resolution": None, "unknown": False}
+
+
+def copy_compile_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: list(value) if isinstance(value, list) else value for key, value in state.items()}
+
+
+def invalidate_compile_state(state: Dict[str, Any]) -> None:
+    """
+    Record that a task produced files the compile state does not know about.
+    """
+    state["unknown"] = True
+
+
+def can_compile(structured: Optional[Dict[str, Any]]) -> bool:
+    """
+    Whether the structured task is an operation the compiler knows.
+    (whether it compiles also depends on the files produced so far)
+    """
+    return bool(structured) and structured.get("operation") in SUPPORTED_OPERATIONS
+
+
+def scale_pad_filter(width: int, height: int) -> str:
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1"
+    )
+
+
+def _output_path(env: Dict[str, str], name: str) -> str:
+    return os.path.join(os.path.normpath(env["output_dir"]), name)
+
+
+# ------------------------------------------------------------
+# Per-operation templates
+# ------------------------------------------------------------
+def _compile_trim(structured, env, state, task_index) -> Optional[List[str]]:
+    start = parse_time(str(structured.get("start_time", "")))
+    end = parse_time(str(structured.get("end_time", "")))
+    input_file = structured.get("input_file")
+
+    if start is None or end is None or end <= start or not input_file:
+        return None
+
+    source = os.path.join(os.path.normpath(env["input_video_dir"]), input_file)
+    output = _output_path(env, f"clip_{task_index:02d}.mp4")
+    state["clips"].append(output)
+
+    return [
+        "ffmpeg", "-y",
+        "-ss", format_time(start),
+        "-i", source,
+        "-t", format_time(end - start),
+        *VIDEO_ENCODE_ARGS,
+        *AUDIO_ENCODE_ARGS,
+        output,
+    ]
+
+
+def _compile_concat(structured, env, state, task_index) -> Optional[List[str]]:
+    clips = state["clips"]
+    if state["unknown"] or state["current"] is not None or len(clips) < 2:
+        return None
+
+    # concat filter needs identical frame geometry on every input;
+    # clips are normalized here unless a scale_pad task already did it
+    graph = []
+    if state["resolution"] is None:
+        width, height = DEFAULT_RESOLUTION
+        for i in range(len(clips)):
+            graph.append(f"[{i}:v]{scale_pad_filter(width, height)}[v{i}]")
+        video_labels = [f"[v{i}]" for i in range(len(clips))]
+    else:
+        video_labels = [f"[{i}:v]" for i in range(len(clips))]
+
+    graph.append(
+        "".join(f"{video_labels[i]}[{i}:a]" for i in range(len(clips)))
+        + f"concat=n={len(clips)}:v=1:a=1[vout][aout]"
+    )
+
+    output = _output_path(env, f"concat_{task_index:02d}.mp4")
+
+    args = ["ffmpeg", "-y"]
+    for clip in clips:
+        args += ["-i", clip]
+    args += [
+        "-filter_complex", ";".join(graph),
+        "-map", "[vout]", "-map", "[aout]",
+        *VIDEO_ENCODE_ARGS,
+        *AUDIO_ENCODE_ARGS,
+        output,
+    ]
+
+    state["current"] = output
+    state["clips"] = []
+    return args
+
+
+def _per_file_args(structured) -> Optional[List[str]]:
+    """
+    Output options of a single-file filter operation.
+    """
+
+    operation = structured["operation"]
+
+    if operation == "scale_pad":
+        width, height = int(structured["width"]), int(structured["height"])
+        return ["-vf", scale_pad_filter(width, height), *VIDEO_ENCODE_ARGS, "-c:a", "copy"]
+
+    if operation == "loudnorm":
+        return ["-af", LOUDNORM_FILTER, "-c:v", "copy", *AUDIO_ENCODE_ARGS]
+
+    if operation == "fps":
+        return ["-vf", f"fps={structured['fps']}", *VIDEO_ENCODE_ARGS, "-c:a", "copy"]
+
+    return None
+
+
+def _compile_per_file(structured, env, state, task_index) -> Optional[List[str]]:
+    """
+    scale_pad / loudnorm / fps on the working file, or on every clip
+    (one FFmpeg process with one output per clip) before concatenation.
+    """
+
+    try:
+        output_args = _per_file_args(structured)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if output_args is None:
+        return None
+
+    if state["unknown"]:
+        return None
+
+    operation = structured["operation"]
+    inputs = [state["current"]] if state["current"] is not None else list(state["clips"])
+    if not inputs:
+        return None
+
+    outputs = [
+        _output_path(env, f"{operation}_{task_index:02d}_{i:02d}.mp4")
+        for i in range(1, len(inputs) + 1)
+    ]
+
+    args = ["ffmpeg", "-y"]
+    for source in inputs:
+        args += ["-i", source]
+    for i, output in enumerate(outputs):
+        args += ["-map", f"{i}:v:0", "-map", f"{i}:a:0?", *output_args, output]
+
+    if operation == "scale_pad":
+        state["resolution"] = (int(structured["width"]), int(structured["height"]))
+
+    if state["current"] is not None:
+        state["current"] = outputs[0]
+    else:
+        state["clips"] = outputs
+
+    return args
+
+
+_COMPILERS = {
+    "trim": _compile_trim,
+    "concat": _compile_concat,
+    "scale_pad": _compile_per_file,
+    "loudnorm": _compile_per_file,
+    "fps": _compile_per_file,
+}
+
+
+# ------------------------------------------------------------
+# Public API
+# ------------------------------------------------------------
+def compile_ffmpeg_command(
+        structured: Optional[Dict[str, Any]],
+        env: Dict[str, str],
+        state: Dict[str, Any],
+        task_index: int,
+) -> Optional[List[str]]:
+    """
+    Compile a structured task into an FFmpeg argument list.
+
+    Args:
+        structured: structured task (utils/task_rules), e.g.
+            {"operation": "trim", "input_file": ..., "start_time": ..., "end_time": ...}
+        env: agent env (input_video_dir / output_dir)
+        state: compile state of the run (new_compile_state()); updated in place
+        task_index: task index, used for output file names
+
+    Returns:
+        argument list with resolved paths, or None if the task cannot be
+        compiled (unknown operation, missing fields or missing input files).
+        On None, `state` is left unchanged.
+    """
+
+    if not can_compile(structured):
+        return None
+
+    snapshot = copy_compile_state(state)
+
+    args = _COMPILERS[structured["operation"]](structured, env, state, task_index)
+    if args is None:
+        state.clear()
+        state.update(snapshot)
+
+    return args
+
+
+def compile_ffmpeg_command_string(
+        structured: Optional[Dict[str, Any]],
+        env: Dict[str, str],
+        state: Dict[str, Any],
+        task_index: int,
+) -> Optional[str]:
+    """
+    compile_ffmpeg_command, joined into a shell command line.
+    """
+
+    args = compile_ffmpeg_command(structured, env, state, task_index)
+    return join_command(args) if args is not None else None
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    env = {"input_video_dir": "assets/video", "output_dir": "outputs"}
+    state = new_compile_state()
+
+    structured_tasks = [
+        {"operation": "trim", "input_file": "mv_complicated.mp4", "start_time": "01:10", "end_time": "01:37"},
+        {"operation": "trim", "input_file": "mv_sk8er_boi.mp4", "start_time": "00:46", "end_time": "01:03"},
+        {"operation": "scale_pad", "width": 1080, "height": 1920},
+        {"operation": "concat"},
+        {"operation": "loudnorm"},
+        {"operation": "crossfade"},
+        {"operation": "trim", "input_file": "mv_girlfriend.mp4", "start_time": "00:12", "end_time": "00:36"},
+        {"operation": "concat"},
+    ]
+
+    for idx, structured in enumerate(structured_tasks, 1):
+        print(f"\n===== TASK {idx}: {structured['operation']} =====")
+        command = compile_ffmpeg_command_string(structured, env, state, idx)
+        if command is None:
+            # c_chain writes this one: the compiler loses track of the files
+            invalidate_compile_state(state)
+        print(command or "(not compilable → c_chain)")
@@ -0,0 +1,372 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from tools.ffmpeg_args import FILTER_OPTIONS, NO_VALUE_OPTIONS, is_ffmpeg, option_name, parse_time, split_command
+from tools.ffmpeg_executor import probe_duration, run_ffmpeg_command
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------------------------
+# Static FFmpeg command validation (before execution)
+# ------------------------------------------------------------
+# run_ffmpeg_command does no validation by design; this stage sits between
+# resolve_paths and execution and rejects commands FFmpeg would reject
+# anyway, without spawning it:
+#
+#   unparseable           unbalanced quotes
+#   missing_value         option at the end of the command without its value
+#   no_output             no output file
+#   missing_input         -i file does not exist
+#   seek_beyond_duration  -ss at / past the end of the source (media index)
+#   empty_range           -t <= 0, or -to not after -ss
+#   unknown_filter        filter not in `ffmpeg -filters`
+#   unknown_encoder       neither an encoder in `ffmpeg -encoders` nor a codec
+#                         `ffmpeg -codecs` can encode (-c:v h264 → libx264)
+#
+# Checks that need information we do not have (unknown duration, ffmpeg
+# not installed) are skipped, never guessed. Commands chained with shell
+# operators are not validated.
+
+CODEC_OPTIONS = {"c", "codec", "vcodec", "acodec", "scodec"}
+SHELL_OPERATORS = {"&&", "||", ";", "|", ">", "<"}
+
+_FILTER_LINE_RE = re.compile(r"^\s*[T.][S.][C.]\s+(\w+)\s+\S*->\S*")
+_ENCODER_LINE_RE = re.compile(r"^\s*[VASD][\w.]{5}\s+(\S+)")
+_CODEC_LINE_RE = re.compile(r"^\s*[D.]E[VASDT][\w.]{3}\s+(\S+)")
+_FILTER_NAME_RE = re.compile(r"^\s*(?:\[[^\]]*\]\s*)*([A-Za-z0-9_]+)")
+
+
+# ------------------------------------------------------------
+# ffmpeg -filters / -encoders / -codecs (cached per binary)
+# ------------------------------------------------------------
+_capabilities: Dict[str, Dict[str, Set[str]]] = {}
+_capabilities_lock = threading.Lock()
+
+
+def _list(binary: str, flag: str, line_re: re.Pattern) -> Set[str]:
+    try:
+        process = subprocess.run(
+            [binary, "-hide_banner", flag],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=30,
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return set()
+
+    names = set()
+    for line in process.stdout.splitlines():
+        match = line_re.match(line)
+        if match and not line.strip().startswith("="):
+            names.add(match.group(1))
+    return names
+
+
+def ffmpeg_capabilities(ffmpeg: str = "ffmpeg") -> Optional[Dict[str, Set[str]]]:
+    """
+    Filter, encoder and encodable codec names of the ffmpeg on PATH, or None
+    if it is not installed. Listed once per binary (path, size, mtime) and kept in
+    memory and in .cache/ffmpeg_capabilities.json.
+    """
+
+    binary = shutil.which(ffmpeg)
+    if binary is None:
+        return None
+    stat = os.stat(binary)
+    key = f"{os.path.abspath(binary)}|{stat.st_size}|{stat.st_mtime_ns}"
+
+    with _capabilities_lock:
+        if key in _capabilities:
+            return _capabilities[key]
+
+        cache_file = os.getenv(
+            "FFMPEG_CAPABILITIES_PATH",
+            os.path.join(PROJECT_ROOT, ".cache", "ffmpeg_capabilities.json"),
+        )
+        try:
+            with open(cache_file, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            stored = {}
+
+        # entries written before codecs were listed are listed again
+        if "codecs" in stored.get(key, {}):
+            capabilities = {name: set(values) for name, values in stored[key].items()}
+        else:
+            capabilities = {
+                "filters": _list(binary, "-filters", _FILTER_LINE_RE),
+                "encoders": _list(binary, "-encoders", _ENCODER_LINE_RE),
+                "codecs": _list(binary, "-codecs", _CODEC_LINE_RE),
+            }
+            stored[key] = {name: sorted(values) for name, values in capabilities.items()}
+            os.makedirs(os.path.dirname(os.path.abspath(cache_file)), exist_ok=True)
+            with open(cache_file, "w", encoding="utf-8") as f:
+                json.dump(stored, f)
+
+        _capabilities[key] = capabilities
+        return capabilities
+
+
+# ------------------------------------------------------------
+# Command structure
+# ------------------------------------------------------------
+def _split_graph(graph: str, separator: str) -> List[str]:
+    """
+    Split a filtergraph on `separator` outside quotes / escapes.
+    """
+
+    parts, current, quoted, escaped = [], [], False, False
+    for char in graph:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "'":
+            quoted = not quoted
+        elif char == separator and not quoted:
+            parts.append("".join(current))
+            current = []
+            continue
+        current.append(char)
+    parts.append("".join(current))
+    return parts
+
+
+def filter_names(graph: str) -> List[str]:
+    """
+    "[0:v]scale=1080:-2,fade=t=in:d=1[v];[0:a]afade=t=in[a]"
+    → ["scale", "fade", "afade"]
+    """
+
+    names = []
+    for chain in _split_graph(graph, ";"):
+        for spec in _split_graph(chain, ","):
+            match = _FILTER_NAME_RE.match(spec)
+            if match:
+                names.append(match.group(1))
+    return names
+
+
+def _groups(args: List[str]) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], Optional[str]]:
+    """
+    (inputs, outputs, dangling option): each input / output with the
+    options given before it, as [(name, value)].
+    """
+
+    inputs: List[Dict[str, Any]] = []
+    outputs: List[Dict[str, Any]] = []
+    options: List[Tuple[str, Optional[str]]] = []
+
+    i = 1
+    while i < len(args):
+        token = args[i]
+        if token.startswith("-") and len(token) > 1:
+            name = option_name(token)
+            if name in NO_VALUE_OPTIONS:
+                options.append((name, None))
+                i += 1
+                continue
+            if i + 1 >= len(args):
+                return inputs, outputs, token
+            if token == "-i":
+                inputs.append({"path": args[i + 1], "options": options})
+                options = []
+            else:
+                options.append((name, args[i + 1]))
+            i += 2
+            continue
+
+        outputs.append({"path": token, "options": options})
+        options = []
+        i += 1
+
+    return inputs, outputs, None
+
+
+def _times(options: List[Tuple[str, Optional[str]]]) -> Dict[str, float]:
+    times: Dict[str, float] = {}
+    for name, value in options:
+        if name in ("ss", "t", "to") and value is not None:
+            parsed = parse_time(value)
+            if parsed is not None:
+                times.setdefault(name, parsed)
+    return times
+
+
+def _is_file_input(item: Dict[str, Any]) -> bool:
+    path = item["path"]
+    if path == "-" or path.startswith("pipe:") or "://" in path or "%" in path:
+        return False
+    return ("f", "lavfi") not in item["options"]
+
+
+# ------------------------------------------------------------
+# Validation
+# ------------------------------------------------------------
+def validate_ffmpeg_command(
+        command: str,
+        probe: Callable[[str], Optional[float]] = probe_duration,
+        capabilities: Optional[Dict[str, Set[str]]] = None,
+) -> Dict[str, Any]:
+    """
+    Returns:
+        {
+          "valid": bool,
+          "errors": [{"code", "message", "arg"}, ...],
+          "skipped": str | None     (not validated: "shell", "not_ffmpeg")
+          "sec": float
+        }
+    """
+
+    start = time.perf_counter()
+    errors: List[Dict[str, Any]] = []
+
+    def report(skipped: Optional[str] = None) -> Dict[str, Any]:
+        return {
+            "valid": not errors,
+            "errors": errors,
+            "skipped": skipped,
+            "sec": time.perf_counter() - start,
+        }
+
+    def error(code: str, message: str, arg: Optional[str] = None) -> None:
+        errors.append({"code": code, "message": message, "arg": arg})
+
+    try:
+        args = split_command(command)
+    except ValueError as e:
+        error("unparseable", str(e))
+        return report()
+
+    if SHELL_OPERATORS & set(args):
+        return report("shell")
+    if not is_ffmpeg(args):
+        return report("not_ffmpeg")
+
+    inputs, outputs, dangling = _groups(args)
+    if dangling is not None:
+        error("missing_value", f"{dangling} has no value", dangling)
+    if not outputs:
+        error("no_output", "no output file")
+
+    # ---- cheap checks first: existence, filter / encoder names ----
+    file_inputs = [item for item in inputs if _is_file_input(item)]
+    for item in file_inputs:
+        if not os.path.exists(item["path"]):
+            error("missing_input", f"input does not exist: {item['path']}", item["path"])
+
+    capabilities = capabilities if capabilities is not None else ffmpeg_capabilities()
+    if capabilities:
+        for item in inputs + outputs:
+            for name, value in item["options"]:
+                if value is None:
+                    continue
+                if name in FILTER_OPTIONS and capabilities.get("filters"):
+                    for filter_name in filter_names(value):
+                        if filter_name not in capabilities["filters"]:
+                            error("unknown_filter", f"no such filter: {filter_name}", filter_name)
+                elif name in CODEC_OPTIONS and capabilities.get("encoders"):
+                    encodable = capabilities["encoders"] | capabilities.get("codecs", set())
+                    if value != "copy" and value not in encodable:
+                        error("unknown_encoder", f"no such encoder: {value}", value)
+
+    # a fresh intermediate file costs one ffprobe: only probe valid-looking commands
+    if errors:
+        return report()
+
+    # ---- input-side time ranges (durations from the media index) ----
+    source_durations = []
+    for item in file_inputs:
+        times = _times(item["options"])
+        duration = probe(item["path"])
+        seek = times.get("ss", 0.0)
+        if duration is not None:
+            if seek >= duration:
+                error(
+                    "seek_beyond_duration",
+                    f"-ss {seek:.3f}s is past the end of {os.path.basename(item['path'])} ({duration:.3f}s)",
+                    item["path"],
+                )
+                continue
+            source_durations.append(duration - seek)
+
+        if "to" in times and times["to"] <= seek:
+            error("empty_range", f"input -to {times['to']:.3f}s is not after -ss {seek:.3f}s", item["path"])
+
+    # ---- output-side time ranges ----
+    longest = max(source_durations) if source_durations and len(source_durations) == len(inputs) else None
+    for item in outputs:
+        times = _times(item["options"])
+        seek = times.get("ss", 0.0)
+        if longest is not None and seek >= longest:
+            error("seek_beyond_duration", f"-ss {seek:.3f}s is past the end of the input ({longest:.3f}s)", item["path"])
+        if "t" in times and times["t"] <= 0:
+            error("empty_range", f"-t {times['t']:.3f}s", item["path"])
+        if "to" in times and times["to"] <= seek:
+            error("empty_range", f"-to {times['to']:.3f}s is not after -ss {seek:.3f}s", item["path"])
+
+    return report()
+
+
+def run_validated_ffmpeg_command(
+        ffmpeg_command: str,
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+) -> Dict[str, object]:
+    """
+    validate_ffmpeg_command + runner (drop-in for run_ffmpeg_command).
+    A rejected command is not executed; its result carries the reasons
+    under "validation".
+    """
+
+    validation = validate_ffmpeg_command(ffmpeg_command)
+    if validation["valid"]:
+        return runner(ffmpeg_command)
+
+    reasons = "; ".join(f"{e['code']}: {e['message']}" for e in validation["errors"])
+    print(f"[FFmpeg Validation] rejected in {validation['sec'] * 1e6:.0f} µs → {reasons}")
+
+    return {
+        "command": ffmpeg_command,
+        "returncode": None,
+        "stdout": "",
+        "stderr": f"rejected by validation: {reasons}",
+        "success": False,
+        "validation": validation,
+    }
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.NamedTemporaryFile(suffix=".mp4") as source:
+        capabilities = {
+            "filters": {"scale", "fade", "afade"},
+            "encoders": {"libx264", "aac"},
+            "codecs": {"h264", "aac"},
+        }
+
+        def probe(path: str) -> float:
+            return 60.0
+
+        for example in [
+            f"ffmpeg -i {source.name} -vf scale=1080:1920,fade=t=in:d=1 -c:v libx264 out.mp4",
+            f"ffmpeg -i {source.name} -c:v h264 -c:a aac out.mp4",
+            f"ffmpeg -ss 75 -i {source.name} -c copy out.mp4",
+            f"ffmpeg -i {source.name} -vf 'scale=1080:1920,vintage_glow=0.4' -c:v h264_turbo out.mp4",
+            "ffmpeg -i missing.mp4 -ss 10 -to 5 out.mp4",
+        ]:
+            result = validate_ffmpeg_command(example, probe=probe, capabilities=capabilities)
+            print(f"\n{example}\n  valid={result['valid']} ({result['sec'] * 1e6:.0f} µs)")
+            for e in result["errors"]:
+                print(f"  - {e['code']}: {e['message']}")
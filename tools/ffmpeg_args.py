@@ -0,0 +1,156 @@
+import os
+import re
+import shlex
+import subprocess
+from typing import Dict, List, Optional, Tuple
+
+
+# ------------------------------------------------------------
+# FFmpeg command line helpers (tokenize / join / time values)
+# ------------------------------------------------------------
+def split_command(command: str) -> List[str]:
+    """
+    Tokenize an FFmpeg command line the way the platform shell would.
+    (Windows paths keep their backslashes)
+    """
+
+    if os.name == "nt":
+        tokens = shlex.split(command, posix=False)
+        return [
+            t[1:-1] if len(t) >= 2 and t[0] == t[-1] and t[0] in "\"'" else t
+            for t in tokens
+        ]
+
+    return shlex.split(command)
+
+
+def join_command(args: List[str]) -> str:
+    """
+    Inverse of split_command: quote an argument list for the platform shell.
+    """
+
+    if os.name == "nt":
+        return subprocess.list2cmdline(args)
+
+    return shlex.join(args)
+
+
+# options that take no value (everything else consumes the next token)
+NO_VALUE_OPTIONS = {
+    "y", "n", "an", "vn", "sn", "dn", "shortest", "hide_banner", "nostdin",
+    "stats", "nostats", "copyts", "start_at_zero", "accurate_seek",
+    "noaccurate_seek", "re", "ignore_unknown", "benchmark", "benchmark_all",
+    "xerror", "dump", "hex", "debug_ts", "autorotate", "noautorotate",
+    "version", "buildconf", "formats", "codecs", "encoders", "decoders",
+    "filters", "bsfs", "protocols", "pix_fmts", "sample_fmts", "layouts",
+}
+
+# options whose value is a filter graph
+FILTER_OPTIONS = {"vf", "af", "filter", "filter_complex", "lavfi"}
+
+# output "files" that are not files
+NON_FILE_OUTPUTS = {"-", "pipe:", "pipe:1", "pipe:2", "NUL", "/dev/null"}
+
+
+def option_name(token: str) -> str:
+    """
+    "-c:v" → "c", "-filter:a:0" → "filter", "-ss" → "ss"
+    """
+    return token.lstrip("-").split(":", 1)[0]
+
+
+def scan_io(args: List[str]) -> Dict[str, List[Tuple[int, str]]]:
+    """
+    Locate input and output files in an FFmpeg argument list.
+
+    Returns:
+        {"inputs": [(token_index, path), ...], "outputs": [(token_index, path), ...]}
+        (token_index of the path itself; args[0] is the program)
+    """
+
+    inputs: List[Tuple[int, str]] = []
+    outputs: List[Tuple[int, str]] = []
+
+    i = 1
+    while i < len(args):
+        token = args[i]
+
+        if token == "-i" and i + 1 < len(args):
+            inputs.append((i + 1, args[i + 1]))
+            i += 2
+            continue
+
+        if token.startswith("-") and len(token) > 1:
+            i += 1 if option_name(token) in NO_VALUE_OPTIONS else 2
+            continue
+
+        if token not in NON_FILE_OUTPUTS and not token.startswith("pipe:"):
+            outputs.append((i, token))
+        i += 1
+
+    return {"inputs": inputs, "outputs": outputs}
+
+
+def input_formats(args: List[str], inputs: List[Tuple[int, str]]) -> List[Optional[str]]:
+    """
+    Forced format (-f) of each input of scan_io(args)["inputs"], None if probed.
+    """
+
+    formats: List[Optional[str]] = []
+    start = 1
+    for index, _ in inputs:
+        options = args[start:index - 1]
+        forced = [options[j + 1] for j in range(len(options) - 1) if options[j] == "-f"]
+        formats.append(forced[-1] if forced else None)
+        start = index + 1
+    return formats
+
+
+def is_ffmpeg(args: List[str]) -> bool:
+    if not args:
+        return False
+    program = os.path.basename(args[0]).lower()
+    return program in ("ffmpeg", "ffmpeg.exe")
+
+
+_TIME_RE = re.compile(r"^(?:(\d+):)?(\d{1,2}):(\d{1,2}(?:\.\d+)?)$")
+
+
+def parse_time(value: str) -> Optional[float]:
+    """
+    FFmpeg time duration → seconds.
+
+    Accepts "SS[.ms]", "MM:SS[.ms]", "HH:MM:SS[.ms]" and the
+    "<n>s" / "<n>ms" / "<n>us" suffix forms. Returns None if unparseable.
+    """
+
+    value = value.strip()
+
+    match = _TIME_RE.match(value)
+    if match:
+        hours = int(match.group(1) or 0)
+        return hours * 3600 + int(match.group(2)) * 60 + float(match.group(3))
+
+    for suffix, scale in (("ms", 1e-3), ("us", 1e-6), ("s", 1.0)):
+        if value.endswith(suffix):
+            value, factor = value[: -len(suffix)], scale
+            break
+    else:
+        factor = 1.0
+
+    try:
+        return float(value) * factor
+    except ValueError:
+        return None
+
+
+def format_time(seconds: float) -> str:
+    """
+    Seconds → "HH:MM:SS.mmm" (stable, byte-identical across runs).
+    """
+
+    millis = int(round(seconds * 1000))
+    hours, millis = divmod(millis, 3600 * 1000)
+    minutes, millis = divmod(millis, 60 * 1000)
+    secs, millis = divmod(millis, 1000)
+    return f"{hours:02d}:{minutes:02d}:{secs:02d}.{millis:03d}"
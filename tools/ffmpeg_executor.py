@@ -1,6 +1,13 @@
+import asyncio
+import collections
+import json
 import os
 import subprocess
-from typing import Dict
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.ffmpeg_args import FILTER_OPTIONS, input_formats, is_ffmpeg, option_name, parse_time, scan_io, split_command
+from tools.media_index import get_media_index
 
 
 def run_ffmpeg_command(ffmpeg_command: str) -> Dict[str, object]:
@@ -62,6 +69,312 @@ def run_ffmpeg_command(ffmpeg_command: str) -> Dict[str, object]:
 
 
 
+# ------------------------------------------------------------
+# Async streaming executor (no shell, -progress pipe:1)
+# ------------------------------------------------------------
+# encode speed assumed for the timeout: output seconds per wall second
+MIN_EXPECTED_SPEED = 0.25
+# fixed allowance on top of the media-based timeout (startup, probing, muxing)
+TIMEOUT_BASE_SEC = 30.0
+# timeout when the output duration cannot be estimated
+DEFAULT_TIMEOUT_SEC = 600.0
+# kill FFmpeg if no progress event arrives for this long
+STALL_TIMEOUT_SEC = 60.0
+# stderr lines kept in the result
+STDERR_TAIL_LINES = 40
+
+
+def probe_duration(path: str) -> Optional[float]:
+    """
+    Container duration in seconds, or None.
+    (media index lookup; direct ffprobe when the index is disabled)
+    """
+
+    index = get_media_index()
+    if index is not None:
+        info = index.get(path)
+        return info["duration"] if info is not None and info["duration"] > 0 else None
+
+    try:
+        process = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "json", path],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=30,
+        )
+        return float(json.loads(process.stdout)["format"]["duration"])
+    except (OSError, ValueError, KeyError, TypeError, subprocess.TimeoutExpired):
+        return None
+
+
+def _time_options(args: List[str], start: int, end: int) -> Dict[str, float]:
+    """
+    -ss / -t / -to in args[start:end] (the last one of a kind wins, as in FFmpeg).
+    """
+
+    values: Dict[str, float] = {}
+    for i in range(start, min(end, len(args) - 1)):
+        token = args[i]
+        name = option_name(token) if token.startswith("-") else None
+        if name in ("t", "to", "ss"):
+            value = parse_time(args[i + 1])
+            if value is not None:
+                values[name] = value
+    return values
+
+
+def _bounded(values: Dict[str, float], total: Optional[float]) -> Optional[float]:
+    """
+    Length of [ss, to) / ss + t within something `total` seconds long (None: unknown).
+    """
+
+    if "t" in values:
+        return values["t"]
+    if "to" in values:
+        return max(0.0, values["to"] - values.get("ss", 0.0))
+    if total is None:
+        return None
+    return max(0.0, total - values.get("ss", 0.0))
+
+
+def expected_output_duration(
+        args: List[str],
+        probe: Callable[[str], Optional[float]] = probe_duration,
+) -> Optional[float]:
+    """
+    Estimate the output duration of an FFmpeg command.
+
+    -ss / -t / -to count where they are: before an -i they bound that input,
+    after the last input they bound the output that follows them.
+    - output -t (or -to minus -ss) wins
+    - otherwise the input durations (probed, bounded by the input's own
+      -ss / -t / -to; a -f concat list is the sum of its files): summed for
+      a concat filter, the longest input for everything else
+    - several outputs: the longest
+    """
+
+    io = scan_io(args)
+    inputs, outputs = io["inputs"], io["outputs"]
+
+    durations: List[Optional[float]] = []
+    start = 1
+    for (index, path), input_format in zip(inputs, input_formats(args, inputs)):
+        values = _time_options(args, start, index - 1)
+        start = index + 1
+
+        if "t" in values or "to" in values:
+            durations.append(_bounded(values, None))
+            continue
+        if input_format == "concat":
+            from tools.artifact_cache import concat_list_files
+
+            listed = concat_list_files(path)
+            parts = [probe(item) for item in listed] if listed is not None else [None]
+            total = None if None in parts else sum(parts)
+        else:
+            total = probe(path)
+        durations.append(_bounded(values, total))
+
+    concat = any(
+        option_name(token) in FILTER_OPTIONS and "concat" in args[i + 1]
+        for i, token in enumerate(args[:-1]) if token.startswith("-")
+    )
+    if durations and None not in durations:
+        total = sum(durations) if concat else max(durations)
+    else:
+        total = None
+
+    estimates = []
+    start = inputs[-1][0] + 1 if inputs else 1
+    for index, _ in outputs:
+        estimate = _bounded(_time_options(args, start, index), total)
+        start = index + 1
+        if estimate is None:
+            return None
+        estimates.append(estimate)
+
+    return max(estimates) if estimates else None
+
+
+def media_timeout(expected_duration: Optional[float]) -> float:
+    if expected_duration is None:
+        return DEFAULT_TIMEOUT_SEC
+    return TIMEOUT_BASE_SEC + expected_duration / MIN_EXPECTED_SPEED
+
+
+def _progress_event(block: Dict[str, str], expected_duration: Optional[float]) -> Dict[str, Any]:
+    """
+    One -progress block (key=value lines up to progress=...) → event dict.
+    """
+
+    def _number(key: str) -> Optional[float]:
+        try:
+            return float(block[key].rstrip("x"))
+        except (KeyError, ValueError):
+            return None
+
+    out_time_us = _number("out_time_us") or _number("out_time_ms")  # both are µs
+    out_time = out_time_us / 1_000_000 if out_time_us is not None else None
+
+    percent = None
+    if out_time is not None and expected_duration:
+        percent = min(100.0, 100.0 * out_time / expected_duration)
+
+    return {
+        "frame": int(_number("frame") or 0),
+        "fps": _number("fps"),
+        "speed": _number("speed"),
+        "out_time_sec": out_time,
+        "percent": percent,
+        "progress": block.get("progress"),
+    }
+
+
+async def arun_ffmpeg_command(
+        ffmpeg_command: str,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        timeout: Optional[float] = None,
+        stall_timeout: float = STALL_TIMEOUT_SEC,
+        stderr_tail_lines: int = STDERR_TAIL_LINES,
+) -> Dict[str, object]:
+    """
+    Execute an FFmpeg command without a shell, streaming its progress.
+
+    - `-progress pipe:1 -nostats` is added; each progress block is parsed
+      into {"frame", "fps", "speed", "out_time_sec", "percent", "progress"}
+      and passed to `on_progress`
+    - only the last `stderr_tail_lines` stderr lines are kept
+    - timeout (default) = TIMEOUT_BASE_SEC + expected output duration / MIN_EXPECTED_SPEED;
+      FFmpeg is also killed when no progress arrives for `stall_timeout` seconds
+
+    Commands that are not a plain ffmpeg invocation (shell syntax, other
+    programs) are delegated to run_ffmpeg_command.
+
+    Returns:
+        run_ffmpeg_command-compatible dict, plus
+        "progress" (last event), "timeout_sec", "timed_out", "wall_sec"
+    """
+
+    try:
+        args = split_command(ffmpeg_command)
+    except ValueError:
+        args = []
+
+    if not is_ffmpeg(args) or any(token in ("&&", "||", "|", ";", ">", "<") for token in args):
+        return await asyncio.to_thread(run_ffmpeg_command, ffmpeg_command)
+
+    if "-y" not in args and "-n" not in args:
+        args.insert(1, "-y")
+    args[1:1] = ["-progress", "pipe:1", "-nostats"]
+
+    expected_duration = await asyncio.to_thread(expected_output_duration, args)
+    timeout = timeout or media_timeout(expected_duration)
+
+    started_at = time.perf_counter()
+    stderr_tail: collections.deque = collections.deque(maxlen=stderr_tail_lines)
+    state: Dict[str, Any] = {"progress": None, "last_event_at": started_at, "killed": None}
+
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+    except OSError as e:
+        return {
+            "command": ffmpeg_command,
+            "returncode": -1,
+            "stdout": "",
+            "stderr": str(e),
+            "success": False,
+            "progress": None,
+            "timeout_sec": timeout,
+            "timed_out": False,
+            "wall_sec": time.perf_counter() - started_at,
+        }
+
+    async def read_progress():
+        block: Dict[str, str] = {}
+        async for raw in process.stdout:
+            key, _, value = raw.decode("utf-8", "replace").strip().partition("=")
+            if not key:
+                continue
+            block[key] = value
+            if key == "progress":
+                event = _progress_event(block, expected_duration)
+                state["progress"] = event
+                state["last_event_at"] = time.perf_counter()
+                if on_progress is not None:
+                    on_progress(event)
+                block = {}
+
+    async def read_stderr():
+        async for raw in process.stderr:
+            stderr_tail.append(raw.decode("utf-8", "replace").rstrip())
+
+    async def watchdog():
+        while True:
+            await asyncio.sleep(1.0)
+            now = time.perf_counter()
+            if now - started_at > timeout:
+                state["killed"] = f"timeout: not finished within {timeout:.0f}s"
+            elif now - state["last_event_at"] > stall_timeout:
+                state["killed"] = f"stalled: no progress for {stall_timeout:.0f}s"
+            else:
+                continue
+            process.kill()
+            return
+
+    readers = asyncio.gather(read_progress(), read_stderr())
+    guard = asyncio.create_task(watchdog())
+    try:
+        await readers
+        returncode = await process.wait()
+    finally:
+        guard.cancel()
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+
+    if state["killed"]:
+        stderr_tail.append(f"killed ({state['killed']})")
+
+    return {
+        "command": ffmpeg_command,
+        "returncode": returncode,
+        "stdout": "",
+        "stderr": "\n".join(stderr_tail),
+        "success": returncode == 0 and not state["killed"],
+        "progress": state["progress"],
+        "timeout_sec": timeout,
+        "timed_out": bool(state["killed"]),
+        "wall_sec": time.perf_counter() - started_at,
+    }
+
+
+def print_progress(event: Dict[str, Any]) -> None:
+    """
+    Single-line live progress (on_progress callback).
+    """
+
+    percent = f"{event['percent']:5.1f}%" if event["percent"] is not None else "  ?  "
+    speed = f"{event['speed']:.2f}x" if event["speed"] is not None else "?"
+    end = "\n" if event["progress"] == "end" else "\r"
+    print(f"[FFmpeg] {percent} frame={event['frame']} fps={event['fps']} speed={speed}", end=end, flush=True)
+
+
+def run_ffmpeg_command_streaming(
+        ffmpeg_command: str,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, object]:
+    """
+    Blocking wrapper of arun_ffmpeg_command (for worker threads / sync runs).
+    """
+    return asyncio.run(arun_ffmpeg_command(ffmpeg_command, on_progress=on_progress))
+
+
 def resolve_paths(command: str, env: dict) -> str:
 
     input_dir = os.path.normpath(env['input_video_dir'])
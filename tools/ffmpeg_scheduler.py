@@ -0,0 +1,308 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from tools.artifact_cache import concat_list_files
+from tools.ffmpeg_args import input_formats, is_ffmpeg, join_command, option_name, scan_io, split_command
+from tools.ffmpeg_executor import run_ffmpeg_command
+from utils.tracing import trace_span
+
+
+# ------------------------------------------------------------
+# Dependency-aware parallel FFmpeg job scheduler
+# ------------------------------------------------------------
+# Commands of one run form a DAG through the files they read and write
+# (extractions → normalization → concat). Jobs whose dependencies are done
+# run concurrently; the CPU thread budget is split across running jobs
+# with -threads.
+
+def _norm(path: str) -> str:
+    return os.path.normcase(os.path.abspath(path))
+
+
+def build_job_graph(commands: List[str]) -> List[Dict[str, Any]]:
+    """
+    Infer each command's input/output files and its dependencies.
+
+    Job j depends on an earlier job i if
+    - j reads a file i writes        (read after write)
+    - j writes a file i writes       (write after write)
+    - j writes a file i reads        (write after read)
+    A `-f concat` list input also reads every file the list names.
+    Commands whose files cannot be inferred (not ffmpeg, no output, concat
+    list not readable yet) act as barriers: they wait for every earlier job
+    and every later job waits for them.
+
+    Only read-after-write edges are data dependencies ("data_deps"):
+    if one of them fails, the job is skipped. Other edges only order jobs.
+
+    Returns:
+        [{"index", "command", "args", "inputs", "outputs", "deps", "data_deps", "barrier"}, ...]
+    """
+
+    jobs: List[Dict[str, Any]] = []
+
+    for index, command in enumerate(commands):
+        try:
+            args = split_command(command)
+        except ValueError:
+            args = []
+
+        io = scan_io(args) if is_ffmpeg(args) else {"inputs": [], "outputs": []}
+        inputs = {_norm(path) for _, path in io["inputs"]}
+        outputs = {_norm(path) for _, path in io["outputs"]}
+        barrier = not outputs
+
+        for (_, path), input_format in zip(io["inputs"], input_formats(args, io["inputs"])):
+            if input_format == "concat":
+                listed = concat_list_files(path)
+                if listed is None:
+                    barrier = True
+                else:
+                    inputs |= {_norm(item) for item in listed}
+
+        deps: Set[int] = set()
+        data_deps: Set[int] = set()
+        for earlier in jobs:
+            if earlier["outputs"] & inputs:
+                data_deps.add(earlier["index"])
+
+            if (
+                barrier
+                or earlier["barrier"]
+                or earlier["outputs"] & (inputs | outputs)
+                or earlier["inputs"] & outputs
+            ):
+                deps.add(earlier["index"])
+
+        jobs.append({
+            "index": index,
+            "command": command,
+            "args": args,
+            "inputs": inputs,
+            "outputs": outputs,
+            "deps": deps,
+            "data_deps": data_deps,
+            "barrier": barrier,
+        })
+
+    return jobs
+
+
+def with_threads(job: Dict[str, Any], threads: int) -> str:
+    """
+    Command of `job` with `-threads N` in front of every output
+    (unless the command already sets -threads).
+    """
+
+    args = job["args"]
+    if job["barrier"] or any(option_name(t) == "threads" for t in args if t.startswith("-")):
+        return job["command"]
+
+    positions = {index for index, _ in scan_io(args)["outputs"]}
+
+    rewritten: List[str] = []
+    for index, token in enumerate(args):
+        if index in positions:
+            rewritten += ["-threads", str(threads)]
+        rewritten.append(token)
+
+    return join_command(rewritten)
+
+
+def critical_path(jobs: List[Dict[str, Any]], wall: Dict[int, float]) -> List[int]:
+    """
+    Longest (by wall time) dependency chain through the job DAG.
+    """
+
+    finish: Dict[int, float] = {}
+    previous: Dict[int, Optional[int]] = {}
+
+    # jobs are in command order, so every dependency comes first
+    for job in jobs:
+        best, best_dep = 0.0, None
+        for dep in job["deps"]:
+            if finish[dep] > best:
+                best, best_dep = finish[dep], dep
+        finish[job["index"]] = best + wall.get(job["index"], 0.0)
+        previous[job["index"]] = best_dep
+
+    if not finish:
+        return []
+
+    node: Optional[int] = max(finish, key=finish.get)
+    path = []
+    while node is not None:
+        path.append(node)
+        node = previous[node]
+
+    return path[::-1]
+
+
+def run_ffmpeg_jobs(
+        commands: List[str],
+        max_workers: Optional[int] = None,
+        thread_budget: Optional[int] = None,
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+        task_indices: Optional[List[int]] = None,
+) -> Dict[str, Any]:
+    """
+    Run FFmpeg commands as a DAG on a worker pool.
+
+    Args:
+        commands: resolved FFmpeg commands, in task order
+        max_workers: concurrent FFmpeg processes (default: min(4, cpu count))
+        thread_budget: total encoder threads shared by running jobs (default: cpu count)
+        runner: executes one command (run_ffmpeg_command-compatible result)
+        task_indices: task of each command, for "ffmpeg" trace spans
+            (queue_wait = time between ready and started)
+
+    Returns:
+        {
+          "results": [runner result per command, in command order],
+          "jobs": [{"index", "deps", "threads", "start_sec", "wall_sec"}, ...],
+          "critical_path": [job index, ...],
+          "critical_path_sec": float,
+          "wall_sec": float
+        }
+        A job whose input comes from a failed job is not run
+        (success=False, skipped=True).
+    """
+
+    cpu_count = os.cpu_count() or 1
+    max_workers = max_workers or min(4, cpu_count)
+    thread_budget = thread_budget or cpu_count
+
+    jobs = build_job_graph(commands)
+    remaining = {job["index"]: set(job["deps"]) for job in jobs}
+    dependents: Dict[int, List[int]] = {job["index"]: [] for job in jobs}
+    for job in jobs:
+        for dep in job["deps"]:
+            dependents[dep].append(job["index"])
+
+    results: Dict[int, Dict[str, object]] = {}
+    report: Dict[int, Dict[str, Any]] = {}
+    failed: Set[int] = set()
+
+    ready = [job["index"] for job in jobs if not job["deps"]]
+    started_at = time.perf_counter()
+    ready_at = {index: started_at for index in ready}
+
+    def _settle(index: int) -> None:
+        """
+        `index` finished (or was skipped): release the jobs waiting on it.
+        """
+        for child in dependents[index]:
+            remaining[child].discard(index)
+            if remaining[child]:
+                continue
+
+            if jobs[child]["data_deps"] & failed:
+                results[child] = {
+                    "command": commands[child],
+                    "returncode": -1,
+                    "stdout": "",
+                    "stderr": "skipped: an input of this command was not produced",
+                    "success": False,
+                    "skipped": True,
+                }
+                report[child] = {
+                    "index": child,
+                    "deps": sorted(jobs[child]["deps"]),
+                    "threads": 0,
+                    "start_sec": None,
+                    "wall_sec": 0.0,
+                }
+                failed.add(child)
+                _settle(child)
+            else:
+                ready.append(child)
+                ready_at[child] = time.perf_counter()
+
+    def _run(index: int, command: str, threads: int):
+        start = time.perf_counter()
+        with trace_span(
+                "ffmpeg",
+                task_indices[index] if task_indices else None,
+                queue_wait=start - ready_at[index],
+                job=index,
+                threads=threads,
+        ) as span:
+            result = runner(command)
+            span.update(success=result.get("success"), cache=result.get("artifact_cache"))
+        return result, start - started_at, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+
+        while ready or running:
+            # launch ready jobs; threads are split over everything that will run now
+            while ready and len(running) < max_workers:
+                index = ready.pop(0)
+                concurrent = min(max_workers, len(running) + 1 + len(ready))
+                threads = max(1, thread_budget // concurrent)
+
+                command = with_threads(jobs[index], threads)
+                running[pool.submit(_run, index, command, threads)] = index
+                report[index] = {"index": index, "deps": sorted(jobs[index]["deps"]), "threads": threads}
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                index = running.pop(future)
+                try:
+                    result, start_sec, wall_sec = future.result()
+                except Exception as e:
+                    result, start_sec, wall_sec = {
+                        "command": commands[index],
+                        "returncode": -1,
+                        "stdout": "",
+                        "stderr": str(e),
+                        "success": False,
+                    }, 0.0, 0.0
+
+                results[index] = result
+                report[index].update(start_sec=start_sec, wall_sec=wall_sec)
+                if not result.get("success"):
+                    failed.add(index)
+
+                _settle(index)
+
+    wall = {index: info.get("wall_sec", 0.0) for index, info in report.items()}
+    path = critical_path(jobs, wall)
+
+    return {
+        "results": [results[i] for i in range(len(commands))],
+        "jobs": [report[i] for i in range(len(commands))],
+        "critical_path": path,
+        "critical_path_sec": sum(wall[i] for i in path),
+        "wall_sec": time.perf_counter() - started_at,
+    }
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    def fake_runner(command: str) -> Dict[str, object]:
+        time.sleep(0.2)
+        return {"command": command, "returncode": 0, "stdout": "", "stderr": "", "success": True}
+
+    example_commands = [
+        f"ffmpeg -y -ss 00:00:10 -i mv_{i}.mp4 -t 5 clip_{i}.mp4" for i in range(1, 7)
+    ] + [
+        "ffmpeg -y " + " ".join(f"-i clip_{i}.mp4" for i in range(1, 7))
+        + " -filter_complex concat=n=6:v=1:a=1 output.mp4",
+        "ffmpeg -y -i output.mp4 -af loudnorm output_loudnorm.mp4",
+    ]
+
+    schedule = run_ffmpeg_jobs(example_commands, max_workers=6, thread_budget=12, runner=fake_runner)
+
+    print("\n===== FFmpeg Schedule =====")
+    for info in schedule["jobs"]:
+        print(info)
+    print("critical path:", schedule["critical_path"], f"{schedule['critical_path_sec']:.2f}s")
+    print(f"wall: {schedule['wall_sec']:.2f}s (serial would be {0.2 * len(example_commands):.2f}s)")
+    print(schedule["results"][6]["command"])
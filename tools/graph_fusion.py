@@ -0,0 +1,245 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+from tools.ffmpeg_args import format_time, join_command, parse_time
+from tools.command_compiler import (
+    AUDIO_ENCODE_ARGS,
+    DEFAULT_RESOLUTION,
+    LOUDNORM_FILTER,
+    SUPPORTED_OPERATIONS,
+    VIDEO_ENCODE_ARGS,
+    scale_pad_filter,
+)
+
+
+# ------------------------------------------------------------
+# Filter-graph fusion: consecutive structured tasks → one FFmpeg process
+# ------------------------------------------------------------
+# Per-task compilation writes a full intermediate file per task, which the
+# next task decodes again (trim → scale → loudnorm → concat).
+# Fusion compiles a run of tasks into a single -filter_complex graph:
+#   - trims become inputs with input seeking (-ss / -t before -i)
+#   - scale_pad / fps / loudnorm become filters on the current streams
+#   - concat becomes the concat filter
+# and only the final streams are encoded (once).
+#
+# Outputs get the same file names the last per-task command would have
+# written, so the compile state after fusion equals the per-task state
+# (later compiled tasks continue from it). Intermediate files (e.g. the
+# trimmed clips before concat) are no longer written.
+
+FUSABLE_OPERATIONS = SUPPORTED_OPERATIONS
+
+
+def can_fuse(structured: Optional[Dict[str, Any]]) -> bool:
+    return bool(structured) and structured.get("operation") in FUSABLE_OPERATIONS
+
+
+class _Graph:
+    """
+    Inputs, filter chains and stream labels of one fused command.
+    """
+
+    def __init__(self):
+        self.inputs: List[List[str]] = []
+        self.chains: List[str] = []
+        self._labels = 0
+
+    def add_input(self, args: List[str]) -> Dict[str, Any]:
+        index = len(self.inputs)
+        self.inputs.append(args)
+        return {"v": f"{index}:v", "a": f"{index}:a"}
+
+    def filter(self, label: str, expression: str, kind: str) -> str:
+        self._labels += 1
+        out = f"{kind}{self._labels}"
+        self.chains.append(f"[{label}]{expression}[{out}]")
+        return out
+
+    def join(self, labels: List[str], expression: str) -> Tuple[str, str]:
+        self._labels += 1
+        video, audio = f"v{self._labels}", f"a{self._labels}"
+        self.chains.append("".join(f"[{label}]" for label in labels) + f"{expression}[{video}][{audio}]")
+        return video, audio
+
+
+def _map_spec(label: str) -> str:
+    # input streams ("0:v") are mapped directly, filter outputs by label
+    return f"{label}:0" if ":" in label else f"[{label}]"
+
+
+def _segment(path: str) -> Dict[str, Any]:
+    """
+    A stream pair (video, audio) that currently corresponds to `path`.
+    Existing files become graph inputs only when a fused task touches them.
+    """
+    return {"path": path, "v": None, "a": None, "touched": False}
+
+
+def _streams(graph: _Graph, segment: Dict[str, Any]) -> Dict[str, Any]:
+    if segment["v"] is None:
+        segment.update(graph.add_input(["-i", segment["path"]]))
+    return segment
+
+
+def compile_fused_command(
+        tasks: List[Tuple[int, Dict[str, Any]]],
+        env: Dict[str, str],
+        state: Dict[str, Any],
+) -> Optional[List[str]]:
+    """
+    Compile consecutive structured tasks into one FFmpeg argument list.
+
+    Args:
+        tasks: [(task_index, structured), ...] in task order
+        env: agent env (input_video_dir / output_dir)
+        state: compile state before the first task (command_compiler);
+            updated in place exactly like per-task compilation would
+
+    Returns:
+        argument list, or None if any task cannot be fused
+        (state is left unchanged on None).
+    """
+
+    if not tasks or not all(can_fuse(structured) for _, structured in tasks):
+        return None
+
+    output_dir = os.path.normpath(env["output_dir"])
+    graph = _Graph()
+
+    clips = [_segment(path) for path in state["clips"]]
+    current = _segment(state["current"]) if state["current"] is not None else None
+    resolution = state["resolution"]
+
+    for task_index, structured in tasks:
+        operation = structured["operation"]
+
+        # ---- trim: input seeking, no filter needed ----
+        if operation == "trim":
+            start = parse_time(str(structured.get("start_time", "")))
+            end = parse_time(str(structured.get("end_time", "")))
+            input_file = structured.get("input_file")
+            if start is None or end is None or end <= start or not input_file:
+                return None
+
+            source = os.path.join(os.path.normpath(env["input_video_dir"]), input_file)
+            segment = _segment(os.path.join(output_dir, f"clip_{task_index:02d}.mp4"))
+            segment.update(graph.add_input(["-ss", format_time(start), "-t", format_time(end - start), "-i", source]))
+            segment["touched"] = True
+            clips.append(segment)
+            continue
+
+        # clips / current may be incomplete after an uncompiled task
+        if state.get("unknown"):
+            return None
+
+        # ---- concat ----
+        if operation == "concat":
+            if current is not None or len(clips) < 2:
+                return None
+
+            labels = []
+            for segment in clips:
+                _streams(graph, segment)
+                video = segment["v"]
+                if resolution is None:
+                    video = graph.filter(video, scale_pad_filter(*DEFAULT_RESOLUTION), "v")
+                labels += [video, segment["a"]]
+
+            video, audio = graph.join(labels, f"concat=n={len(clips)}:v=1:a=1")
+            current = {
+                "path": os.path.join(output_dir, f"concat_{task_index:02d}.mp4"),
+                "v": video,
+                "a": audio,
+                "touched": True,
+            }
+            clips = []
+            continue
+
+        # ---- per-file filters on the working file or on every clip ----
+        targets = [current] if current is not None else clips
+        if not targets:
+            return None
+
+        try:
+            if operation == "scale_pad":
+                width, height = int(structured["width"]), int(structured["height"])
+                kind, expression = "v", scale_pad_filter(width, height)
+            elif operation == "fps":
+                kind, expression = "v", f"fps={structured['fps']}"
+            else:
+                kind, expression = "a", LOUDNORM_FILTER
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        for i, segment in enumerate(targets, 1):
+            _streams(graph, segment)
+            segment[kind] = graph.filter(segment[kind], expression, kind)
+            segment["path"] = os.path.join(output_dir, f"{operation}_{task_index:02d}_{i:02d}.mp4")
+            segment["touched"] = True
+
+        if operation == "scale_pad":
+            resolution = (width, height)
+
+    # ---- outputs: final streams touched by the fused tasks ----
+    final = [current] if current is not None else clips
+    outputs = [segment for segment in final if segment["touched"]]
+
+    args = ["ffmpeg", "-y"]
+    for input_args in graph.inputs:
+        args += input_args
+    if graph.chains:
+        args += ["-filter_complex", ";".join(graph.chains)]
+    for segment in outputs:
+        args += [
+            "-map", _map_spec(segment["v"]),
+            "-map", _map_spec(segment["a"]),
+            *VIDEO_ENCODE_ARGS,
+            *AUDIO_ENCODE_ARGS,
+            segment["path"],
+        ]
+
+    state["clips"] = [segment["path"] for segment in clips]
+    state["current"] = current["path"] if current is not None else None
+    state["resolution"] = resolution
+    return args
+
+
+def compile_fused_command_string(
+        tasks: List[Tuple[int, Dict[str, Any]]],
+        env: Dict[str, str],
+        state: Dict[str, Any],
+) -> Optional[str]:
+    """
+    compile_fused_command, joined into a shell command line.
+    """
+
+    args = compile_fused_command(tasks, env, state)
+    return join_command(args) if args is not None else None
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    from tools.command_compiler import compile_ffmpeg_command_string, new_compile_state
+
+    env = {"input_video_dir": "assets/video", "output_dir": "outputs"}
+
+    structured_tasks = [
+        (1, {"operation": "trim", "input_file": "mv_complicated.mp4", "start_time": "01:10", "end_time": "01:37"}),
+        (2, {"operation": "trim", "input_file": "mv_sk8er_boi.mp4", "start_time": "00:46", "end_time": "01:03"}),
+        (3, {"operation": "scale_pad", "width": 1080, "height": 1920}),
+        (4, {"operation": "concat"}),
+        (5, {"operation": "loudnorm"}),
+    ]
+
+    per_task_state = new_compile_state()
+    print("\n===== Per-task commands =====")
+    for idx, structured in structured_tasks:
+        print(compile_ffmpeg_command_string(structured, env, per_task_state, idx))
+
+    fused_state = new_compile_state()
+    print("\n===== Fused command =====")
+    print(compile_fused_command_string(structured_tasks, env, fused_state))
+    print("\nsame compile state:", fused_state == per_task_state)
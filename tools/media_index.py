@@ -0,0 +1,351 @@
+import json
+import os
+import re
+import sqlite3
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MEDIA_EXTENSIONS = (".mp4", ".mov", ".mkv", ".webm", ".avi", ".m4v", ".mp3", ".wav", ".aac", ".m4a", ".flac")
+MEDIA_FILE_RE = re.compile(
+    r"[\w\-.]+\.(?:" + "|".join(ext[1:] for ext in MEDIA_EXTENSIONS) + r")\b",
+    re.IGNORECASE,
+)
+
+
+# ------------------------------------------------------------
+# Persistent media metadata index (ffprobe cache)
+# ------------------------------------------------------------
+# One ffprobe per (path, size, mtime), no decoding (packet flags only):
+#
+#   {"duration", "format", "bit_rate",
+#    "video_codec", "profile", "pix_fmt", "width", "height", "fps",
+#    "audio_codec", "sample_rate", "channels",
+#    "keyframes": [sec, ...], "gop"}
+#
+# Results live in memory (O(1) lookups) and in SQLite, so unchanged files
+# are never probed again, across runs and processes.
+#
+# warm(directory) probes every media file of a directory in the background
+# on a worker pool; get() of a file still being probed waits for that probe
+# instead of starting a second one.
+
+class MediaIndex:
+    """
+    Media metadata by path, validated by (size, mtime).
+    """
+
+    def __init__(self, path: str, ffprobe: str = "ffprobe", max_workers: int = 4):
+        self.path = path
+        self.ffprobe = ffprobe
+        self.max_workers = max_workers
+
+        self._memory: Dict[str, Tuple[List[int], Dict[str, Any]]] = {}
+        self._pending: Dict[str, threading.Event] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._stats = {"lookups": 0, "probes": 0, "probe_failures": 0, "probe_sec": 0.0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS media (
+                path       TEXT PRIMARY KEY,
+                size       INTEGER NOT NULL,
+                mtime_ns   INTEGER NOT NULL,
+                info       TEXT NOT NULL,
+                probed_at  REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    # --------------------------------------------------------
+    # Lookup
+    # --------------------------------------------------------
+    @staticmethod
+    def _signature(path: str) -> Optional[List[int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def _cached(self, path: str, signature: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Stored info of an unchanged file (memory, then SQLite). Caller holds the lock.
+        """
+
+        entry = self._memory.get(path)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, info FROM media WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None or [row[0], row[1]] != signature:
+            return None
+
+        info = json.loads(row[2])
+        self._memory[path] = (signature, info)
+        return info
+
+    def get(self, path: str) -> Optional[Dict[str, Any]]:
+        """
+        Media info of `path` (probed now if unknown or changed),
+        or None if the file is missing or cannot be probed.
+        """
+
+        path = os.path.abspath(path)
+        signature = self._signature(path)
+        if signature is None:
+            return None
+
+        with self._lock:
+            self._stats["lookups"] += 1
+            info = self._cached(path, signature)
+            pending = self._pending.get(path)
+        if info is not None:
+            return info
+
+        if pending is not None:
+            pending.wait()
+            with self._lock:
+                info = self._cached(path, signature)
+            if info is not None:
+                return info
+
+        return self._probe_and_store(path, signature)
+
+    # --------------------------------------------------------
+    # Probing
+    # --------------------------------------------------------
+    def warm(self, directory: str) -> Dict[str, int]:
+        """
+        Probe new / changed media files of `directory` in the background.
+
+        Returns:
+            {"files", "cached", "probing"}
+        """
+
+        try:
+            names = sorted(os.listdir(directory))
+        except OSError:
+            return {"files": 0, "cached": 0, "probing": 0}
+
+        paths = [
+            os.path.abspath(os.path.join(directory, name)) for name in names
+            if name.lower().endswith(MEDIA_EXTENSIONS)
+        ]
+
+        jobs = []
+        with self._lock:
+            for path in paths:
+                signature = self._signature(path)
+                if signature is None or path in self._pending or self._cached(path, signature) is not None:
+                    continue
+                self._pending[path] = threading.Event()
+                jobs.append((path, signature))
+
+            if jobs and self._pool is None:
+                self._pool = ThreadPoolExecutor(self.max_workers, thread_name_prefix="media-index")
+
+        for path, signature in jobs:
+            self._pool.submit(self._probe_and_store, path, signature)
+
+        return {"files": len(paths), "cached": len(paths) - len(jobs), "probing": len(jobs)}
+
+    def wait(self) -> None:
+        """
+        Block until every background probe has finished.
+        """
+
+        with self._lock:
+            pending = list(self._pending.values())
+        for event in pending:
+            event.wait()
+
+    def _probe_and_store(self, path: str, signature: List[int]) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        info = None
+        try:
+            info = self._probe(path)
+        finally:
+            with self._lock:
+                self._stats["probes"] += 1
+                self._stats["probe_sec"] += time.perf_counter() - start
+                if info is None:
+                    self._stats["probe_failures"] += 1
+                else:
+                    self._memory[path] = (signature, info)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO media (path, size, mtime_ns, info, probed_at) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        (path, signature[0], signature[1], json.dumps(info), time.time()),
+                    )
+                    self._conn.commit()
+
+                event = self._pending.pop(path, None)
+            if event is not None:
+                event.set()
+
+        return info
+
+    def _probe(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            process = subprocess.run(
+                [
+                    self.ffprobe, "-v", "error",
+                    "-show_entries", "format=duration,bit_rate,format_name",
+                    "-show_entries",
+                    "stream=index,codec_type,codec_name,profile,pix_fmt,width,height,"
+                    "avg_frame_rate,r_frame_rate,sample_rate,channels",
+                    "-show_entries", "packet=stream_index,pts_time,flags",
+                    "-of", "json",
+                    path,
+                ],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                timeout=120,
+            )
+            data = json.loads(process.stdout or "{}")
+        except (OSError, ValueError, subprocess.TimeoutExpired):
+            return None
+
+        if "format" not in data:
+            return None
+        return parse_probe(data)
+
+    # --------------------------------------------------------
+    # Stats
+    # --------------------------------------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM media").fetchone()
+            return {**self._stats, "entries": count, "pending": len(self._pending)}
+
+
+def _rate(value: Optional[str]) -> Optional[float]:
+    try:
+        num, _, den = (value or "").partition("/")
+        rate = float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+    return round(rate, 3) if rate > 0 else None
+
+
+def _number(value: Any, kind=float) -> Optional[float]:
+    try:
+        return kind(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_probe(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    ffprobe JSON (format, streams, packets) → media info.
+    """
+
+    fmt = data.get("format") or {}
+    streams = data.get("streams") or []
+    # streams without codec_type: single video stream
+    video = next((s for s in streams if s.get("codec_type", "video") == "video"), {})
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), {})
+    video_index = video.get("index", 0)
+
+    keyframes = sorted(
+        float(packet["pts_time"])
+        for packet in data.get("packets", [])
+        if packet.get("stream_index", video_index) == video_index
+        and "K" in packet.get("flags", "")
+        and packet.get("pts_time") not in (None, "N/A")
+    ) if video else []
+
+    gaps = sorted(b - a for a, b in zip(keyframes, keyframes[1:]))
+
+    return {
+        "duration": _number(fmt.get("duration")) or 0.0,
+        "format": fmt.get("format_name"),
+        "bit_rate": _number(fmt.get("bit_rate"), int),
+        "video_codec": video.get("codec_name"),
+        "profile": video.get("profile"),
+        "pix_fmt": video.get("pix_fmt"),
+        "width": video.get("width"),
+        "height": video.get("height"),
+        "fps": _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+        "audio_codec": audio.get("codec_name"),
+        "sample_rate": _number(audio.get("sample_rate"), int),
+        "channels": audio.get("channels"),
+        "keyframes": keyframes,
+        "gop": round(gaps[len(gaps) // 2], 3) if gaps else None,
+    }
+
+
+def media_facts(info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The part of the media info an LLM needs to write a command.
+    """
+
+    facts: Dict[str, Any] = {"duration": round(info["duration"], 3)}
+    if info.get("video_codec"):
+        video = f"{info['video_codec']} {info.get('width')}x{info.get('height')}"
+        facts["video"] = f"{video}@{info['fps']:g}fps" if info.get("fps") else video
+    if info.get("audio_codec"):
+        facts["audio"] = f"{info['audio_codec']} {info.get('sample_rate')}Hz {info.get('channels')}ch"
+    if info.get("gop"):
+        facts["gop_sec"] = info["gop"]
+    return facts
+
+
+_media_index: Optional[MediaIndex] = None
+_media_index_lock = threading.Lock()
+
+
+def get_media_index() -> Optional[MediaIndex]:
+    """
+    Process-wide media index.
+
+    Environment:
+        MEDIA_INDEX=0               disable the index (no media facts, direct ffprobe)
+        MEDIA_INDEX_PATH            SQLite file (default: .cache/media_index.sqlite)
+        MEDIA_PROBE_WORKERS         ffprobe processes at once (default: 4)
+    """
+
+    global _media_index
+
+    if os.getenv("MEDIA_INDEX", "1") == "0":
+        return None
+
+    with _media_index_lock:
+        if _media_index is None:
+            _media_index = MediaIndex(
+                path=os.getenv("MEDIA_INDEX_PATH", os.path.join(PROJECT_ROOT, ".cache", "media_index.sqlite")),
+                max_workers=int(os.getenv("MEDIA_PROBE_WORKERS", "4")),
+            )
+    return _media_index
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import sys
+
+    directory = sys.argv[1] if len(sys.argv) > 1 else "."
+    index = get_media_index() or MediaIndex(os.path.join(PROJECT_ROOT, ".cache", "media_index.sqlite"))
+
+    print(index.warm(directory))
+    index.wait()
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(MEDIA_EXTENSIONS):
+            info = index.get(os.path.join(directory, name))
+            print(name, media_facts(info) if info else None)
+    print(index.stats())
@@ -0,0 +1,350 @@
+import bisect
+import os
+from typing import Any, Callable, Dict, List, Optional
+
+from tools.ffmpeg_args import (
+    NO_VALUE_OPTIONS,
+    format_time,
+    is_ffmpeg,
+    join_command,
+    option_name,
+    parse_time,
+    scan_io,
+    split_command,
+)
+from tools.ffmpeg_executor import run_ffmpeg_command
+from tools.media_index import MediaIndex, get_media_index
+
+# ------------------------------------------------------------
+# Trim optimization pass
+# ------------------------------------------------------------
+# options that force a re-encode (stream copy impossible)
+REENCODE_OPTIONS = {"vf", "af", "filter", "filter_complex", "lavfi", "r", "s", "aspect", "ar", "ac", "sample_fmt"}
+
+# encoder settings: a stream copy is only chosen when every one of them is a
+# codec / pix_fmt the source already has (anything else asks for an encode)
+ENCODER_OPTIONS = {
+    "c", "codec", "vcodec", "acodec", "crf", "qp", "preset", "tune", "profile",
+    "level", "b", "maxrate", "minrate", "bufsize", "g", "bf", "pix_fmt",
+    "x264opts", "x264-params", "x265-params",
+}
+CODEC_OPTIONS = {"c", "codec", "vcodec", "acodec"}
+
+# -c values → codec they produce
+CODEC_NAMES = {
+    "libx264": "h264", "h264": "h264", "libx265": "hevc", "hevc": "hevc",
+    "libvpx": "vp8", "vp8": "vp8", "libvpx-vp9": "vp9", "vp9": "vp9",
+    "aac": "aac", "libfdk_aac": "aac", "libmp3lame": "mp3", "mp3": "mp3",
+    "libopus": "opus", "opus": "opus", "libvorbis": "vorbis", "vorbis": "vorbis",
+}
+
+# output extension → (video codecs, audio codecs) the container accepts
+# (None: any codec; extensions not listed are never stream copied)
+CONTAINER_CODECS = {
+    ".mp4": ({"h264", "hevc", "mpeg4", "av1"}, {"aac", "mp3", "ac3", "alac"}),
+    ".m4v": ({"h264", "hevc", "mpeg4", "av1"}, {"aac", "mp3", "ac3", "alac"}),
+    ".mov": ({"h264", "hevc", "mpeg4", "prores", "mjpeg"}, {"aac", "mp3", "ac3", "alac", "pcm_s16le"}),
+    ".mkv": (None, None),
+    ".webm": ({"vp8", "vp9", "av1"}, {"opus", "vorbis"}),
+    ".ts": ({"h264", "hevc", "mpeg2video"}, {"aac", "mp3", "ac3"}),
+}
+
+# filters whose meaning depends on timestamps (moving -ss would change them)
+TIME_SENSITIVE_FILTERS = ("trim", "fade", "setpts", "select", "enable=", "between(", "drawtext", "sendcmd", "zmq")
+
+# how close to a keyframe a cut point must be to count as "on" it (seconds)
+KEYFRAME_TOLERANCE = 0.05
+
+
+def _options(args: List[str], start: int, end: int) -> List[List[str]]:
+    """
+    Split args[start:end] into [option, value] / [flag] groups.
+    """
+
+    groups, i = [], start
+    while i < end:
+        token = args[i]
+        if token.startswith("-") and option_name(token) not in NO_VALUE_OPTIONS and i + 1 < end:
+            groups.append([token, args[i + 1]])
+            i += 2
+        else:
+            groups.append([token])
+            i += 1
+    return groups
+
+
+def _flatten(groups: List[List[str]]) -> List[str]:
+    return [token for group in groups for token in group]
+
+
+def _copy_blocker(post: List[List[str]], info: Dict[str, Any], output: str) -> Optional[str]:
+    """
+    Why the output cannot be a stream copy of the source, or None if it can.
+    """
+
+    video, audio = info.get("video_codec"), info.get("audio_codec")
+    if "an" in [option_name(g[0]) for g in post]:
+        audio = None
+
+    for group in post:
+        name = option_name(group[0])
+        if name not in ENCODER_OPTIONS:
+            continue
+        value = group[1] if len(group) == 2 else ""
+
+        if name in CODEC_OPTIONS:
+            stream = {"vcodec": "v", "acodec": "a"}.get(name) or (group[0].split(":") + [""])[1]
+            source_codec = {"v": video, "a": audio}.get(stream)
+            if value != "copy" and (source_codec is None or CODEC_NAMES.get(value) != source_codec):
+                return f"{group[0]} {value} is not the source codec"
+        elif name == "pix_fmt":
+            if value != info.get("pix_fmt"):
+                return f"-pix_fmt {value} is not the source pixel format"
+        else:
+            return f"{group[0]} requests an encode"
+
+    accepted = CONTAINER_CODECS.get(os.path.splitext(output)[1].lower())
+    if accepted is None:
+        return f"unknown container {os.path.basename(output)}"
+    for codec, allowed in ((video, accepted[0]), (audio, accepted[1])):
+        if codec is not None and allowed is not None and codec not in allowed:
+            return f"{os.path.splitext(output)[1]} cannot hold {codec}"
+    return None
+
+
+def _unchanged(command: str, reason: str) -> Dict[str, Any]:
+    return {"mode": "unchanged", "reason": reason, "commands": [command], "concat_list": None, "temp_files": []}
+
+
+def optimize_trim_command(
+        command: str,
+        media_index: Optional[MediaIndex] = None,
+) -> Dict[str, Any]:
+    """
+    Rewrite a single-input trim command for fast seeking / stream copy.
+
+    1. seek: an output-side `-ss` (after -i) is moved before the input,
+       so FFmpeg jumps to the nearest keyframe instead of decoding the prefix
+       (an output-side `-to` becomes `-t` since timestamps restart at 0)
+    2. codec choice (keyframes known to the media index):
+       - start on a keyframe, no filters, encoder options that only restate
+         the source codecs and a container that accepts them
+                                        → stream copy ("copy")
+       - otherwise                    → re-encode with fast seek ("reencode")
+       (no head re-encode + body copy: the re-encoded head would carry other
+       codec headers (SPS/PPS) than the copied body)
+
+    Returns:
+        {
+          "mode": "unchanged" | "reencode" | "copy",
+          "reason": str,
+          "commands": [str, ...],           # run in order
+          "concat_list": (path, text) | None,
+          "temp_files": [path, ...]
+        }
+    """
+
+    try:
+        args = split_command(command)
+    except ValueError:
+        return _unchanged(command, "unparseable command")
+
+    if not is_ffmpeg(args):
+        return _unchanged(command, "not an ffmpeg command")
+
+    io = scan_io(args)
+    if len(io["inputs"]) != 1 or len(io["outputs"]) != 1:
+        return _unchanged(command, "not a single-input / single-output command")
+
+    input_pos, source = io["inputs"][0]
+    output_pos, output = io["outputs"][0]
+
+    pre = _options(args, 1, input_pos - 1)          # global + input options
+    post = _options(args, input_pos + 1, output_pos)  # output options
+
+    names_pre = [option_name(g[0]) for g in pre]
+    names_post = [option_name(g[0]) for g in post]
+
+    if "copyts" in names_pre + names_post:
+        return _unchanged(command, "-copyts keeps source timestamps")
+
+    filters = " ".join(g[1] for g in post if len(g) == 2 and option_name(g[0]) in REENCODE_OPTIONS)
+    has_reencode_options = any(name in REENCODE_OPTIONS for name in names_post)
+
+    # ---- locate the cut points ----
+    start = None
+    if "ss" in names_pre:
+        start = parse_time(pre[names_pre.index("ss")][1])
+    moved = False
+
+    if "ss" in names_post:
+        if any(token in filters for token in TIME_SENSITIVE_FILTERS):
+            return _unchanged(command, "time-dependent filters")
+        if "ss" in names_pre:
+            return _unchanged(command, "both input and output seeking")
+
+        group = post.pop(names_post.index("ss"))
+        names_post = [option_name(g[0]) for g in post]
+        start = parse_time(group[1])
+        if start is None:
+            return _unchanged(command, "unparseable -ss")
+        pre.append(["-ss", format_time(start)])
+        moved = True
+
+        if "to" in names_post:
+            end = parse_time(post[names_post.index("to")][1])
+            if end is None or end <= start:
+                return _unchanged(command, "unparseable -to")
+            post[names_post.index("to")] = ["-t", format_time(end - start)]
+            names_post = [option_name(g[0]) for g in post]
+
+    if start is None:
+        return _unchanged(command, "no seek")
+
+    # output duration (None: to the end of the input)
+    duration = None
+    if "t" in names_post:
+        duration = parse_time(post[names_post.index("t")][1])
+    elif "to" in names_post:
+        # after an input -ss the output timeline starts at 0
+        duration = parse_time(post[names_post.index("to")][1])
+    elif "to" in names_pre:
+        end = parse_time(pre[names_pre.index("to")][1])
+        duration = end - start if end is not None else None
+    elif "t" in names_pre:
+        duration = parse_time(pre[names_pre.index("t")][1])
+
+    bounded = any(name in ("t", "to") for name in names_pre + names_post)
+    if bounded and (duration is None or duration <= 0):
+        return _unchanged(command, "unparseable output range")
+
+    def _build(pre_groups, post_groups, out) -> str:
+        return join_command([args[0], *_flatten(pre_groups), "-i", source, *_flatten(post_groups), out])
+
+    reencode_plan = {
+        "mode": "reencode" if moved else "unchanged",
+        "reason": "seek moved before input" if moved else "already input-seeking",
+        "commands": [_build(pre, post, output) if moved else command],
+        "concat_list": None,
+        "temp_files": [],
+    }
+
+    # ---- stream copy needs the keyframe layout ----
+    if has_reencode_options:
+        reencode_plan["reason"] += "; filters require re-encoding"
+        return reencode_plan
+
+    media_index = media_index or get_media_index()
+    info = media_index.get(source) if media_index is not None else None
+    if info is None or not info["keyframes"]:
+        reencode_plan["reason"] += "; no keyframe index"
+        return reencode_plan
+
+    keyframes = info["keyframes"]
+    pos = bisect.bisect_left(keyframes, start - KEYFRAME_TOLERANCE)
+    next_keyframe = keyframes[pos] if pos < len(keyframes) else None
+    if next_keyframe is None or abs(next_keyframe - start) > KEYFRAME_TOLERANCE:
+        reencode_plan["reason"] += f"; start {start:.3f}s is not a keyframe"
+        return reencode_plan
+
+    blocker = _copy_blocker(post, info, output)
+    if blocker is not None:
+        reencode_plan["reason"] += f"; {blocker}"
+        return reencode_plan
+
+    # start on a keyframe → whole clip is a stream copy
+    copy_post = [g for g in post if option_name(g[0]) not in ENCODER_OPTIONS]
+    return {
+        "mode": "copy",
+        "reason": f"start {start:.3f}s is a keyframe",
+        "commands": [_build(pre, copy_post + [["-c", "copy"], ["-avoid_negative_ts", "make_zero"]], output)],
+        "concat_list": None,
+        "temp_files": [],
+    }
+
+
+# ------------------------------------------------------------
+# Execution of an optimized plan
+# ------------------------------------------------------------
+def run_trim_plan(
+        plan: Dict[str, Any],
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+) -> Dict[str, object]:
+    """
+    Run the commands of a plan in order and merge their results
+    (run_ffmpeg_command-compatible, plus "trim_mode").
+    """
+
+    results = []
+    try:
+        if plan["concat_list"] is not None:
+            path, text = plan["concat_list"]
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        for command in plan["commands"]:
+            result = runner(command)
+            results.append(result)
+            if not result["success"]:
+                break
+    finally:
+        for path in plan["temp_files"]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    last = results[-1]
+    return {
+        **last,
+        "command": " && ".join(r["command"] for r in results),
+        "stdout": "".join(r["stdout"] for r in results),
+        "stderr": "".join(r["stderr"] for r in results),
+        "trim_mode": plan["mode"],
+    }
+
+
+def run_optimized_ffmpeg_command(
+        ffmpeg_command: str,
+        media_index: Optional[MediaIndex] = None,
+        runner: Callable[[str], Dict[str, object]] = run_ffmpeg_command,
+) -> Dict[str, object]:
+    """
+    optimize_trim_command + run_trim_plan (drop-in for run_ffmpeg_command).
+    """
+
+    plan = optimize_trim_command(ffmpeg_command, media_index)
+    if plan["mode"] == "unchanged":
+        return runner(ffmpeg_command)
+
+    return run_trim_plan(plan, runner)
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    class StaticIndex:
+        def get(self, path):
+            return {"duration": 200.0, "video_codec": "h264", "pix_fmt": "yuv420p", "profile": "High",
+                    "audio_codec": "aac", "keyframes": [float(k) for k in range(0, 200, 4)]}
+
+    examples = [
+        "ffmpeg -i mv_complicated.mp4 -ss 00:01:12 -to 00:01:37 -c:v libx264 -c:a aac clip_01.mp4",
+        "ffmpeg -i mv_complicated.mp4 -ss 00:01:10 -to 00:01:37 -c:v libx264 -c:a aac clip_01.mp4",
+        "ffmpeg -i mv_complicated.mp4 -ss 70 -t 27 -vf scale=1080:1920 clip_01.mp4",
+        "ffmpeg -i mv_complicated.mp4 -ss 70 -t 27 -vf fade=in:st=70:d=1 clip_01.mp4",
+        "ffmpeg -ss 70 -i mv_complicated.mp4 -to 27 -c:v libx264 clip_01.mp4",
+        "ffmpeg -ss 72 -i mv_complicated.mp4 -t 10 -c:v libx265 -crf 28 clip_01.mp4",
+        "ffmpeg -ss 72 -i mv_complicated.mp4 -t 10 -b:v 500k clip_01.mp4",
+        "ffmpeg -ss 72 -i mv_complicated.mp4 -t 10 -an clip_01.webm",
+    ]
+
+    for example in examples:
+        plan = optimize_trim_command(example, StaticIndex())
+        print(f"\n===== {plan['mode']} ({plan['reason']}) =====")
+        print(example)
+        for cmd in plan["commands"]:
+            print("  →", cmd)
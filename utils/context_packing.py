@@ -1,11 +1,50 @@
+import json
+import os
+import re
 from typing import Any, Dict, Optional
 
+# ------------------------------------------------------------
+# Token counting (tiktoken if available, else ~4 characters per token)
+# ------------------------------------------------------------
+TOKEN_MODEL = "gpt-4o-mini"
+
+_encoding = None
+_encoding_loaded = False
+
+
+def _get_encoding():
+    global _encoding, _encoding_loaded
+
+    if not _encoding_loaded:
+        _encoding_loaded = True
+        try:
+            import tiktoken
+            _encoding = tiktoken.encoding_for_model(TOKEN_MODEL)
+        except Exception:
+            # not installed, or the BPE file cannot be downloaded (offline)
+            _encoding = None
+
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text))
+    return max(1, len(text) // 4) if text else 0
+
+
+def token_counter() -> str:
+    encoding = _get_encoding()
+    return f"tiktoken:{encoding.name}" if encoding is not None else "estimate:chars/4"
+
 
 def build_execution_context(
         task_index: int,
         task_text: str,
         b_chain_v1_output: str,
         b_chain_v2_output: Optional[str] = None,
+        media: Optional[Dict[str, Dict[str, Any]]] = None,
 ) -> Dict[str, Any]:
     """
     Build an execution context by packing outputs from b_chain
@@ -28,6 +67,10 @@ def build_execution_context(
             Structured representation from b_chain_v2, if available.
             May be None for non-FFmpeg-capable tasks.
 
+        media (Optional[Dict[str, Dict[str, Any]]]):
+            Probed facts (tools/media_index.media_facts) of the files the
+            task refers to, by file name. Omitted if None or empty.
+
     Returns:
         Dict[str, Any]: Execution context dictionary.
     """
@@ -40,10 +83,219 @@ def build_execution_context(
             "b_chain_v2": b_chain_v2_output,
         },
     }
+    if media:
+        context["media"] = media
 
     return context
 
 
+# ------------------------------------------------------------
+# Compact packing (c_chain input)
+# ------------------------------------------------------------
+# The raw context is the dict repr of two free-form LLM outputs: indented
+# lines, "Label: value" boilerplate and a JSON string with its own
+# indentation. The compact form keeps only what c_chain needs:
+#
+#   {"needs":"...","op":"...","spec":{...},"task":"..."}
+#
+# - task  : original task text
+# - op    : v1 "Operation type" (dropped when spec has an "operation")
+# - needs : v1 "Required information"
+# - spec  : v2 JSON, minus fields repeating the task text
+# - media : probed facts of the referenced files (tools/media_index)
+# "FFmpeg-capable: YES" and the task index are implied (c_chain only sees
+# capable tasks) and dropped. Serialized as canonical JSON (sorted keys,
+# no whitespace), so identical tasks produce identical prompts.
+
+C_CHAIN_CONTEXT_BUDGET = int(os.getenv("C_CHAIN_CONTEXT_BUDGET", "256"))
+
+V1_LABELS = {
+    "ffmpeg-capable": None,  # implied
+    "operation type": "op",
+    "required information": "needs",
+    "reason": "reason",
+}
+
+# fields removed first when the packed context exceeds the token budget
+BUDGET_DROP_ORDER = ["needs", "reason", "op", "media"]
+
+
+def _squash(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def _parse_v1(output: Optional[str]) -> Dict[str, str]:
+    fields: Dict[str, str] = {}
+    key = None
+
+    for line in (output or "").splitlines():
+        line = line.strip().lstrip("-* ")
+        if not line:
+            continue
+
+        label, sep, value = line.partition(":")
+        label = label.strip().lower()
+        if sep and (label in V1_LABELS or re.fullmatch(r"[a-z][a-z -]{0,30}", label)):
+            key = V1_LABELS.get(label, label.replace(" ", "_").replace("-", "_"))
+            if key is not None:
+                fields[key] = _squash(value)
+        elif key is not None:
+            fields[key] = f"{fields[key]} {_squash(line)}".strip()
+
+    return {k: v for k, v in fields.items() if v}
+
+
+def _parse_v2(output: Optional[str]) -> Any:
+    if not output:
+        return None
+
+    text = re.sub(r"^```(?:json)?|```$", "", output.strip(), flags=re.MULTILINE).strip()
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return _squash(text)
+
+
+def _repeats(value: str, task: str) -> bool:
+    value = value.strip().rstrip(".").lower()
+    return value == task or (len(value) >= 12 and value in task)
+
+
+def _has_key(data: Any, key: str) -> bool:
+    if isinstance(data, dict):
+        return key in data or any(_has_key(value, key) for value in data.values())
+    if isinstance(data, list):
+        return any(_has_key(item, key) for item in data)
+    return False
+
+
+def _strip_spec(spec: Any, task_text: str) -> Any:
+    """
+    Drop empty values and strings that only repeat the task text.
+    """
+
+    task = task_text.strip().rstrip(".").lower()
+
+    if isinstance(spec, dict):
+        cleaned = {}
+        for key, value in spec.items():
+            value = _strip_spec(value, task_text)
+            if value in (None, "", [], {}):
+                continue
+            if isinstance(value, str) and _repeats(value, task):
+                continue
+            cleaned[key] = value
+        return cleaned
+
+    if isinstance(spec, list):
+        return [_strip_spec(item, task_text) for item in spec]
+
+    if isinstance(spec, str):
+        return _squash(spec)
+
+    return spec
+
+
+def _dumps(data: Dict[str, Any]) -> str:
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def _truncate_longest(data: Any, budget: int) -> Any:
+    """
+    Shorten the longest string value by a quarter (recursively).
+    """
+
+    strings = []
+
+    def collect(node, path):
+        items = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else []
+        for key, value in items:
+            if isinstance(value, str):
+                strings.append((len(value), path + [key]))
+            else:
+                collect(value, path + [key])
+
+    collect(data, [])
+    if not strings:
+        return data
+
+    length, path = max(strings, key=lambda item: item[0])
+    if length <= 16:
+        return data
+
+    node = data
+    for key in path[:-1]:
+        node = node[key]
+    node[path[-1]] = node[path[-1]][: max(16, length * 3 // 4)] + "…"
+    return data
+
+
+def compact_execution_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Compact dict form of an execution context (see above).
+    """
+
+    analysis = context.get("analysis") or {}
+    v1 = _parse_v1(analysis.get("b_chain_v1"))
+    spec = _strip_spec(_parse_v2(analysis.get("b_chain_v2")), context["task_text"])
+
+    compact: Dict[str, Any] = {"task": _squash(context["task_text"]), **v1}
+    if spec not in (None, "", {}):
+        compact["spec"] = spec
+        if _has_key(spec, "operation"):
+            compact.pop("op", None)
+    if context.get("media"):
+        compact["media"] = context["media"]
+
+    return compact
+
+
+def pack_execution_context(context: Dict[str, Any], budget_tokens: Optional[int] = None) -> str:
+    """
+    Canonical compact JSON of an execution context, within `budget_tokens`
+    (default: C_CHAIN_CONTEXT_BUDGET) where possible: low-priority fields
+    are dropped first, then the longest strings are shortened.
+    """
+
+    budget = budget_tokens or C_CHAIN_CONTEXT_BUDGET
+    compact = compact_execution_context(context)
+    packed = _dumps(compact)
+
+    for field in BUDGET_DROP_ORDER:
+        if count_tokens(packed) <= budget:
+            return packed
+        if field in compact:
+            compact.pop(field)
+            packed = _dumps(compact)
+
+    while count_tokens(packed) > budget:
+        shorter = _dumps(_truncate_longest(compact, budget))
+        if shorter == packed:
+            break  # nothing left to shorten
+        packed = shorter
+
+    return packed
+
+
+def packing_report(context: Dict[str, Any], packed: str) -> Dict[str, Any]:
+    """
+    Context tokens per c_chain request, raw vs compact.
+
+    The raw prompt embeds the context repr twice (system + human message);
+    the compact prompt embeds the packed JSON once (human message).
+    """
+
+    before = 2 * count_tokens(str(context))
+    after = count_tokens(packed)
+
+    return {
+        "before": before,
+        "after": after,
+        "saved": before - after,
+        "counter": token_counter(),
+    }
+
+
 # ------------------------------------------------------------
 # Execution
 # ------------------------------------------------------------
@@ -71,4 +323,9 @@ if __name__ == "__main__":
     )
 
     from pprint import pprint
-    pprint(example_context)
\ No newline at end of file
+    pprint(example_context)
+
+    packed = pack_execution_context(example_context)
+    print(packed)
+    print(packing_report(example_context, packed))
+    print(pack_execution_context(example_context, budget_tokens=20))
\ No newline at end of file
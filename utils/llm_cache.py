@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Sequence
+
+from langchain_core.caches import BaseCache
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, Generation
+
+
+# ------------------------------------------------------------
+# Persistent LLM response cache (SQLite, content-addressed)
+# ------------------------------------------------------------
+class SQLiteLLMCache(BaseCache):
+    """
+    On-disk LLM response cache plugged into ChatOpenAI(cache=...).
+
+    Key:
+        sha256(namespace, llm_string, prompt)
+        - llm_string : serialized model params (model, temperature, ...)
+        - prompt     : serialized full message list
+        - namespace  : prompt version (bump to invalidate old entries)
+
+    Eviction:
+        - entries older than `ttl_seconds` are treated as misses and removed
+        - LRU (by last access) once `max_entries` or `max_bytes` is exceeded
+
+    Only the generated text is stored (no pickling / object revival).
+    Cache hits are marked with generation_info["llm_cache"] = "hit".
+    """
+
+    def __init__(
+            self,
+            path: str,
+            namespace: str = "",
+            max_entries: int = 10_000,
+            max_bytes: int = 256 * 1024 * 1024,
+            ttl_seconds: Optional[float] = 30 * 24 * 3600,
+    ):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+
+        self.hits = 0
+        self.misses = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                key         TEXT PRIMARY KEY,
+                llm_string  TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                size        INTEGER NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)"
+        )
+        self._conn.commit()
+
+    # --------------------------------------------------------
+    # Key / (de)serialization
+    # --------------------------------------------------------
+    def _key(self, prompt: str, llm_string: str) -> str:
+        payload = json.dumps([self.namespace, llm_string, prompt], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _dump(return_val: Sequence[Generation]) -> str:
+        return json.dumps(
+            [
+                {"text": gen.text, "generation_info": gen.generation_info}
+                for gen in return_val
+            ],
+            ensure_ascii=False,
+        )
+
+    @staticmethod
+    def _load(value: str) -> list:
+        generations = []
+        for item in json.loads(value):
+            info = dict(item.get("generation_info") or {})
+            info["llm_cache"] = "hit"
+            generations.append(
+                ChatGeneration(
+                    message=AIMessage(content=item["text"]),
+                    generation_info=info,
+                )
+            )
+        return generations
+
+    # --------------------------------------------------------
+    # BaseCache API
+    # --------------------------------------------------------
+    def lookup(self, prompt: str, llm_string: str) -> Optional[list]:
+        key = self._key(prompt, llm_string)
+        now = time.time()
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, created_at = row
+            if self.ttl_seconds is not None and now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.hits += 1
+
+        return self._load(value)
+
+    def update(self, prompt: str, llm_string: str, return_val: Sequence[Generation]) -> None:
+        key = self._key(prompt, llm_string)
+        value = self._dump(return_val)
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache "
+                "(key, llm_string, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, llm_string, value, len(value.encode("utf-8")), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def clear(self, **kwargs: Any) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_cache")
+            self._conn.commit()
+
+    # --------------------------------------------------------
+    # Eviction / stats
+    # --------------------------------------------------------
+    def _evict(self, now: float) -> None:
+        """
+        TTL sweep, then LRU eviction down to the entry / byte limits.
+        (caller holds the lock)
+        """
+
+        if self.ttl_seconds is not None:
+            self._conn.execute(
+                "DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+            )
+
+        count, total = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+        ).fetchone()
+
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+
+        victims = []
+        for key, size in rows:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            victims.append((key,))
+            count -= 1
+            total -= size
+
+        self._conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters (this process) + current store size.
+        """
+
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM llm_cache"
+            ).fetchone()
+
+        lookups = self.hits + self.misses
+
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": count,
+            "bytes": total,
+        }
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = SQLiteLLMCache(os.path.join(tmp, "llm_cache.sqlite"), max_entries=2)
+
+        llm_string = "gpt-4o-mini/temperature=0.3"
+        for prompt in ["p1", "p2", "p3"]:
+            cache.update(prompt, llm_string, [Generation(text=f"answer to {prompt}")])
+
+        print(cache.lookup("p1", llm_string))  # evicted (LRU)
+        print(cache.lookup("p3", llm_string))
+        print(cache.stats())
@@ -0,0 +1,207 @@
+import asyncio
+import email.utils
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, Optional
+
+from utils.tracing import trace_span
+
+# ------------------------------------------------------------
+# Retry of LLM chain calls (jittered exponential backoff)
+# ------------------------------------------------------------
+# The OpenAI client does not retry (max_retries=0, configs/llm.py): every
+# chain call goes through the helpers below instead, so a rate limit or a
+# timeout waits and retries the call rather than failing the whole run.
+#
+# delay before attempt n+1:
+#   Retry-After (-ms) header of the error, if any     + up to `base` jitter
+#   otherwise uniform(0, min(max_delay, base * 2**(n-1)))   ("full jitter")
+#
+# Concurrency is not decided here: 429s and latencies feed the AIMD
+# in-flight limit of the rate governor (utils/rate_governor).
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+_stats = {"calls": 0, "retries": 0, "gave_up": 0, "backoff_sec": 0.0}
+_stats_lock = threading.Lock()
+
+
+def retry_settings() -> Dict[str, float]:
+    """
+    Environment:
+        LLM_RETRY_ATTEMPTS          attempts per call, including the first (default: 6)
+        LLM_RETRY_BASE_SEC          first backoff step (default: 0.5)
+        LLM_RETRY_MAX_DELAY_SEC     backoff / Retry-After cap (default: 60)
+    """
+    return {
+        "attempts": int(os.getenv("LLM_RETRY_ATTEMPTS", "6")),
+        "base": float(os.getenv("LLM_RETRY_BASE_SEC", "0.5")),
+        "max_delay": float(os.getenv("LLM_RETRY_MAX_DELAY_SEC", "60")),
+    }
+
+
+def is_retryable(error: BaseException) -> bool:
+    # only reached after a model call, when the clients are loaded anyway
+    import httpx
+    import openai
+
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (httpx.TimeoutException, httpx.TransportError, TimeoutError, ConnectionError))
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """
+    Seconds requested by the provider (Retry-After-Ms / Retry-After headers).
+    """
+
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        # HTTP date
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def backoff_delay(attempt: int, error: BaseException, base: float, max_delay: float) -> float:
+    """
+    Delay after failed attempt `attempt` (1-based).
+    """
+
+    requested = retry_after(error)
+    if requested is not None:
+        return min(max_delay, requested) + random.uniform(0, base)
+    return random.uniform(0, min(max_delay, base * 2 ** (attempt - 1)))
+
+
+def _next_delay(attempt: int, error: BaseException, settings: Dict[str, float]) -> Optional[float]:
+    """
+    Backoff before the next attempt, or None if the error is final.
+    """
+
+    if attempt >= settings["attempts"] or not is_retryable(error):
+        if attempt > 1:
+            with _stats_lock:
+                _stats["gave_up"] += 1
+        return None
+
+    delay = backoff_delay(attempt, error, settings["base"], settings["max_delay"])
+    with _stats_lock:
+        _stats["retries"] += 1
+        _stats["backoff_sec"] += delay
+    print(f"[LLM Retry] {type(error).__name__} (attempt {attempt}) → retry in {delay:.1f}s")
+    return delay
+
+
+def _count_call() -> None:
+    with _stats_lock:
+        _stats["calls"] += 1
+
+
+def retry_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        return dict(_stats)
+
+
+# ------------------------------------------------------------
+# Call wrappers
+# ------------------------------------------------------------
+def invoke_with_retry(chain, inputs: Dict[str, Any], config=None):
+    settings = retry_settings()
+    _count_call()
+
+    attempt = 1
+    while True:
+        try:
+            return chain.invoke(inputs, config)
+        except Exception as e:
+            delay = _next_delay(attempt, e, settings)
+            if delay is None:
+                raise
+        with trace_span("llm_backoff", kind="llm", attempt=attempt):
+            time.sleep(delay)
+        attempt += 1
+
+
+async def ainvoke_with_retry(chain, inputs: Dict[str, Any], config=None):
+    settings = retry_settings()
+    _count_call()
+
+    attempt = 1
+    while True:
+        try:
+            return await chain.ainvoke(inputs, config)
+        except Exception as e:
+            delay = _next_delay(attempt, e, settings)
+            if delay is None:
+                raise
+        with trace_span("llm_backoff", kind="llm", attempt=attempt):
+            await asyncio.sleep(delay)
+        attempt += 1
+
+
+async def astream_with_retry(chain, inputs: Dict[str, Any], config=None) -> AsyncIterator[Any]:
+    """
+    Streamed call; retried only while nothing has been yielded yet
+    (a consumer cannot take back chunks it already processed).
+    """
+
+    settings = retry_settings()
+    _count_call()
+
+    attempt = 1
+    while True:
+        started = False
+        try:
+            async for chunk in chain.astream(inputs, config):
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            delay = None if started else _next_delay(attempt, e, settings)
+            if delay is None:
+                raise
+        with trace_span("llm_backoff", kind="llm", attempt=attempt):
+            await asyncio.sleep(delay)
+        attempt += 1
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import httpx
+    import openai
+    from langchain_core.runnables import RunnableLambda
+
+    failures = {"left": 2}
+
+    def flaky(inputs: Dict[str, Any]) -> str:
+        if failures["left"]:
+            failures["left"] -= 1
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            response = httpx.Response(429, headers={"retry-after-ms": "200"}, request=request)
+            raise openai.RateLimitError("rate limited", response=response, body=None)
+        return f"ok: {inputs['task']}"
+
+    print(invoke_with_retry(RunnableLambda(flaky), {"task": "trim"}))
+    print(retry_stats())
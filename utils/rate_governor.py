@@ -0,0 +1,369 @@
+import asyncio
+import collections
+import os
+import threading
+import time
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from langchain_core.rate_limiters import BaseRateLimiter
+
+WINDOW_SEC = 60.0
+
+# AIMD in-flight limit
+AIMD_DECREASE_429 = 0.5          # limit *= 0.5 on a rate limit error
+AIMD_DECREASE_SLOW = 0.9         # limit *= 0.9 on a latency spike
+AIMD_COOLDOWN_SEC = 1.0          # at most one decrease per cooldown (a 429 burst is one event)
+LATENCY_SPIKE_FACTOR = 3.0       # latency > 3 x average latency = congestion
+LATENCY_MIN_SAMPLES = 10
+
+
+# ------------------------------------------------------------
+# Process-wide LLM request / token rate governor
+# ------------------------------------------------------------
+# Plugged into every chat model built by configs.llm.get_llm():
+# - rate_limiter=governor      : called by LangChain before each model request
+#                                (cache hits never reach it)
+# - callbacks=[governor.usage] : actual token usage once the request finished
+#
+# Budgets are sliding 60 s windows shared by every chain and every agent of
+# the process (e.g. the batch runner):
+#   requests started in the window            <= rpm
+#   tokens used in the window
+#     + in-flight requests * estimated tokens <= tpm
+# Token usage is only known afterwards, so requests in flight reserve the
+# running average of the tokens per request.
+#
+# Requests in flight are capped by an AIMD limit (between 1 and max_in_flight):
+# - every successful request adds 1 / limit (≈ +1 per round of requests)
+# - a 429 halves it, a latency spike shrinks it by 10 %
+# so concurrency settles just below the point where the provider pushes back.
+#
+# Latency is measured per model run (run_id of the callbacks) from admission,
+# so the time spent waiting for the budget is not counted. The async path runs
+# on_chat_model_start, acquire() and on_llm_end in different asyncio tasks, so
+# nothing context-local links them: LangChain starts the run and then acquires
+# on the same thread (event loop), and an admission goes to the oldest run
+# started on that thread and not admitted yet. This is exact for sync calls;
+# async requests queued for the budget at the same time may swap admission
+# times, which leaves the average latency unchanged.
+
+class _UsageCallback(BaseCallbackHandler):
+    """
+    Reports the outcome of governed requests back to the governor.
+    """
+
+    run_inline = True
+
+    def __init__(self, governor: "RateGovernor"):
+        self.governor = governor
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[Any], *, run_id: UUID, **kwargs: Any):
+        self.governor.start_run(run_id)
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], *, run_id: UUID, **kwargs: Any):
+        self.governor.start_run(run_id)
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        admitted_at = self.governor.end_run(run_id)
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        info = (generation.generation_info or {}) if generation is not None else {}
+        if info.get("llm_cache") == "hit":
+            return
+
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        tokens = usage.get("total_tokens", metadata.get("total_tokens"))
+        latency = time.monotonic() - admitted_at if admitted_at is not None else None
+        self.governor.release(tokens, latency=latency)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self.governor.end_run(run_id)
+        self.governor.release(None, rate_limited=is_rate_limit_error(error))
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status == 429
+
+
+class RateGovernor(BaseRateLimiter):
+    """
+    Requests-per-minute / tokens-per-minute limiter (0 = unlimited)
+    with an adaptive (AIMD) cap on requests in flight.
+    """
+
+    def __init__(
+            self,
+            rpm: int = 0,
+            tpm: int = 0,
+            estimated_tokens: int = 1000,
+            max_in_flight: int = 32,
+            initial_in_flight: int = 8,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.estimated_tokens = estimated_tokens
+
+        self.max_in_flight = max_in_flight
+        self.limit = float(min(initial_in_flight, max_in_flight))
+        self._latency_avg: Optional[float] = None
+        self._latency_samples = 0
+        self._last_decrease = 0.0
+
+        self._requests: Deque[float] = collections.deque()
+        self._tokens: Deque[Tuple[float, int]] = collections.deque()
+        self._window_tokens = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+        # run_id -> admission time (start time until admitted)
+        self._admitted: Dict[UUID, float] = {}
+        # thread -> runs started on it and not admitted yet, oldest first
+        self._pending: Dict[int, Deque[UUID]] = {}
+
+        self._stats = {
+            "requests": 0,
+            "tokens": 0,
+            "waits": 0,
+            "wait_sec": 0.0,
+            "max_in_flight": 0,
+            "rate_limited": 0,
+            "latency_spikes": 0,
+        }
+        self.usage = _UsageCallback(self)
+
+    def configure(self, rpm: Optional[int] = None, tpm: Optional[int] = None) -> None:
+        with self._cond:
+            if rpm is not None:
+                self.rpm = rpm
+            if tpm is not None:
+                self.tpm = tpm
+            self._cond.notify_all()
+
+    # --------------------------------------------------------
+    # Budget
+    # --------------------------------------------------------
+    def _prune(self, now: float) -> None:
+        while self._requests and now - self._requests[0] >= WINDOW_SEC:
+            self._requests.popleft()
+        while self._tokens and now - self._tokens[0][0] >= WINDOW_SEC:
+            self._window_tokens -= self._tokens.popleft()[1]
+
+    def _try_acquire(self) -> float:
+        """
+        Admit one request (returns 0.0) or return the seconds to wait.
+        Caller holds the lock.
+        """
+
+        now = time.monotonic()
+        self._prune(now)
+        wait = 0.0
+
+        if self.rpm and len(self._requests) >= self.rpm:
+            wait = max(wait, self._requests[0] + WINDOW_SEC - now)
+
+        if self._in_flight >= int(self.limit):
+            # woken up by release()
+            wait = max(wait, 1.0)
+
+        # a single request is always admitted into an empty budget
+        if self.tpm and self._in_flight + len(self._tokens) > 0:
+            projected = self._window_tokens + (self._in_flight + 1) * self._estimate()
+            if projected > self.tpm:
+                if self._tokens:
+                    wait = max(wait, self._tokens[0][0] + WINDOW_SEC - now)
+                else:
+                    # only in-flight reservations: wait for a release
+                    wait = max(wait, 1.0)
+
+        if wait > 0:
+            return wait
+
+        self._requests.append(now)
+        pending = self._pending.get(threading.get_ident())
+        if pending:
+            self._admitted[pending.popleft()] = now
+        self._in_flight += 1
+        self._stats["requests"] += 1
+        self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+        return 0.0
+
+    def start_run(self, run_id: UUID) -> None:
+        """
+        A model run started on this thread and is about to acquire().
+        """
+
+        with self._cond:
+            self._admitted[run_id] = time.monotonic()
+            self._pending.setdefault(threading.get_ident(), collections.deque()).append(run_id)
+
+    def end_run(self, run_id: UUID) -> Optional[float]:
+        """
+        Forget a finished run and return its admission time (None if unknown).
+        """
+
+        with self._cond:
+            pending = self._pending.get(threading.get_ident())
+            if pending and run_id in pending:
+                # never admitted (cache hit)
+                pending.remove(run_id)
+            return self._admitted.pop(run_id, None)
+
+    def _estimate(self) -> float:
+        if self._stats["requests"] > self._in_flight and self._stats["tokens"]:
+            return self._stats["tokens"] / (self._stats["requests"] - self._in_flight)
+        return self.estimated_tokens
+
+    def release(
+            self,
+            tokens: Optional[int],
+            latency: Optional[float] = None,
+            rate_limited: bool = False,
+    ) -> None:
+        """
+        A governed request finished (tokens=None: unknown / failed).
+        """
+
+        with self._cond:
+            self._in_flight = max(0, self._in_flight - 1)
+            if tokens:
+                self._tokens.append((time.monotonic(), tokens))
+                self._window_tokens += tokens
+                self._stats["tokens"] += tokens
+
+            if rate_limited:
+                self._stats["rate_limited"] += 1
+                self._decrease(AIMD_DECREASE_429)
+            elif latency is not None:
+                self._observe_latency(latency)
+
+            self._cond.notify_all()
+
+    # --------------------------------------------------------
+    # AIMD in-flight limit (caller holds the lock)
+    # --------------------------------------------------------
+    def _observe_latency(self, latency: float) -> None:
+        average = self._latency_avg
+        self._latency_samples += 1
+        self._latency_avg = latency if average is None else 0.9 * average + 0.1 * latency
+
+        if (
+                average is not None
+                and self._latency_samples >= LATENCY_MIN_SAMPLES
+                and latency > LATENCY_SPIKE_FACTOR * average
+        ):
+            self._stats["latency_spikes"] += 1
+            self._decrease(AIMD_DECREASE_SLOW)
+        else:
+            self.limit = min(float(self.max_in_flight), self.limit + 1.0 / self.limit)
+
+    def _decrease(self, factor: float) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < AIMD_COOLDOWN_SEC:
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit * factor)
+
+    # --------------------------------------------------------
+    # BaseRateLimiter API
+    # --------------------------------------------------------
+    def acquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if wait == 0.0:
+                    break
+                if not blocking:
+                    return False
+                self._cond.wait(wait)
+
+            self._note_wait(time.monotonic() - start)
+        return True
+
+    async def aacquire(self, *, blocking: bool = True) -> bool:
+        start = time.monotonic()
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+                if wait == 0.0:
+                    self._note_wait(time.monotonic() - start)
+                    return True
+            if not blocking:
+                return False
+            # releases are not awaitable: re-check at least every 100 ms
+            await asyncio.sleep(min(wait, 0.1))
+
+    def _note_wait(self, waited: float) -> None:
+        if waited > 0.001:
+            self._stats["waits"] += 1
+            self._stats["wait_sec"] += waited
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            self._prune(time.monotonic())
+            return {
+                **self._stats,
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "in_flight_limit": round(self.limit, 2),
+                "in_flight": self._in_flight,
+                "window_requests": len(self._requests),
+                "window_tokens": self._window_tokens,
+            }
+
+
+_governor: Optional[RateGovernor] = None
+_governor_lock = threading.Lock()
+
+
+def get_rate_governor() -> RateGovernor:
+    """
+    Process-wide governor shared by all chat models.
+
+    Environment:
+        LLM_RPM                     requests per minute (default: unlimited)
+        LLM_TPM                     tokens per minute (default: unlimited)
+        LLM_MAX_IN_FLIGHT           upper bound of the AIMD in-flight limit
+    """
+
+    global _governor
+
+    with _governor_lock:
+        if _governor is None:
+            _governor = RateGovernor(
+                rpm=int(os.getenv("LLM_RPM", "0")),
+                tpm=int(os.getenv("LLM_TPM", "0")),
+                max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "32")),
+            )
+    return _governor
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    governor = RateGovernor(rpm=0, tpm=3000, estimated_tokens=1000)
+
+    def call(i: int) -> None:
+        governor.acquire()
+        time.sleep(0.05)
+        governor.release(1000)
+        print(f"request {i} done at {time.monotonic() - t0:.2f}s")
+
+    t0 = time.monotonic()
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    # budget exhausted: a fourth request is not admitted without waiting
+    print("non-blocking 4th request admitted:", governor.acquire(blocking=False))
+    print(governor.stats())
@@ -0,0 +1,155 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def journal_dir() -> str:
+    """
+    Environment:
+        RUN_JOURNAL_DIR     journal directory (default: .cache/runs)
+    """
+    return os.getenv("RUN_JOURNAL_DIR", os.path.join(PROJECT_ROOT, ".cache", "runs"))
+
+
+# ------------------------------------------------------------
+# Append-only JSONL run journal (checkpoint / resume)
+# ------------------------------------------------------------
+class RunJournal:
+    """
+    One JSON line per completed stage of an agent run:
+
+        {"stage": "start",   "user_goal", "options"}
+        {"stage": "a_chain", "a_result"}
+        {"stage": "b_chain", "task_index", "task", "b_output"}
+        {"stage": "c_chain", "task_index", "execution_context", "ffmpeg_command"}
+        {"stage": "ffmpeg",  "task_index", "task_indices", "command", "result"}
+        {"stage": "end",     "tasks"}
+
+    Every line is flushed and fsync'ed when the stage finishes, so a crash
+    or Ctrl-C loses at most the stage in progress. Opening an existing
+    journal loads its stages for replay; new stages are appended to it.
+    """
+
+    def __init__(self, run_id: Optional[str] = None, directory: Optional[str] = None):
+        self.run_id = run_id or time.strftime("%Y%m%d-%H%M%S-") + uuid.uuid4().hex[:6]
+        self.directory = directory or journal_dir()
+        self.path = os.path.join(self.directory, f"{self.run_id}.jsonl")
+
+        # (stage, task_index) → latest entry
+        self._stages: Dict[Tuple[str, Optional[int]], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @classmethod
+    def open(cls, run_id: str, directory: Optional[str] = None) -> "RunJournal":
+        """
+        Load an existing journal for replay.
+        """
+
+        journal = cls(run_id, directory)
+        if not os.path.exists(journal.path):
+            raise FileNotFoundError(f"no journal for run {run_id!r}: {journal.path}")
+
+        # drop a partially written last line, so appended stages start on a new line
+        with open(journal.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+        for entry in read_journal(journal.path):
+            journal._stages[(entry["stage"], entry.get("task_index"))] = entry
+        return journal
+
+    def record(self, stage: str, task_index: Optional[int] = None, **data: Any) -> None:
+        entry = {"stage": stage, "task_index": task_index, "ts": time.time(), **data}
+        line = json.dumps(entry, ensure_ascii=False, default=str)
+
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._stages[(stage, task_index)] = entry
+
+    def replayed(self, stage: str, task_index: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Completed entry of a stage (from this or an earlier attempt), or None.
+        """
+        with self._lock:
+            return self._stages.get((stage, task_index))
+
+
+def read_journal(path: str) -> List[Dict[str, Any]]:
+    """
+    Journal entries in order. A truncated last line (crash while writing)
+    is ignored.
+    """
+
+    entries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                break
+    return entries
+
+
+def list_runs(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Summary of every journaled run, newest first.
+
+    Returns:
+        [{"run_id", "user_goal", "started_at", "stages", "finished"}, ...]
+    """
+
+    directory = directory or journal_dir()
+    if not os.path.isdir(directory):
+        return []
+
+    runs = []
+    for name in os.listdir(directory):
+        if not name.endswith(".jsonl"):
+            continue
+
+        entries = read_journal(os.path.join(directory, name))
+        start = next((e for e in entries if e["stage"] == "start"), {})
+        runs.append({
+            "run_id": name[: -len(".jsonl")],
+            "user_goal": start.get("user_goal"),
+            "started_at": start.get("ts"),
+            "stages": len(entries),
+            "finished": any(e["stage"] == "end" for e in entries),
+        })
+
+    return sorted(runs, key=lambda run: run["started_at"] or 0, reverse=True)
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        journal = RunJournal(directory=tmp)
+        journal.record("start", user_goal="Make a Shorts video")
+        journal.record("b_chain", task_index=1, task="Extract ...", b_output={"b_chain_v1": "FFmpeg-capable: YES"})
+
+        # simulated crash in the middle of a line
+        with open(journal.path, "a", encoding="utf-8") as f:
+            f.write('{"stage": "c_chain", "task_in')
+
+        resumed = RunJournal.open(journal.run_id, tmp)
+        print(resumed.replayed("b_chain", 1))
+        print(resumed.replayed("c_chain", 1))
+
+        resumed.record("c_chain", task_index=1, execution_context="...", ffmpeg_command="ffmpeg ...")
+        print([entry["stage"] for entry in read_journal(resumed.path)])
+        print(list_runs(tmp))
@@ -1,54 +1,123 @@
 import re
-from typing import List
+from typing import AsyncIterable, AsyncIterator, Iterable, Iterator, List, Optional
 
 
-def parse_task_dsl(task_dsl_text: str) -> List[str]:
+class TaskDSLParser:
     """
-    Parse a TASK DSL string produced by a_chain into a list of task strings.
+    Incremental TASK DSL parser.
 
-    Design principles:
-    - Deterministic (no LLM)
-    - Conservative (do not modify meaning)
-    - Robust to multi-line tasks
+    Text can be fed in arbitrary chunks (e.g. LLM stream deltas).
+    A numbered task is emitted as soon as it is closed, i.e. when the
+    next numbered line starts or the stream ends (close()).
     """
 
-    lines = task_dsl_text.splitlines()
+    def __init__(self):
+        self._buffer = ""
+        self._current_task = ""
 
-    tasks: List[str] = []
-    current_task = ""
+    def feed_line(self, line: str) -> Optional[str]:
+        """
+        Consume one complete line; return a finished task, if any.
+        """
 
-    for line in lines:
         line = line.strip()
 
         # skip empty lines
         if not line:
-            continue
+            return None
 
         # case 1: numbered task start (e.g., "1. ...")
         match = re.match(r"^(\d+)\.\s+(.*)", line)
         if match:
             # flush previous task
-            if current_task:
-                tasks.append(current_task.strip())
-                current_task = ""
+            finished = self._current_task.strip() or None
 
             # start new task without the numbering
-            current_task = match.group(2).strip()
+            self._current_task = match.group(2).strip()
+            return finished
 
         # case 2: continuation of previous task (wrapped line)
+        if self._current_task:
+            self._current_task += " " + line
         else:
-            if current_task:
-                current_task += " " + line
-            else:
-                # edge case: no numbering but text exists
-                current_task = line
+            # edge case: no numbering but text exists
+            self._current_task = line
+
+        return None
+
+    def feed(self, chunk: str) -> List[str]:
+        """
+        Consume a chunk of streamed text; return tasks closed by it.
+        """
+
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split("\n")
+
+        finished = [self.feed_line(line) for line in lines]
+        return [task for task in finished if task]
+
+    def close(self) -> List[str]:
+        """
+        End of stream: flush the pending line and the last task.
+        """
+
+        pending, self._buffer = self._buffer, ""
+        tasks = self.feed(pending + "\n") if pending else []
+
+        if self._current_task:
+            tasks.append(self._current_task.strip())
+            self._current_task = ""
+
+        return tasks
+
+
+def parse_task_dsl(task_dsl_text: str) -> List[str]:
+    """
+    Parse a TASK DSL string produced by a_chain into a list of task strings.
+
+    Design principles:
+    - Deterministic (no LLM)
+    - Conservative (do not modify meaning)
+    - Robust to multi-line tasks
+    """
+
+    parser = TaskDSLParser()
+
+    tasks: List[str] = []
+    for line in task_dsl_text.splitlines():
+        task = parser.feed_line(line)
+        if task:
+            tasks.append(task)
 
     # flush last task
-    if current_task:
-        tasks.append(current_task.strip())
+    tasks.extend(parser.close())
 
     return tasks
 
+
+def iter_task_dsl(chunks: Iterable[str]) -> Iterator[str]:
+    """
+    Streaming parse_task_dsl: yield each task as soon as it is closed.
+    """
+
+    parser = TaskDSLParser()
+    for chunk in chunks:
+        yield from parser.feed(chunk)
+    yield from parser.close()
+
+
+async def aiter_task_dsl(chunks: AsyncIterable[str]) -> AsyncIterator[str]:
+    """
+    Async streaming parse_task_dsl (e.g. over a_chain2.astream()).
+    """
+
+    parser = TaskDSLParser()
+    async for chunk in chunks:
+        for task in parser.feed(chunk):
+            yield task
+    for task in parser.close():
+        yield task
+
 # -----------------------------------------------------------
 # Execution
 # -----------------------------------------------------------
@@ -65,4 +134,8 @@ if __name__ == "__main__":
 
     print("===== PARSED TASKS =====")
     for i, t in enumerate(parsed, 1):
-        print(f"{i}: {t}")
\ No newline at end of file
+        print(f"{i}: {t}")
+
+    # same input, streamed in small chunks
+    chunks = [sample_task_dsl[i:i + 7] for i in range(0, len(sample_task_dsl), 7)]
+    assert list(iter_task_dsl(chunks)) == parsed
\ No newline at end of file
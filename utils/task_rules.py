@@ -0,0 +1,292 @@
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+
+# ------------------------------------------------------------
+# Rule-based fast path for highly regular tasks
+# ------------------------------------------------------------
+# Design principles (same as task_parser):
+# - Deterministic (no LLM)
+# - Conservative: a rule fires only when the task is unambiguous;
+#   anything else falls back to b_chain
+# - A rule covers the whole sentence: once its values (files, times,
+#   resolution, frame rate) are taken out, every remaining word must be a
+#   filler word or a word of that rule. Any other word is a qualifier the
+#   rule cannot express ("crop", "2x", "subtitles", "watermark", "MP3", ...)
+#   and the task falls back to b_chain
+#
+# A match produces the same artifacts as b_chain would:
+# - b_chain_v1 : capability verdict in the v1 output format
+# - b_chain_v2 : JSON structured representation (None if not capable)
+# - structured : the same representation as a dict
+
+VIDEO_FILE = r"[\w\-.]+\.(?:mp4|mov|mkv|webm|avi|m4v)"
+TIMESTAMP = r"\d{1,2}:\d{2}(?::\d{2})?(?:\.\d+)?"
+
+_FILE_RE = re.compile(VIDEO_FILE, re.IGNORECASE)
+_TIME_RE = re.compile(rf"(?<![\d:]){TIMESTAMP}(?![\d:])")
+
+_TRIM_RE = re.compile(
+    rf"\b(?:extract|trim|cut|clip)\b.*?({VIDEO_FILE}).*?"
+    rf"({TIMESTAMP})\s*(?:to|~|-|–|until|through)\s*({TIMESTAMP})",
+    re.IGNORECASE,
+)
+_CONCAT_RE = re.compile(
+    r"\b(?:concatenate|join|merge|combine|stitch)\b.*\b(?:clips|segments|videos)\b",
+    re.IGNORECASE,
+)
+_RESOLUTION_RE = re.compile(r"\b(\d{3,4})\s*[x×]\s*(\d{3,4})\b")
+_SCALE_RE = re.compile(r"\b(?:scale|resize|resolution)\b", re.IGNORECASE)
+_VERTICAL_RE = re.compile(
+    r"\b(?:9:16|vertical|portrait)\b.*\b(?:aspect ratio|format|resolution|scale|resize)\b"
+    r"|\b(?:aspect ratio|format|resolution|scale|resize)\b.*\b(?:9:16|vertical|portrait)\b",
+    re.IGNORECASE,
+)
+_LOUDNORM_RE = re.compile(
+    r"\b(?:normali[sz]e|adjust|balance|equali[sz]e)\b.*\b(?:audio|loudness|volume|sound)\b"
+    r"|\b(?:audio|loudness|volume)\b.*\b(?:normali[sz]ation|consisten\w*)\b",
+    re.IGNORECASE,
+)
+_FPS_RE = re.compile(
+    r"\b(?:frame ?rate|fps)\b.*?\b(\d{2,3}(?:\.\d+)?)\s*(?:fps)?\b"
+    r"|\b(\d{2,3}(?:\.\d+)?)\s*fps\b",
+    re.IGNORECASE,
+)
+_WORD_RE = re.compile(r"[a-z0-9]+(?:['’][a-z]+)?")
+
+# words any rule may contain besides its values
+_FILLER_WORDS = {
+    "a", "an", "the", "all", "each", "every", "both", "of", "to", "in", "into", "for", "from",
+    "and", "so", "that", "it", "its", "them", "they", "their", "this", "these", "those",
+    "please", "ensure", "make", "sure", "use", "using", "is", "are", "be",
+    "clip", "clips", "video", "videos", "file", "files", "segment", "segments",
+    "final", "output", "resulting", "extracted", "selected", "given", "order", "same",
+}
+
+# words of each rule (the operation and its usual phrasing)
+_RULE_WORDS = {
+    "trim": {
+        "extract", "trim", "cut", "highlight", "section", "part", "portion", "between",
+        "until", "through", "at", "start", "starting", "end", "ending", "only", "just",
+        "short", "first", "main", "key", "keep",
+    },
+    "concat": {
+        "concatenate", "join", "merge", "combine", "stitch", "together", "one", "single",
+        "sequence", "sequentially", "original", "back",
+    },
+    "scale_pad": {
+        "scale", "resize", "resolution", "vertical", "portrait", "aspect", "ratio", "format",
+        "convert", "change", "set", "fit", "adjust", "pad", "padding",
+    },
+    "loudnorm": {
+        "normalize", "normalise", "normalization", "normalisation", "adjust", "balance",
+        "balanced", "equalize", "equalise", "audio", "loudness", "volume", "sound", "level",
+        "levels", "consistent", "consistency", "consistently",
+    },
+    "fps": {"frame", "rate", "framerate", "fps", "convert", "change", "set", "adjust"},
+}
+_ASPECT_RATIO_RE = re.compile(r"(?<![\d:])(?:9:16|16:9)(?![\d:])")
+_HUMAN_ACTION_RE = re.compile(
+    r"^\s*(?:upload|publish|share|post|review|watch|preview|decide|choose|select|"
+    r"organi[sz]e|arrange|check|verify|confirm|add (?:a )?(?:title|description|hashtags?))\b",
+    re.IGNORECASE,
+)
+
+# operation → (v1 "Operation type", v1 "Required information")
+_OPERATION_INFO = {
+    "trim": ("Video trimming", "input file, start time, end time"),
+    "concat": ("Video concatenation", "list of clips in order"),
+    "scale_pad": ("Scaling and padding", "input file(s), target width and height"),
+    "loudnorm": ("Audio loudness normalization", "input file(s)"),
+    "fps": ("Frame rate conversion", "input file(s), target frame rate"),
+}
+
+
+def _capable(rule: str, structured: Dict[str, Any]) -> Dict[str, Any]:
+    op_type, required = _OPERATION_INFO[structured["operation"]]
+
+    return {
+        "rule": rule,
+        "ffmpeg_capable": True,
+        "structured": structured,
+        "b_chain_v1": (
+            "FFmpeg-capable: YES\n"
+            f"Operation type: {op_type}\n"
+            f"Required information: {required}"
+        ),
+        "b_chain_v2": json.dumps(structured, ensure_ascii=False, indent=2),
+    }
+
+
+def _not_capable(rule: str, reason: str) -> Dict[str, Any]:
+    return {
+        "rule": rule,
+        "ffmpeg_capable": False,
+        "structured": None,
+        "b_chain_v1": f"FFmpeg-capable: NO\nReason: {reason}",
+        "b_chain_v2": None,
+    }
+
+
+def match_task_rule(task: str) -> Optional[Dict[str, Any]]:
+    """
+    Recognize a common task without calling the LLM.
+
+    Returns:
+        {
+          "rule": str,
+          "ffmpeg_capable": bool,
+          "structured": dict | None,
+          "b_chain_v1": str,
+          "b_chain_v2": str | None
+        }
+        or None if no rule applies (→ b_chain).
+    """
+
+    # ---- human actions (never FFmpeg) ----
+    if _HUMAN_ACTION_RE.match(task):
+        return _not_capable("human_action", "requires a human action, not a media operation")
+
+    # "9:16" in "9:16 aspect ratio" is not a timestamp
+    if re.search(r"aspect|ratio|vertical|portrait", task, re.IGNORECASE):
+        without_ratios = _ASPECT_RATIO_RE.sub(" ", task)
+    else:
+        without_ratios = task
+
+    files = _FILE_RE.findall(task)
+    times = _TIME_RE.findall(without_ratios)
+
+    # the task without its values: what is left has to be words of one rule
+    words = _WORD_RE.findall(
+        _RESOLUTION_RE.sub(" ", _TIME_RE.sub(" ", _FILE_RE.sub(" ", without_ratios))).lower()
+    )
+
+    def _covers(rule: str, values: Optional[List[str]] = None) -> bool:
+        known = _FILLER_WORDS | _RULE_WORDS[rule] | set(values or [])
+        return all(word in known for word in words)
+
+    # ---- trim: exactly one file and one time range ----
+    match = _TRIM_RE.search(task)
+    if match and len(files) == 1 and len(times) == 2 and _covers("trim"):
+        return _capable("trim", {
+            "operation": "trim",
+            "input_file": match.group(1),
+            "start_time": match.group(2),
+            "end_time": match.group(3),
+        })
+
+    # rules below operate on "the clips" of the run, not on explicit files
+    if files or times:
+        return None
+
+    candidates = []
+
+    # ---- concat ----
+    if _CONCAT_RE.search(task):
+        candidates.append(("concat", {"operation": "concat"}))
+
+    # ---- scale / pad to an explicit or 9:16 resolution ----
+    resolution = _RESOLUTION_RE.search(task)
+    if resolution and _SCALE_RE.search(task):
+        candidates.append(("scale_pad", {
+            "operation": "scale_pad",
+            "width": int(resolution.group(1)),
+            "height": int(resolution.group(2)),
+        }))
+    elif not resolution and _VERTICAL_RE.search(task):
+        candidates.append(("scale_pad", {
+            "operation": "scale_pad",
+            "width": 1080,
+            "height": 1920,
+        }))
+
+    # ---- audio loudness normalization ----
+    if _LOUDNORM_RE.search(task):
+        candidates.append(("loudnorm", {"operation": "loudnorm"}))
+
+    # ---- frame rate ----
+    fps = _FPS_RE.search(task)
+    if fps:
+        value = float(fps.group(1) or fps.group(2))
+        candidates.append(("fps", {
+            "operation": "fps",
+            "fps": int(value) if value.is_integer() else value,
+        }))
+    fps_values = [fps.group(1) or fps.group(2)] if fps else []
+
+    # a task mixing several operations (or a resolution the rules did not
+    # consume) is left to the LLM
+    if (
+            len(candidates) == 1
+            and not (resolution and candidates[0][0] != "scale_pad")
+            and _covers(candidates[0][0], fps_values)
+    ):
+        return _capable(*candidates[0])
+
+    return None
+
+
+def summarize_fast_path(rule_names: List[Optional[str]]) -> Dict[str, Any]:
+    """
+    Per-run fast path report from the matched rule name of each task (None = LLM).
+    """
+
+    hits = sum(1 for name in rule_names if name)
+    total = len(rule_names)
+
+    by_rule: Dict[str, int] = {}
+    for name in rule_names:
+        if name:
+            by_rule[name] = by_rule.get(name, 0) + 1
+
+    return {
+        "hits": hits,
+        "total": total,
+        "hit_rate": hits / total if total else 0.0,
+        "by_rule": by_rule,
+    }
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+
+    sample_tasks = [
+        "Extract the highlight segment from mv_complicated.mp4 from 01:10 to 01:37.",
+        "Concatenate the extracted clips in the given order.",
+        "Scale all clips to 1080x1920.",
+        "Ensure all clips use the vertical 9:16 aspect ratio.",
+        "Adjust the audio levels of all clips to ensure consistency.",
+        "Convert the frame rate to 30 fps.",
+        "Upload the completed video to YouTube.",
+        "Add a fade transition between clips.",
+        # words no rule covers → b_chain
+        "Extract the audio track from mv_complicated.mp4 from 01:10 to 01:37 as an MP3.",
+        "Cut out and remove the section of mv_complicated.mp4 from 00:10 to 00:20.",
+        "Join the clips with a crossfade transition.",
+        "Do not merge the clips; keep them as separate videos.",
+        "Combine the clips and add background music.",
+        "Join the audio segments into a podcast.",
+        "Make the audio volume louder by 6 dB.",
+        "Crop the clips to the vertical 9:16 format.",
+        "Cut mv_a.mp4 from 01:10 to 01:37 and speed it up 2x.",
+        "Scale the clips to 1080x1920 and burn in subtitles.",
+        "Adjust the video brightness and audio volume.",
+        "Combine all clips into a final video with a watermark.",
+    ]
+
+    names = []
+    for t in sample_tasks:
+        result = match_task_rule(t)
+        names.append(result["rule"] if result else None)
+
+        print("\n===== TASK =====")
+        print(t)
+        print(result["b_chain_v1"] if result else "(no rule → b_chain)")
+        if result and result["b_chain_v2"]:
+            print(result["b_chain_v2"])
+
+    print("\n===== FAST PATH =====")
+    print(summarize_fast_path(names))
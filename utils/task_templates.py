@@ -0,0 +1,417 @@
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from prompts import PROMPT_VERSION
+from utils.task_rules import TIMESTAMP
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------------------------
+# Parameterized task-template cache
+# ------------------------------------------------------------
+# "Add a fade-in to mv_complicated.mp4 from 01:10 to 01:37" and the same
+# sentence for mv_sk8er_boi.mp4 at 00:46 ~ 01:03 differ only in literals,
+# so an exact-match cache never hits. Here the literals are abstracted
+# into slots:
+#
+#   task      : Add a fade-in to {{file0}} from {{time0}} to {{time1}}
+#   command   : ffmpeg -ss {{time0|hms}} -to {{time1|hms}} -i {{file0}} ... out.mp4
+#
+# The skeleton (task with slots) is the key; the b_chain output and the
+# generated command are stored as slotted templates. A structural hit
+# substitutes the new literals instead of calling b_chain / c_chain.
+#
+# Conservative by design (a wrong command is worse than an LLM call):
+# - store : every slot literal must be found in the command (numbers exactly
+#           once), no two slots may share a literal, and no literal may be
+#           left inside the template (e.g. derived names like mv_001_fade.mp4);
+#           a task number may not appear in another form in the command
+#           ("clip 1" vs clip_01.mp4) and every file name of the command must
+#           come from a slot (fixed output names would collide on reuse);
+#           with time slots, a filter argument may hold no number but slot
+#           values (fade=t=out:st=25 is computed from the clip length)
+# - lookup: every slot of the template must be filled by a literal of the
+#           new task, and every new literal must show up in the command
+
+MEDIA_FILE = r"[\w\-.]+\.(?:mp4|mov|mkv|webm|avi|m4v|mp3|wav|aac|m4a|flac|png|jpe?g|srt|ass)"
+
+_SLOT_RE = re.compile(
+    rf"(?P<file>(?<![\w\-./]){MEDIA_FILE}(?![\w\-]))"
+    rf"|(?P<time>(?<![\w.:]){TIMESTAMP}(?![\w:]|\.\d))"
+    rf"|(?P<num>(?<![\w.:])\d+(?:\.\d+)?(?![\w:]|\.\d))",
+    re.IGNORECASE,
+)
+_PLACEHOLDER_RE = re.compile(r"\{\{(\w+)(?:\|(\w+))?\}\}")
+_MEDIA_FILE_RE = re.compile(MEDIA_FILE, re.IGNORECASE)
+_NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+_FILTER_ARG_RE = re.compile(r"(?<!\S)-(?:vf|af|filter_complex|lavfi|filter(?::[va])?)\s+('[^']*'|\"[^\"]*\"|\S+)")
+
+# time slot renderings tried in the command, in order
+TIME_VARIANTS = ("raw", "hms", "sec")
+
+
+def abstract_task(task: str) -> Tuple[str, List[Dict[str, str]]]:
+    """
+    Task → (skeleton, slots).
+
+    slots: [{"name": "file0", "kind": "file", "value": "mv_001.mp4"}, ...]
+    in order of appearance; names are numbered per kind.
+    """
+
+    slots: List[Dict[str, str]] = []
+    counts: Dict[str, int] = {}
+
+    def replace(match: re.Match) -> str:
+        kind = match.lastgroup
+        name = f"{kind}{counts.get(kind, 0)}"
+        counts[kind] = counts.get(kind, 0) + 1
+        slots.append({"name": name, "kind": kind, "value": match.group(0)})
+        return "{{" + name + "}}"
+
+    skeleton = _SLOT_RE.sub(replace, " ".join(task.split()))
+    return skeleton, slots
+
+
+# ------------------------------------------------------------
+# Slot renderings
+# ------------------------------------------------------------
+def _seconds(timestamp: str) -> float:
+    seconds = 0.0
+    for part in timestamp.split(":"):
+        seconds = seconds * 60 + float(part)
+    return seconds
+
+
+def render_slot(slot: Dict[str, str], variant: Optional[str] = None) -> str:
+    value = slot["value"]
+    if slot["kind"] != "time" or variant in (None, "raw"):
+        return value
+
+    seconds = _seconds(value)
+    if variant == "sec":
+        return f"{seconds:g}"
+
+    # hms: 00:01:10 (fraction kept)
+    whole = int(seconds)
+    text = f"{whole // 3600:02d}:{whole % 3600 // 60:02d}:{whole % 60:02d}"
+    fraction = value.rsplit(".", 1)[1] if "." in value.rsplit(":", 1)[-1] else ""
+    return f"{text}.{fraction}" if fraction else text
+
+
+def _literal_re(text: str) -> re.Pattern:
+    return re.compile(rf"(?<![\w\-.:]){re.escape(text)}(?![\w\-:]|\.\d)")
+
+
+def _slot_command(command: str, slots: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Command → slotted template, or None if a slot cannot be placed
+    unambiguously.
+    """
+
+    template = command
+    for slot in slots:
+        variants = TIME_VARIANTS if slot["kind"] == "time" else ("raw",)
+
+        for variant in variants:
+            pattern = _literal_re(render_slot(slot, variant))
+            found = len(pattern.findall(template))
+            if not found:
+                continue
+            # short numbers (and bare seconds) also occur as unrelated arguments
+            if (slot["kind"] == "num" or variant == "sec") and found != 1:
+                return None
+
+            placeholder = slot["name"] if variant == "raw" else f"{slot['name']}|{variant}"
+            template = pattern.sub(lambda _: "{{" + placeholder + "}}", template)
+            break
+        else:
+            return None
+
+    # a literal left in the template (derived output names, ...) would go stale
+    for slot in slots:
+        if slot["kind"] == "file":
+            stem = os.path.splitext(slot["value"])[0]
+            if stem in _PLACEHOLDER_RE.sub("", template):
+                return None
+
+    rest = _PLACEHOLDER_RE.sub(" ", template)
+
+    # the number also occurs in another form (clip_01 for "clip 1", 1.0, ...):
+    # the slot may be bound to an unrelated literal
+    numbers = {float(slot["value"]) for slot in slots if slot["kind"] == "num"}
+    if any(float(text) in numbers for text in _NUMBER_RE.findall(rest)):
+        return None
+
+    # files the task does not name (fixed inputs / outputs) cannot follow new literals
+    if _MEDIA_FILE_RE.search(rest):
+        return None
+
+    # filter values may be derived from the time range (fade-out start = clip
+    # length - duration): only slot values can follow a new range
+    if any(slot["kind"] == "time" for slot in slots):
+        for argument in _FILTER_ARG_RE.findall(template):
+            if _NUMBER_RE.search(_PLACEHOLDER_RE.sub(" ", argument)):
+                return None
+
+    return template
+
+
+def _slot_text(text: Optional[str], slots: List[Dict[str, str]]) -> Optional[str]:
+    """
+    Best effort for the b_chain outputs (logs / journal only).
+    """
+
+    if text is None:
+        return None
+    for slot in slots:
+        text = _literal_re(slot["value"]).sub(lambda _: "{{" + slot["name"] + "}}", text)
+    return text
+
+
+def _fill(template: Optional[str], slots: Dict[str, Dict[str, str]]) -> Optional[str]:
+    if template is None:
+        return None
+    return _PLACEHOLDER_RE.sub(lambda m: render_slot(slots[m.group(1)], m.group(2)), template)
+
+
+# ------------------------------------------------------------
+# Template build / render
+# ------------------------------------------------------------
+def make_template(task: str, b_output: Dict[str, Any], command: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Slotted template of an analyzed task (command None = not FFmpeg-capable),
+    or None if the task cannot be reused safely.
+    """
+
+    skeleton, slots = abstract_task(task)
+
+    values = [slot["value"] for slot in slots]
+    if len(set(values)) != len(values):
+        return None
+
+    if command is not None:
+        if "{{" in command:
+            return None
+        command_template = _slot_command(command, slots)
+        if command_template is None:
+            return None
+    else:
+        command_template = None
+
+    return {
+        "skeleton": skeleton,
+        "kinds": [slot["kind"] for slot in slots],
+        "b_chain_v1": _slot_text(b_output.get("b_chain_v1"), slots),
+        "b_chain_v2": _slot_text(b_output.get("b_chain_v2"), slots),
+        "ffmpeg_command": command_template,
+        "source_task": task,
+    }
+
+
+def render_template(template: Dict[str, Any], slots: List[Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """
+    b_chain-compatible output (+ "ffmpeg_command") for the new literals,
+    or None if slot verification fails.
+    """
+
+    if [slot["kind"] for slot in slots] != template["kinds"]:
+        return None
+    by_name = {slot["name"]: slot for slot in slots}
+
+    # every placeholder must be filled by a literal of the new task
+    for text in (template["ffmpeg_command"], template["b_chain_v1"], template["b_chain_v2"]):
+        for match in _PLACEHOLDER_RE.finditer(text or ""):
+            if match.group(1) not in by_name:
+                return None
+
+    command = _fill(template["ffmpeg_command"], by_name)
+    if command is not None:
+        used = {m.group(1): m.group(2) for m in _PLACEHOLDER_RE.finditer(template["ffmpeg_command"])}
+        # every new literal must show up in the command
+        for slot in slots:
+            if slot["name"] not in used or render_slot(slot, used[slot["name"]]) not in command:
+                return None
+
+    return {
+        "b_chain_v1": _fill(template["b_chain_v1"], by_name),
+        "b_chain_v2": _fill(template["b_chain_v2"], by_name),
+        "ffmpeg_command": command,
+        "template": template["skeleton"],
+    }
+
+
+# ------------------------------------------------------------
+# Persistent store (SQLite)
+# ------------------------------------------------------------
+class TaskTemplateCache:
+    """
+    Skeleton → template store.
+
+    Key:
+        sha256(namespace, skeleton); namespace = prompt version
+    Eviction:
+        LRU (by last hit) once `max_entries` is exceeded
+    """
+
+    def __init__(self, path: str, namespace: str = "", max_entries: int = 5000):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+
+        self._stats = {"hits": 0, "misses": 0, "rejected": 0, "stored": 0, "not_reusable": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS task_templates (
+                key         TEXT PRIMARY KEY,
+                skeleton    TEXT NOT NULL,
+                value       TEXT NOT NULL,
+                created_at  REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _key(self, skeleton: str) -> str:
+        payload = json.dumps([self.namespace, skeleton], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, task: str) -> Optional[Dict[str, Any]]:
+        skeleton, slots = abstract_task(task)
+        key = self._key(skeleton)
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM task_templates WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+
+            output = render_template(json.loads(row[0]), slots)
+            if output is None:
+                self._stats["rejected"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE task_templates SET accessed_at = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            self._stats["hits"] += 1
+
+        return output
+
+    def store(self, task: str, b_output: Dict[str, Any], command: Optional[str]) -> bool:
+        template = make_template(task, b_output, command)
+
+        with self._lock:
+            if template is None:
+                self._stats["not_reusable"] += 1
+                return False
+
+            now = time.time()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO task_templates "
+                "(key, skeleton, value, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self._key(template["skeleton"]), template["skeleton"], json.dumps(template), now, now),
+            )
+            self._conn.execute(
+                "DELETE FROM task_templates WHERE key NOT IN "
+                "(SELECT key FROM task_templates ORDER BY accessed_at DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+            self._stats["stored"] += 1
+
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM task_templates")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM task_templates").fetchone()
+            stats = dict(self._stats)
+
+        lookups = stats["hits"] + stats["misses"] + stats["rejected"]
+        return {**stats, "hit_rate": stats["hits"] / lookups if lookups else 0.0, "entries": count}
+
+
+_task_template_cache: Optional[TaskTemplateCache] = None
+_task_template_lock = threading.Lock()
+
+
+def get_task_template_cache() -> Optional[TaskTemplateCache]:
+    """
+    Process-wide task-template cache.
+
+    Environment:
+        TASK_TEMPLATE_CACHE=0       disable the cache
+        TASK_TEMPLATE_CACHE_PATH    SQLite file (default: .cache/task_templates.sqlite)
+        TASK_TEMPLATE_MAX_ENTRIES   LRU entry limit
+    """
+
+    global _task_template_cache
+
+    if os.getenv("TASK_TEMPLATE_CACHE", "1") == "0":
+        return None
+
+    with _task_template_lock:
+        if _task_template_cache is None:
+            _task_template_cache = TaskTemplateCache(
+                path=os.getenv(
+                    "TASK_TEMPLATE_CACHE_PATH",
+                    os.path.join(PROJECT_ROOT, ".cache", "task_templates.sqlite"),
+                ),
+                namespace=PROMPT_VERSION,
+                max_entries=int(os.getenv("TASK_TEMPLATE_MAX_ENTRIES", "5000")),
+            )
+    return _task_template_cache
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = TaskTemplateCache(os.path.join(tmp, "task_templates.sqlite"))
+
+        cache.store(
+            "Add a 1.5 second fade-in to mv_complicated.mp4 from 01:10 to 01:37 as fade_a.mp4.",
+            {"b_chain_v1": "FFmpeg-capable: YES\nOperation type: Video filter\nRequired information: input clip",
+             "b_chain_v2": '{"input": "mv_complicated.mp4", "fade": 1.5}'},
+            "ffmpeg -ss 00:01:10 -to 00:01:37 -i mv_complicated.mp4 -vf fade=t=in:d=1.5 fade_a.mp4",
+        )
+        hit = cache.lookup("Add a 0.8 second fade-in to mv_sk8er_boi.mp4 from 00:46 to 01:03 as fade_b.mp4.")
+        print(json.dumps(hit, indent=2))
+
+        # not stored: "1" is also clip_01, and faded.mp4 is not named by the task
+        print(cache.store(
+            "Add a fade-in to the start of clip 1.",
+            {"b_chain_v1": "FFmpeg-capable: YES", "b_chain_v2": None},
+            "ffmpeg -i clip_01.mp4 -vf fade=t=in:d=1 -c:a copy faded.mp4",
+        ))
+        # not stored: st=25 is the clip length minus the fade, fixed for 01:10 ~ 01:37 only
+        print(cache.store(
+            "Add a 2 second fade-out to the end of mv_a.mp4 from 01:10 to 01:37 as fade_c.mp4.",
+            {"b_chain_v1": "FFmpeg-capable: YES", "b_chain_v2": None},
+            "ffmpeg -ss 00:01:10 -to 00:01:37 -i mv_a.mp4 -vf fade=t=out:st=25:d=2 fade_c.mp4",
+        ))
+        print(cache.stats())
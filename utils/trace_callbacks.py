@@ -0,0 +1,123 @@
+import threading
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from utils.tracing import current_task_index, get_tracer
+
+
+# ------------------------------------------------------------
+# LangChain callbacks → tracer spans
+# ------------------------------------------------------------
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records one span per chat model call on the active tracer.
+
+    - stage      : nearest enclosing chain whose run name is in `stages`
+                   (the registry names chains after their registry key)
+    - task_index : current_task_index where the outermost chain started
+                   (inherited by child runs, also across worker threads)
+    - tokens     : token_usage of the provider / usage_metadata
+    - cache      : generation_info["llm_cache"] ("hit" from utils/llm_cache)
+
+    The handler may be attached more than once to the same run (nested
+    registry chains), so events are de-duplicated by run_id.
+    """
+
+    run_inline = True
+
+    def __init__(self):
+        self.stages: set = set()
+        # run_id → (parent run_id, run name, task_index)
+        self._runs: Dict[UUID, Tuple[Optional[UUID], Optional[str], Optional[int]]] = {}
+        # chat model run_id → (stage, task_index, start)
+        self._open: Dict[UUID, Tuple[Optional[str], Optional[int], float]] = {}
+        self._lock = threading.Lock()
+
+    # --------------------------------------------------------
+    # Run tree
+    # --------------------------------------------------------
+    def _remember(self, run_id: UUID, parent_run_id: Optional[UUID], name: Optional[str]) -> None:
+        with self._lock:
+            if run_id in self._runs:
+                return
+            parent = self._runs.get(parent_run_id) if parent_run_id else None
+            task_index = parent[2] if parent is not None else None
+            if task_index is None:
+                task_index = current_task_index.get()
+            self._runs[run_id] = (parent_run_id, name, task_index)
+
+    def _stage_of(self, run_id: UUID) -> Optional[str]:
+        node: Optional[UUID] = run_id
+        while node is not None and node in self._runs:
+            parent, name, _ = self._runs[node]
+            if name in self.stages:
+                return name
+            node = parent
+        return None
+
+    def on_chain_start(self, serialized, inputs, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        if get_tracer() is None:
+            return
+        self._remember(run_id, parent_run_id, kwargs.get("name"))
+
+    def on_chain_end(self, outputs, *, run_id: UUID, **kwargs: Any):
+        # child runs start and end inside their parent, so the node is no longer needed
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            self._runs.pop(run_id, None)
+
+    # --------------------------------------------------------
+    # Chat model calls
+    # --------------------------------------------------------
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, parent_run_id: Optional[UUID] = None, **kwargs: Any):
+        tracer = get_tracer()
+        if tracer is None:
+            return
+
+        self._remember(run_id, parent_run_id, kwargs.get("name"))
+        with self._lock:
+            if run_id in self._open:
+                return
+            self._open[run_id] = (self._stage_of(run_id), self._runs[run_id][2], tracer.now())
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id, response, None)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._close(run_id, None, error)
+
+    def _close(self, run_id: UUID, response: Optional[LLMResult], error: Optional[BaseException]) -> None:
+        tracer = get_tracer()
+        with self._lock:
+            opened = self._open.pop(run_id, None)
+            self._runs.pop(run_id, None)
+        if tracer is None or opened is None:
+            return
+
+        stage, task_index, start = opened
+        attrs: Dict[str, Any] = {}
+
+        if response is not None:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            generation = response.generations[0][0] if response.generations and response.generations[0] else None
+            message = getattr(generation, "message", None)
+            metadata = getattr(message, "usage_metadata", None) or {}
+
+            attrs["prompt_tokens"] = usage.get("prompt_tokens", metadata.get("input_tokens"))
+            attrs["completion_tokens"] = usage.get("completion_tokens", metadata.get("output_tokens"))
+            info = (generation.generation_info or {}) if generation is not None else {}
+            attrs["cache"] = info.get("llm_cache", "miss")
+
+        if error is not None:
+            attrs["error"] = repr(error)
+
+        tracer.add_span(stage or "llm", start, tracer.now(), kind="llm", task_index=task_index, **attrs)
+
+
+TRACING_HANDLER = TracingCallbackHandler()
@@ -0,0 +1,244 @@
+import contextlib
+import contextvars
+import json
+import os
+import statistics
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# ------------------------------------------------------------
+# Span tracing (stages, LLM calls, FFmpeg jobs)
+# ------------------------------------------------------------
+# One Tracer is active per traced run. Spans come from two sources:
+# - agent / scheduler code: `with trace_span("ffmpeg", ...)`
+# - LangChain callbacks (utils/trace_callbacks): one span per LLM call
+# Both are no-ops while no tracer is active.
+#
+# Span:
+#   {"stage", "kind", "task_index", "start", "end", "duration",
+#    "queue_wait", "prompt_tokens", "completion_tokens", "cache", "thread", ...}
+#   start / end: seconds since the tracer started
+
+# task of the code currently running (set by the agent, read by spans)
+current_task_index: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar(
+    "current_task_index", default=None
+)
+
+
+def trace_dir() -> str:
+    """
+    Environment:
+        TRACE_DIR           export directory (default: .cache/traces)
+    """
+    return os.getenv("TRACE_DIR", os.path.join(PROJECT_ROOT, ".cache", "traces"))
+
+
+class Tracer:
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        return time.perf_counter() - self.origin
+
+    def add_span(
+            self,
+            stage: str,
+            start: float,
+            end: float,
+            kind: str = "stage",
+            task_index: Optional[int] = None,
+            **attrs: Any,
+    ) -> Dict[str, Any]:
+        span = {
+            "stage": stage,
+            "kind": kind,
+            "task_index": task_index,
+            "start": start,
+            "end": end,
+            "duration": end - start,
+            "queue_wait": attrs.pop("queue_wait", None),
+            "prompt_tokens": attrs.pop("prompt_tokens", None),
+            "completion_tokens": attrs.pop("completion_tokens", None),
+            "cache": attrs.pop("cache", None),
+            "thread": threading.get_ident(),
+            **attrs,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    # --------------------------------------------------------
+    # Reports / export
+    # --------------------------------------------------------
+    def summary(self) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Totals per kind and stage ({"stage": {...}, "llm": {...}}):
+        count, total / p50 / max seconds, queue wait, tokens, cache hits.
+        """
+
+        with self._lock:
+            spans = list(self.spans)
+
+        kinds: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        for span in spans:
+            stats = kinds.setdefault(span["kind"], {}).setdefault(span["stage"], {
+                "count": 0,
+                "durations": [],
+                "queue_wait_sec": 0.0,
+                "prompt_tokens": 0,
+                "completion_tokens": 0,
+                "cache_hits": 0,
+            })
+            stats["count"] += 1
+            stats["durations"].append(span["duration"])
+            stats["queue_wait_sec"] += span["queue_wait"] or 0.0
+            stats["prompt_tokens"] += span["prompt_tokens"] or 0
+            stats["completion_tokens"] += span["completion_tokens"] or 0
+            stats["cache_hits"] += 1 if span["cache"] == "hit" else 0
+
+        for stages in kinds.values():
+            for stats in stages.values():
+                durations = stats.pop("durations")
+                stats["total_sec"] = sum(durations)
+                stats["p50_sec"] = statistics.median(durations)
+                stats["max_sec"] = max(durations)
+
+        return kinds
+
+    def export_jsonl(self, path: str) -> str:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+
+        with open(path, "w", encoding="utf-8") as f:
+            for span in spans:
+                f.write(json.dumps(span, ensure_ascii=False, default=str) + "\n")
+        return path
+
+    def export_chrome_trace(self, path: str) -> str:
+        """
+        Chrome trace event format (chrome://tracing, Perfetto, speedscope):
+        one row per task (row 0 = run-level stages).
+        """
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._lock:
+            spans = list(self.spans)
+
+        events = [
+            {"name": "thread_name", "ph": "M", "pid": 1, "tid": tid, "args": {"name": name}}
+            for tid, name in {
+                (span["task_index"] or 0): f"task {span['task_index']}" if span["task_index"] else "run"
+                for span in spans
+            }.items()
+        ]
+        for span in spans:
+            args = {
+                key: value for key, value in span.items()
+                if key not in ("stage", "kind", "start", "end", "duration") and value is not None
+            }
+            events.append({
+                "name": span["stage"],
+                "cat": span["kind"],
+                "ph": "X",
+                "ts": span["start"] * 1e6,
+                "dur": span["duration"] * 1e6,
+                "pid": 1,
+                "tid": span["task_index"] or 0,
+                "args": args,
+            })
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, default=str)
+        return path
+
+    def export(self, name: str, directory: Optional[str] = None) -> Dict[str, str]:
+        directory = directory or trace_dir()
+        return {
+            "jsonl": self.export_jsonl(os.path.join(directory, f"{name}.jsonl")),
+            "chrome": self.export_chrome_trace(os.path.join(directory, f"{name}.trace.json")),
+        }
+
+
+# ------------------------------------------------------------
+# Active tracer
+# ------------------------------------------------------------
+_active: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    global _active
+    _active = Tracer()
+    return _active
+
+
+def stop_tracing() -> Optional[Tracer]:
+    global _active
+    tracer, _active = _active, None
+    return tracer
+
+
+def get_tracer() -> Optional[Tracer]:
+    return _active
+
+
+@contextlib.contextmanager
+def trace_span(
+        stage: str,
+        task_index: Optional[int] = None,
+        kind: str = "stage",
+        **attrs: Any,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Record the enclosed block as a span of the active tracer (no-op without one).
+    Yields a dict; keys added to it are stored on the span.
+    """
+
+    tracer = _active
+    extra: Dict[str, Any] = {}
+    if tracer is None:
+        yield extra
+        return
+
+    if task_index is None:
+        task_index = current_task_index.get()
+
+    start = tracer.now()
+    try:
+        yield extra
+    except BaseException as e:
+        extra["error"] = repr(e)
+        raise
+    finally:
+        tracer.add_span(stage, start, tracer.now(), kind=kind, task_index=task_index, **attrs, **extra)
+
+
+# ------------------------------------------------------------
+# Execution
+# ------------------------------------------------------------
+if __name__ == "__main__":
+    import tempfile
+
+    tracer = start_tracing()
+    with trace_span("a_chain"):
+        time.sleep(0.02)
+    for idx in (1, 2):
+        current_task_index.set(idx)
+        with trace_span("b_chain", queue_wait=0.001) as span:
+            time.sleep(0.01)
+            span["fast_path"] = "trim"
+        with trace_span("ffmpeg"):
+            time.sleep(0.03)
+    stop_tracing()
+
+    print(json.dumps(tracer.summary(), indent=2))
+    with tempfile.TemporaryDirectory() as tmp:
+        print(tracer.export("demo", tmp))